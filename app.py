@@ -1,19 +1,31 @@
+import threading
+
 import streamlit as st
 from src.extract_pdf import (
     extract_text_from_pdf,
     extract_text_from_multiple_pdfs,
 )
 from src.form_helpers import get_cv_form_data  # ahora no lo usamos, pero lo dejamos por compatibilidad
-from src.ai_service import generate_cv_output
+from src.ai_service import generate_cv_output_stream, start_metrics_exporter, warm_up_providers
+from src.ai_tokens import PromptTooLargeError, check_prompt_size
+from src.text_compaction import compact_text
+from src.study_condenser import check_studies_size, condense_studies, needs_condensing
+from src.pdf_validator import load_pdf_libraries
 from src.prompts import (
     build_prompt_master,
     build_prompt_targeted,
     build_prompt_linkedin_profile,
 )
-from src.pdf_generator import generate_pdf
-from src.ats_analyzer import analyze_ats_compatibility, get_score_color, get_score_emoji
+from src.ats_analyzer import (
+    analyze_ats_compatibility,
+    get_score_color,
+    get_score_emoji,
+    reanalyze_ats_compatibility,
+)
+from src.ats_scorer import ats_local_first, changed_sections, score_ats_locally
+from src.job_index import add_job_description
 from src.ui_styles import apply_custom_styles, render_header
-from src.ui_components import create_sidebar
+from src.ui_components import create_sidebar, render_job_recommendations, render_streaming_output
 from src.form_validators import (
     validate_email,
     validate_phone,
@@ -26,9 +38,23 @@ from src.form_validators import (
 )
 
 
-def process_uploaded_pdfs(files):
+def generate_pdf(*args, **kwargs):
+    """Carga reportlab (src.pdf_generator) recién al generar el primer PDF."""
+    from src.pdf_generator import generate_pdf as _generate_pdf
+    return _generate_pdf(*args, **kwargs)
+
+
+def preload_pdf_stack():
+    """Importa en segundo plano las librerías de lectura y generación de PDF."""
+    load_pdf_libraries()
+    import src.pdf_generator  # noqa: F401
+
+
+def process_uploaded_pdfs(files, condensable=False):
     """
     Procesa uno o varios archivos PDF subidos por el lector con validación avanzada.
+    Con `condensable` (programas de estudio) se aceptan textos más extensos,
+    porque antes del CV Maestro se condensan por fragmentos.
     """
     try:
         if not files:
@@ -107,6 +133,24 @@ def process_uploaded_pdfs(files):
             )
             return None
 
+        # Quitar espacios, encabezados/pies y texto duplicado antes de usarlo en los prompts
+        text_clean, compaction = compact_text(text_clean)
+        if compaction.tokens_saved > 0:
+            st.caption(
+                f"🧹 Texto compactado: ~{compaction.tokens_saved} tokens menos "
+                f"({compaction.saved_ratio:.0%}) en cada generación que lo use"
+            )
+
+        # Rechazar aquí lo que no entraría en un prompt, antes de llamar a la IA
+        try:
+            if condensable:
+                check_studies_size(text_clean)
+            else:
+                check_prompt_size(text_clean, stage="upload")
+        except PromptTooLargeError as e:
+            st.error(str(e))
+            return None
+
         return text_clean
 
     except Exception as e:
@@ -289,6 +333,66 @@ def build_cv_text_from_form(data: dict) -> str:
     return "\n".join(lines).strip()
 
 
+def run_ats_analysis(result_key: str, cv_text: str, use_llm: bool):
+    """
+    Analiza el CV Target (con las ediciones del lector) y guarda el resultado
+    en `st.session_state[result_key]`. Al re-analizar, el score local solo
+    recalcula las secciones modificadas (caché por sección) y la IA recibe
+    esas secciones junto con su análisis anterior en lugar del CV completo.
+    """
+    job_description = st.session_state.get("job_description_raw") or ""
+
+    previous_cv = st.session_state.get(f"{result_key}_cv")
+    if previous_cv is not None:
+        changed, removed = changed_sections(previous_cv, cv_text)
+        st.session_state[f"{result_key}_changed"] = [section.title for section in changed + removed]
+    else:
+        st.session_state[f"{result_key}_changed"] = None
+
+    if use_llm:
+        previous_llm = st.session_state.get(f"{result_key}_llm")
+        llm_cv, llm_job = st.session_state.get(f"{result_key}_llm_source") or (None, None)
+        with st.spinner("Analizando compatibilidad ATS del CV Target..."):
+            if previous_llm and llm_cv and llm_job == job_description:
+                result = reanalyze_ats_compatibility(cv_text, llm_cv, previous_llm, job_description)
+            else:
+                result = analyze_ats_compatibility(cv_content=cv_text, job_description=job_description)
+        st.session_state[f"{result_key}_llm"] = result
+        st.session_state[f"{result_key}_llm_source"] = (cv_text, job_description)
+    else:
+        # Score instantáneo sin IA; el análisis narrativo se pide a demanda
+        result = score_ats_locally(cv_content=cv_text, job_description=job_description)
+
+    st.session_state[result_key] = result
+    st.session_state[f"{result_key}_cv"] = cv_text
+
+
+def render_changed_sections(result_key: str):
+    """Indica qué secciones se re-analizaron tras la última edición."""
+    changed = st.session_state.get(f"{result_key}_changed")
+    if changed is None:
+        return
+    if changed:
+        st.caption(f"♻️ Re-análisis: solo se recalcularon las secciones modificadas ({', '.join(changed)})")
+    else:
+        st.caption("♻️ Sin cambios en el CV desde el análisis anterior")
+
+
+@st.cache_resource(show_spinner=False)
+def start_provider_warm_up():
+    """
+    Lanza una única vez por proceso el warm-up de los clientes de IA y la
+    carga de las librerías de PDF en segundo plano, para no demorar el primer
+    render de la página, y el endpoint de métricas si AI_METRICS_PORT está
+    configurado.
+    """
+    start_metrics_exporter()
+    threading.Thread(target=preload_pdf_stack, name="pdf-prewarm", daemon=True).start()
+    thread = threading.Thread(target=warm_up_providers, name="ai-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
 def main():
     """Función principal de la aplicación CV Alchemist 2.0."""
     st.set_page_config(
@@ -298,6 +402,9 @@ def main():
         initial_sidebar_state="expanded"
     )
 
+    # Pre-calentar conexiones con los proveedores de IA (una vez por proceso)
+    start_provider_warm_up()
+
     # Aplicar estilos personalizados
     apply_custom_styles()
     
@@ -368,6 +475,8 @@ def main():
             "pdf_text_raw", "pdf_text_clean", "studies_text_clean",
             "cv_master", "linkedin_profile", "cv_target", "job_description_raw",
             "ats_analysis", "ats_analysis_form",
+            *[f"{result_key}_{suffix}" for result_key in ("ats_analysis", "ats_analysis_form")
+              for suffix in ("cv", "changed", "llm", "llm_source")],
             "show_success_pdf", "show_success_studies", "show_success_form",
             "show_success_studies_form", "show_info_skip", "show_info_skip_form",
             "languages_added", "show_success_languages", "show_info_skip_languages"
@@ -434,7 +543,7 @@ def main():
             if study_files and st.button("Procesar PDFs"):
                 num_files = len(study_files) if isinstance(study_files, list) else 1
                 with st.spinner(f"Procesando {num_files} PDF(s) de formación... Esto puede tomar unos momentos."):
-                    studies_text_clean = process_uploaded_pdfs(study_files)
+                    studies_text_clean = process_uploaded_pdfs(study_files, condensable=True)
 
                 if studies_text_clean:
                     st.session_state["studies_text_clean"] = studies_text_clean
@@ -564,13 +673,18 @@ def main():
                 st.markdown("### 3) Generar CV Maestro con IA")
 
                 if st.button("Generar CV Maestro"):
+                    provider = st.session_state.get("ai_provider", "auto")
+                    model = st.session_state.get("ai_model")
+
+                    studies_text = st.session_state["studies_text_clean"] or ""
+                    if needs_condensing(studies_text):
+                        with st.spinner("Condensando los programas de estudio por fragmentos..."):
+                            studies_text = condense_studies(studies_text, model=model, provider=provider)
+
                     prompt = build_prompt_master(
                         cv_text=st.session_state["pdf_text_clean"],
-                        new_studies=st.session_state["studies_text_clean"] or "",
+                        new_studies=studies_text,
                     )
-
-                    provider = st.session_state.get("ai_provider", "auto")
-                    model = st.session_state.get("ai_model")
                     
                     # Determinar nombre del modelo para mostrar
                     if provider == "auto":
@@ -580,8 +694,10 @@ def main():
                     else:
                         model_name = "IA"
                     
-                    with st.spinner(f"Generando CV Maestro con {model_name}..."):
-                        cv_master = generate_cv_output(prompt, model=model, provider=provider)
+                    cv_master = render_streaming_output(
+                        generate_cv_output_stream(prompt, model=model, provider=provider, stage="master"),
+                        f"Generando CV Maestro con {model_name}...",
+                    )
 
                     st.session_state["cv_master"] = cv_master
                     st.session_state["linkedin_profile"] = None
@@ -643,8 +759,10 @@ def main():
                     else:
                         model_name = "IA"
                     
-                    with st.spinner(f"Generando perfil LinkedIn con {model_name}..."):
-                        linkedin_profile = generate_cv_output(prompt_linkedin, model=model, provider=provider)
+                    linkedin_profile = render_streaming_output(
+                        generate_cv_output_stream(prompt_linkedin, model=model, provider=provider, stage="linkedin"),
+                        f"Generando perfil LinkedIn con {model_name}...",
+                    )
 
                     st.session_state["linkedin_profile"] = linkedin_profile
                     st.rerun()
@@ -686,6 +804,7 @@ def main():
                     value=st.session_state.get("job_description_raw") or "",
                     height=220,
                 )
+                render_job_recommendations(st.session_state.get("cv_master"))
 
                 if st.button("Generar CV Target"):
                     if not st.session_state.get("cv_master"):
@@ -699,6 +818,7 @@ def main():
                             master_cv=st.session_state["cv_master"],
                             job_description=st.session_state["job_description_raw"],
                         )
+                        add_job_description(st.session_state["job_description_raw"])
 
                         provider = st.session_state.get("ai_provider", "auto")
                         model = st.session_state.get("ai_model")
@@ -711,8 +831,10 @@ def main():
                         else:
                             model_name = "IA"
                         
-                        with st.spinner(f"Generando CV Target con {model_name}..."):
-                            cv_target = generate_cv_output(prompt_target, model=model, provider=provider)
+                        cv_target = render_streaming_output(
+                            generate_cv_output_stream(prompt_target, model=model, provider=provider, stage="target"),
+                            f"Generando CV Target con {model_name}...",
+                        )
 
                         # Verificar si hay datos insuficientes
                         if cv_target.strip() == "ERROR_DATOS_INSUFICIENTES":
@@ -765,18 +887,19 @@ def main():
                     st.caption("Evalúa qué tan bien tu CV pasará los sistemas de filtrado automático")
                     
                     if st.button("🔍 Analizar Compatibilidad ATS", key="analyze_ats_target"):
-                        with st.spinner("Analizando compatibilidad ATS del CV Target..."):
-                            ats_result = analyze_ats_compatibility(
-                                cv_content=st.session_state["cv_target"],
-                                job_description=st.session_state.get("job_description_raw", "")
-                            )
-                            st.session_state["ats_analysis"] = ats_result
-                            st.rerun()
+                        # Se analiza el texto editado en el área de texto, no solo el generado
+                        run_ats_analysis(
+                            "ats_analysis",
+                            st.session_state.get("cv_target_output") or st.session_state["cv_target"],
+                            use_llm=not ats_local_first(),
+                        )
+                        st.rerun()
                     
                     # Mostrar resultados del análisis ATS
                     if st.session_state.get("ats_analysis"):
                         ats = st.session_state["ats_analysis"]
                         score = ats.get("score", 0)
+                        render_changed_sections("ats_analysis")
                         
                         # Score principal con color
                         col_score, col_level = st.columns([1, 2])
@@ -852,6 +975,17 @@ def main():
                                     st.markdown(f"**{criterion}:** {detail}")
                             else:
                                 st.caption("No hay detalles adicionales disponibles")
+                        
+                        # Score local: las recomendaciones narrativas de la IA se piden a demanda
+                        if ats.get("source") == "local":
+                            st.caption("⚡ Score calculado localmente, sin IA, con la misma rúbrica de criterios.")
+                            if st.button("💬 Obtener análisis detallado con IA", key="ats_llm_target"):
+                                run_ats_analysis(
+                                    "ats_analysis",
+                                    st.session_state.get("cv_target_output") or st.session_state["cv_target"],
+                                    use_llm=True,
+                                )
+                                st.rerun()
 
         else:
             st.info("Una vez procesado el PDF del CV, se habilitarán los pasos siguientes.")
@@ -1385,7 +1519,7 @@ def main():
             if study_files_form and st.button("Procesar PDFs de formación", key="process_studies_form"):
                 num_files = len(study_files_form) if isinstance(study_files_form, list) else 1
                 with st.spinner(f"Procesando {num_files} PDF(s) de formación... Esto puede tomar unos momentos."):
-                    studies_text_clean = process_uploaded_pdfs(study_files_form)
+                    studies_text_clean = process_uploaded_pdfs(study_files_form, condensable=True)
                 
                 if studies_text_clean:
                     st.session_state["studies_text_clean"] = studies_text_clean
@@ -1537,14 +1671,19 @@ def main():
                 st.markdown("### 3) Generar CV Maestro con IA")
                 
                 if st.button("Generar CV Maestro", key="generate_master_form"):
+                    provider = st.session_state.get("ai_provider", "auto")
+                    model = st.session_state.get("ai_model")
+
+                    studies_text = st.session_state["studies_text_clean"] or ""
+                    if needs_condensing(studies_text):
+                        with st.spinner("Condensando los programas de estudio por fragmentos..."):
+                            studies_text = condense_studies(studies_text, model=model, provider=provider)
+
                     prompt = build_prompt_master(
                         cv_text=st.session_state["pdf_text_clean"],
-                        new_studies=st.session_state["studies_text_clean"] or "",
+                        new_studies=studies_text,
                     )
                     
-                    provider = st.session_state.get("ai_provider", "auto")
-                    model = st.session_state.get("ai_model")
-                    
                     # Determinar nombre del modelo para mostrar
                     if provider == "auto":
                         model_name = "IA (OpenAI → Gemini)"
@@ -1553,8 +1692,10 @@ def main():
                     else:
                         model_name = "IA"
                     
-                    with st.spinner(f"Generando CV Maestro con {model_name}..."):
-                        cv_master = generate_cv_output(prompt, model=model, provider=provider)
+                    cv_master = render_streaming_output(
+                        generate_cv_output_stream(prompt, model=model, provider=provider, stage="master"),
+                        f"Generando CV Maestro con {model_name}...",
+                    )
                     
                     st.session_state["cv_master"] = cv_master
                     st.rerun()
@@ -1608,8 +1749,10 @@ def main():
                     else:
                         model_name = "IA"
                     
-                    with st.spinner(f"Generando perfil LinkedIn con {model_name}..."):
-                        linkedin_profile = generate_cv_output(prompt_linkedin, model=model, provider=provider)
+                    linkedin_profile = render_streaming_output(
+                        generate_cv_output_stream(prompt_linkedin, model=model, provider=provider, stage="linkedin"),
+                        f"Generando perfil LinkedIn con {model_name}...",
+                    )
 
                     st.session_state["linkedin_profile"] = linkedin_profile
                     st.rerun()
@@ -1650,6 +1793,7 @@ def main():
                     height=220,
                     key="job_desc_form"
                 )
+                render_job_recommendations(st.session_state.get("cv_master"))
 
                 if st.button("Generar CV Target (desde formulario)"):
                     if not st.session_state["job_description_raw"].strip():
@@ -1659,6 +1803,7 @@ def main():
                             master_cv=st.session_state["cv_master"],
                             job_description=st.session_state["job_description_raw"],
                         )
+                        add_job_description(st.session_state["job_description_raw"])
 
                         provider = st.session_state.get("ai_provider", "auto")
                         model = st.session_state.get("ai_model")
@@ -1671,8 +1816,10 @@ def main():
                         else:
                             model_name = "IA"
                         
-                        with st.spinner(f"Generando CV Target con {model_name}..."):
-                            cv_target = generate_cv_output(prompt_target, model=model, provider=provider)
+                        cv_target = render_streaming_output(
+                            generate_cv_output_stream(prompt_target, model=model, provider=provider, stage="target"),
+                            f"Generando CV Target con {model_name}...",
+                        )
 
                         # Verificar si hay datos insuficientes
                         if cv_target.strip() == "ERROR_DATOS_INSUFICIENTES":
@@ -1725,18 +1872,19 @@ def main():
                     st.caption("Evalúa qué tan bien tu CV pasará los sistemas de filtrado automático")
                     
                     if st.button("🔍 Analizar Compatibilidad ATS", key="analyze_ats_form"):
-                        with st.spinner("Analizando compatibilidad ATS del CV Target..."):
-                            ats_result = analyze_ats_compatibility(
-                                cv_content=st.session_state["cv_target"],
-                                job_description=st.session_state.get("job_description_raw", "")
-                            )
-                            st.session_state["ats_analysis_form"] = ats_result
-                            st.rerun()
+                        # Se analiza el texto editado en el área de texto, no solo el generado
+                        run_ats_analysis(
+                            "ats_analysis_form",
+                            st.session_state.get("cv_target_output_from_form") or st.session_state["cv_target"],
+                            use_llm=not ats_local_first(),
+                        )
+                        st.rerun()
                     
                     # Mostrar resultados del análisis ATS
                     if st.session_state.get("ats_analysis_form"):
                         ats = st.session_state["ats_analysis_form"]
                         score = ats.get("score", 0)
+                        render_changed_sections("ats_analysis_form")
                         
                         # Score principal con color
                         col_score, col_level = st.columns([1, 2])
@@ -1812,6 +1960,17 @@ def main():
                                     st.markdown(f"**{criterion}:** {detail}")
                             else:
                                 st.caption("No hay detalles adicionales disponibles")
+                        
+                        # Score local: las recomendaciones narrativas de la IA se piden a demanda
+                        if ats.get("source") == "local":
+                            st.caption("⚡ Score calculado localmente, sin IA, con la misma rúbrica de criterios.")
+                            if st.button("💬 Obtener análisis detallado con IA", key="ats_llm_form"):
+                                run_ats_analysis(
+                                    "ats_analysis_form",
+                                    st.session_state.get("cv_target_output_from_form") or st.session_state["cv_target"],
+                                    use_llm=True,
+                                )
+                                st.rerun()
 
 
 if __name__ == "__main__":
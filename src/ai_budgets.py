@@ -0,0 +1,88 @@
+# src/ai_budgets.py
+
+"""
+Presupuestos de salida (max_tokens) por etapa del pipeline.
+
+En lugar de pedir siempre 7000 tokens, cada etapa recibe un tope acorde a su
+salida esperada:
+- Etapas de formato fijo (análisis ATS, perfil de LinkedIn): tope fijo.
+- Etapas que reescriben documentos (CV Maestro, CV Target): proporcional al
+  tamaño del documento de referencia incluido en el prompt. Un CV Target, por
+  ejemplo, rara vez supera ~1.3 veces el CV Maestro del que parte.
+
+Topes ajustados reducen la latencia de cola y cortan generaciones desbocadas.
+Todos los presupuestos quedan limitados por AI_MAX_OUTPUT_TOKENS.
+
+Configuración por variables de entorno:
+- AI_MAX_OUTPUT_TOKENS: techo de salida para cualquier llamada (por defecto 7000)
+- AI_OUTPUT_BUDGET_<ETAPA>: presupuesto fijo para una etapa, ej. AI_OUTPUT_BUDGET_ATS
+"""
+
+import math
+import os
+import re
+from typing import Optional
+
+# Caracteres por token de salida (estimación conservadora para texto en español)
+CHARS_PER_OUTPUT_TOKEN = 3.5
+
+# Presupuesto por etapa:
+# - reference: {documento del prompt: factor} → tokens = Σ factor * tokens(documento)
+# - floor: mínimo de tokens aunque el documento sea corto
+STAGE_OUTPUT_BUDGETS = {
+    "master": {"reference": {"CV BASE": 1.5, "PROGRAMA DE ESTUDIOS": 0.4}, "floor": 1500},
+    "target": {"reference": {"CV MAESTRO": 1.3}, "floor": 1000},
+    "linkedin": {"reference": {}, "floor": 1800},
+    "ats": {"reference": {}, "floor": 1500},
+    "condense": {"reference": {"FRAGMENTO DEL PROGRAMA": 0.4}, "floor": 500},
+}
+
+
+def max_output_tokens() -> int:
+    """Techo de tokens de salida para cualquier llamada."""
+    return int(os.getenv("AI_MAX_OUTPUT_TOKENS", "7000"))
+
+
+def estimate_output_tokens(text: str) -> int:
+    """Tokens aproximados que ocupa `text` como salida."""
+    return math.ceil(len(text) / CHARS_PER_OUTPUT_TOKEN)
+
+
+def _document_block(prompt: str, name: str) -> str:
+    """Contenido entre `--- INICIO DEL <name> ---` y `--- FIN DEL <name> ---`."""
+    match = re.search(
+        rf"--- INICIO DEL {re.escape(name)} ---(.*?)--- FIN DEL {re.escape(name)} ---",
+        prompt,
+        re.DOTALL,
+    )
+    return match.group(1).strip() if match else ""
+
+
+def compute_output_budget(stage: str, prompt: str, reference_text: Optional[str] = None) -> int:
+    """
+    Presupuesto de tokens de salida para una llamada de la etapa `stage`.
+
+    `reference_text` reemplaza al documento de referencia que se extraería
+    del prompt (útil si el prompt no usa los marcadores estándar).
+    Las etapas sin política propia ("general") usan el techo.
+    """
+    ceiling = max_output_tokens()
+
+    override = os.getenv(f"AI_OUTPUT_BUDGET_{stage.upper()}")
+    if override:
+        return min(ceiling, int(override))
+
+    policy = STAGE_OUTPUT_BUDGETS.get(stage)
+    if policy is None:
+        return ceiling
+
+    budget = 0.0
+    references = policy["reference"]
+    if reference_text is not None and references:
+        # Un único documento de referencia: se aplica el factor principal
+        budget = max(references.values()) * estimate_output_tokens(reference_text)
+    else:
+        for name, factor in references.items():
+            budget += factor * estimate_output_tokens(_document_block(prompt, name))
+
+    return min(ceiling, max(policy["floor"], math.ceil(budget)))
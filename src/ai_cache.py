@@ -0,0 +1,227 @@
+# src/ai_cache.py
+
+"""
+Caché de respuestas de IA direccionada por contenido.
+
+Las respuestas se indexan por un hash SHA-256 de todo lo que determina la salida
+del modelo: proveedor, modelo, prompt de sistema, prompt de usuario y parámetros
+de muestreo. Así, si la misma persona pulsa "Generar" dos veces con el mismo CV
+y la misma descripción de puesto, la segunda respuesta sale de la caché en
+milisegundos y sin consumir tokens.
+
+Niveles:
+- Memoria: LRU acotado por número de entradas (siempre activo).
+- Disco (opcional): SQLite, compartido entre reinicios del proceso.
+
+Configuración por variables de entorno:
+- AI_CACHE_ENABLED: "0" desactiva la caché (por defecto "1")
+- AI_CACHE_MAX_ENTRIES: entradas máximas en memoria (por defecto 256)
+- AI_CACHE_TTL_SECONDS: vida de cada entrada en segundos (por defecto 86400)
+- AI_CACHE_DB_PATH: ruta del archivo SQLite (vacío = sin caché en disco)
+- AI_CACHE_MAX_DB_ENTRIES: entradas máximas en disco (por defecto 5000)
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+def make_cache_key(provider: str, model: str, system_prompt: str,
+                   prompt: str, params: Dict) -> str:
+    """
+    Calcula la clave de caché de una petición.
+
+    Los parámetros se serializan con claves ordenadas para que el mismo
+    conjunto de valores produzca siempre el mismo hash.
+    """
+    payload = json.dumps(
+        {
+            "provider": provider,
+            "model": model,
+            "system": system_prompt,
+            "prompt": prompt,
+            "params": params,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Caché LRU en memoria con TTL y persistencia opcional en SQLite."""
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 86400,
+                 db_path: Optional[str] = None, max_db_entries: int = 5000):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self.max_db_entries = max_db_entries
+
+        self._memory: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+        self._stats = {
+            "hits_memory": 0,
+            "hits_disk": 0,
+            "misses": 0,
+            "sets": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+        if db_path:
+            self._open_db(db_path)
+
+    def _open_db(self, db_path: str) -> None:
+        """Abre (o crea) la base SQLite. Si falla, la caché sigue solo en memoria."""
+        try:
+            directory = os.path.dirname(db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_responses_accessed "
+                "ON responses (accessed_at)"
+            )
+            self._conn.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️ Caché IA: no se pudo abrir {db_path} ({e}). Se usará solo memoria.")
+            self._conn = None
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - created_at > self.ttl_seconds
+
+    def _remember(self, key: str, created_at: float, value: str) -> None:
+        """Inserta en memoria respetando el límite LRU. Requiere el lock tomado."""
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def get(self, key: str) -> Optional[str]:
+        """Devuelve la respuesta cacheada o None si no existe o expiró."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, value = entry
+                if not self._is_expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    self._stats["hits_memory"] += 1
+                    return value
+                del self._memory[key]
+                self._stats["expirations"] += 1
+
+            if self._conn is not None:
+                try:
+                    row = self._conn.execute(
+                        "SELECT value, created_at FROM responses WHERE key = ?",
+                        (key,),
+                    ).fetchone()
+                    if row is not None:
+                        value, created_at = row
+                        if not self._is_expired(created_at, now):
+                            self._conn.execute(
+                                "UPDATE responses SET accessed_at = ? WHERE key = ?",
+                                (now, key),
+                            )
+                            self._conn.commit()
+                            self._remember(key, created_at, value)
+                            self._stats["hits_disk"] += 1
+                            return value
+                        self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                        self._conn.commit()
+                        self._stats["expirations"] += 1
+                except sqlite3.Error as e:
+                    print(f"⚠️ Caché IA: error leyendo disco ({e})")
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, key: str, value: str) -> None:
+        """Guarda una respuesta en memoria y, si está configurado, en disco."""
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            self._stats["sets"] += 1
+
+            if self._conn is not None:
+                try:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO responses (key, value, created_at, accessed_at) "
+                        "VALUES (?, ?, ?, ?)",
+                        (key, value, now, now),
+                    )
+                    # LRU en disco: borrar las entradas menos usadas que excedan el límite
+                    self._conn.execute(
+                        "DELETE FROM responses WHERE key IN ("
+                        " SELECT key FROM responses ORDER BY accessed_at DESC"
+                        " LIMIT -1 OFFSET ?)",
+                        (self.max_db_entries,),
+                    )
+                    self._conn.commit()
+                except sqlite3.Error as e:
+                    print(f"⚠️ Caché IA: error escribiendo disco ({e})")
+
+    def clear(self) -> None:
+        """Vacía la caché en memoria y en disco."""
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                try:
+                    self._conn.execute("DELETE FROM responses")
+                    self._conn.commit()
+                except sqlite3.Error as e:
+                    print(f"⚠️ Caché IA: error limpiando disco ({e})")
+
+    def stats(self) -> Dict:
+        """Devuelve contadores de aciertos/fallos y tamaño actual."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries_memory"] = len(self._memory)
+            hits = stats["hits_memory"] + stats["hits_disk"]
+            total = hits + stats["misses"]
+            stats["hit_rate"] = round(hits / total, 3) if total else 0.0
+            return stats
+
+
+# Instancia global compartida por todas las sesiones del proceso
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    Devuelve la caché global configurada desde variables de entorno.
+    Retorna None si la caché está desactivada (AI_CACHE_ENABLED=0).
+    """
+    global _response_cache
+
+    if os.getenv("AI_CACHE_ENABLED", "1") == "0":
+        return None
+
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache(
+                max_entries=int(os.getenv("AI_CACHE_MAX_ENTRIES", "256")),
+                ttl_seconds=float(os.getenv("AI_CACHE_TTL_SECONDS", "86400")),
+                db_path=os.getenv("AI_CACHE_DB_PATH") or None,
+                max_db_entries=int(os.getenv("AI_CACHE_MAX_DB_ENTRIES", "5000")),
+            )
+
+    return _response_cache
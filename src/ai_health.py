@@ -0,0 +1,243 @@
+# src/ai_health.py
+
+"""
+Seguimiento de salud de los proveedores de IA.
+
+Mantiene, por cada par (proveedor, modelo):
+- Una ventana deslizante con las latencias de las últimas llamadas exitosas,
+  de la que se calculan cuantiles (p50, p95, ...) usados por ejemplo para el
+  retardo de las peticiones "hedged" en modo auto.
+- Un circuit breaker con estados cerrado / abierto / semiabierto. Si la tasa
+  de error reciente supera el umbral, el circuito se abre y las llamadas a ese
+  proveedor se omiten de inmediato (en modo auto se pasa directo al otro).
+  Pasado el tiempo de enfriamiento se deja pasar una única llamada de prueba:
+  si funciona el circuito se cierra, si falla vuelve a abrirse.
+
+Configuración por variables de entorno:
+- AI_LATENCY_WINDOW_SIZE: muestras guardadas por proveedor/modelo (por defecto 100)
+- AI_BREAKER_WINDOW_SECONDS: ventana de resultados considerada (por defecto 120)
+- AI_BREAKER_MIN_CALLS: llamadas mínimas en la ventana para poder abrir (por defecto 4)
+- AI_BREAKER_FAILURE_RATE: tasa de error que abre el circuito (por defecto 0.5)
+- AI_BREAKER_OPEN_SECONDS: enfriamiento antes de la llamada de prueba (por defecto 30)
+- AI_BREAKER_SLOW_CALL_SECONDS: latencia a partir de la cual una llamada exitosa
+  cuenta como fallo (por defecto 0 = desactivado)
+"""
+
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+# Estados del circuit breaker
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class LatencyWindow:
+    """Ventana deslizante de latencias (en segundos)."""
+
+    def __init__(self, max_samples: int = 100):
+        self._samples: Deque[Tuple[float, float]] = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        """Registra la latencia de una llamada."""
+        with self._lock:
+            self._samples.append((time.time(), seconds))
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._samples)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Devuelve el cuantil `q` (0-1) por el método del rango más cercano.
+        Retorna None si todavía no hay muestras.
+        """
+        with self._lock:
+            values = sorted(seconds for _, seconds in self._samples)
+
+        if not values:
+            return None
+
+        rank = max(1, math.ceil(q * len(values)))
+        return values[min(rank, len(values)) - 1]
+
+
+# Ventanas globales por (proveedor, modelo)
+_latency_windows: Dict[Tuple[str, str], LatencyWindow] = {}
+_latency_windows_lock = threading.Lock()
+
+
+def get_latency_window(provider: str, model: str) -> LatencyWindow:
+    """Devuelve (creándola si hace falta) la ventana de latencias de un proveedor/modelo."""
+    key = (provider, model)
+    with _latency_windows_lock:
+        window = _latency_windows.get(key)
+        if window is None:
+            window = LatencyWindow(int(os.getenv("AI_LATENCY_WINDOW_SIZE", "100")))
+            _latency_windows[key] = window
+        return window
+
+
+def record_latency(provider: str, model: str, seconds: float) -> None:
+    """Registra la latencia de una llamada exitosa."""
+    get_latency_window(provider, model).add(seconds)
+
+
+class CircuitBreaker:
+    """Circuit breaker por proveedor/modelo basado en tasa de error en ventana deslizante."""
+
+    def __init__(self, name: str, window_seconds: float = 120, min_calls: int = 4,
+                 failure_rate: float = 0.5, open_seconds: float = 30,
+                 slow_call_seconds: float = 0):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self.slow_call_seconds = slow_call_seconds
+
+        self._outcomes: Deque[Tuple[float, bool, float]] = deque()
+        self._state = STATE_CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def _trim(self, now: float) -> None:
+        """Descarta resultados fuera de la ventana. Requiere el lock tomado."""
+        while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+            self._outcomes.popleft()
+
+    def _transition(self, state: str) -> None:
+        """Cambia de estado y lo registra en el log. Requiere el lock tomado."""
+        if state != self._state:
+            print(f"🩺 Circuito {self.name}: {self._state} → {state}")
+            self._state = state
+
+    def allow_request(self) -> bool:
+        """
+        Indica si se puede llamar al proveedor ahora.
+        En estado semiabierto solo se permite una llamada de prueba a la vez.
+        """
+        now = time.time()
+        with self._lock:
+            if self._state == STATE_OPEN:
+                if now - self._opened_at < self.open_seconds:
+                    return False
+                self._transition(STATE_HALF_OPEN)
+
+            if self._state == STATE_HALF_OPEN:
+                if self._probe_in_flight:
+                    return False
+                self._probe_in_flight = True
+
+            return True
+
+    def record_success(self, latency: float) -> None:
+        """Registra una llamada exitosa (o lenta, si supera el umbral configurado)."""
+        if self.slow_call_seconds and latency > self.slow_call_seconds:
+            self.record_failure(latency)
+            return
+
+        now = time.time()
+        with self._lock:
+            if self._state == STATE_HALF_OPEN:
+                # La prueba funcionó: empezar de cero con el circuito cerrado
+                self._outcomes.clear()
+                self._probe_in_flight = False
+                self._transition(STATE_CLOSED)
+            self._outcomes.append((now, True, latency))
+            self._trim(now)
+
+    def record_failure(self, latency: float = 0.0) -> None:
+        """Registra una llamada fallida y abre el circuito si corresponde."""
+        now = time.time()
+        with self._lock:
+            self._outcomes.append((now, False, latency))
+            self._trim(now)
+
+            if self._state == STATE_HALF_OPEN:
+                self._probe_in_flight = False
+                self._opened_at = now
+                self._transition(STATE_OPEN)
+                return
+
+            calls = len(self._outcomes)
+            failures = sum(1 for _, ok, _ in self._outcomes if not ok)
+            if calls >= self.min_calls and failures / calls >= self.failure_rate:
+                self._opened_at = now
+                self._transition(STATE_OPEN)
+
+    def is_open(self) -> bool:
+        """True si el circuito está abierto y todavía en enfriamiento."""
+        with self._lock:
+            return self._state == STATE_OPEN and time.time() - self._opened_at < self.open_seconds
+
+    def release(self) -> None:
+        """Libera la llamada de prueba sin registrar resultado (ej. petición cancelada)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def snapshot(self) -> Dict:
+        """Estado actual: circuito, tasa de error y latencias de la ventana."""
+        now = time.time()
+        with self._lock:
+            self._trim(now)
+            calls = len(self._outcomes)
+            failures = sum(1 for _, ok, _ in self._outcomes if not ok)
+            state = self._state
+            retry_in = 0.0
+            if state == STATE_OPEN:
+                retry_in = max(0.0, self.open_seconds - (now - self._opened_at))
+
+        provider, _, model = self.name.partition("/")
+        window = get_latency_window(provider, model)
+        p50 = window.quantile(0.5)
+        p95 = window.quantile(0.95)
+
+        return {
+            "state": state,
+            "calls": calls,
+            "failures": failures,
+            "error_rate": round(failures / calls, 3) if calls else 0.0,
+            "latency_p50": round(p50, 2) if p50 is not None else None,
+            "latency_p95": round(p95, 2) if p95 is not None else None,
+            "retry_in_seconds": round(retry_in, 1),
+        }
+
+
+# Circuit breakers globales por (proveedor, modelo)
+_breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(provider: str, model: str) -> CircuitBreaker:
+    """Devuelve (creándolo si hace falta) el circuit breaker de un proveedor/modelo."""
+    key = (provider, model)
+    with _breakers_lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                f"{provider}/{model}",
+                window_seconds=float(os.getenv("AI_BREAKER_WINDOW_SECONDS", "120")),
+                min_calls=int(os.getenv("AI_BREAKER_MIN_CALLS", "4")),
+                failure_rate=float(os.getenv("AI_BREAKER_FAILURE_RATE", "0.5")),
+                open_seconds=float(os.getenv("AI_BREAKER_OPEN_SECONDS", "30")),
+                slow_call_seconds=float(os.getenv("AI_BREAKER_SLOW_CALL_SECONDS", "0")),
+            )
+            _breakers[key] = breaker
+        return breaker
+
+
+def get_provider_health() -> Dict[str, Dict]:
+    """
+    Foto del estado de salud de cada proveedor/modelo usado en el proceso.
+    Retorna un dict "proveedor/modelo" -> snapshot del circuit breaker.
+    """
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
@@ -0,0 +1,410 @@
+# src/ai_local.py
+
+"""
+Proveedor "local" determinista y sin red, para pruebas de carga y benchmarks.
+
+Responde a partir de dos fuentes:
+- Cassettes: respuestas reales grabadas previamente, una por archivo JSON en
+  AI_LOCAL_CASSETTE_DIR, con clave = hash SHA-256 del prompt de sistema + prompt.
+  Con AI_LOCAL_RECORD=1 cada respuesta exitosa de OpenAI/Gemini se graba.
+- Respondedor sintético: si no hay cassette, genera una salida con el formato
+  que espera cada etapa (CV Maestro, CV Target, perfil de LinkedIn, puesto
+  estructurado y bloque ATS con `**SCORE_ATS:**`, o en JSON si se pide salida
+  estructurada) a partir de los documentos incluidos en el prompt. La misma
+  entrada produce siempre la misma salida.
+
+Latencia y velocidad simuladas: se espera AI_LOCAL_LATENCY segundos antes del
+primer token y luego se emite a AI_LOCAL_TOKENS_PER_SECOND (0 = instantáneo).
+
+Caché de prefijos simulada: como OpenAI, a partir de la segunda llamada con el
+mismo prefijo estático (de al menos 1024 tokens) se informan esos tokens como
+`cached_tokens`, para poder verificar el aprovechamiento sin red.
+
+Configuración por variables de entorno:
+- AI_LOCAL_MODE: "replay" (cassette o sintético, por defecto), "synthetic"
+  (siempre sintético) o "strict" (solo cassettes; falla si no hay grabación)
+- AI_LOCAL_CASSETTE_DIR: carpeta de cassettes (por defecto .cache/ai_cassettes)
+- AI_LOCAL_RECORD: 1 para grabar las respuestas reales como cassettes
+- AI_LOCAL_LATENCY: segundos hasta el primer token (por defecto 0.3)
+- AI_LOCAL_TOKENS_PER_SECOND: velocidad de emisión (por defecto 200)
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import AsyncIterator, Dict, List, Optional, Set
+
+from .prompts import static_prefix
+
+# Caracteres por token usados para simular la velocidad y el consumo
+CHARS_PER_TOKEN = 4
+
+# Tamaño mínimo de prefijo que se considera cacheable (mismo umbral que OpenAI)
+PREFIX_CACHE_MIN_TOKENS = 1024
+
+# Palabras que no cuentan como palabras clave en el análisis ATS sintético
+_STOPWORDS = {
+    "para", "como", "con", "los", "las", "del", "una", "que", "por", "sus", "entre",
+    "este", "esta", "será", "sobre", "desde", "donde", "cuando", "tener", "años",
+    "experiencia", "puesto", "trabajo", "empresa", "equipo", "buscamos", "requisitos",
+    "with", "and", "the", "for", "you", "our", "will", "have", "from", "years",
+}
+
+
+def cassette_key(system_prompt: str, prompt: str) -> str:
+    """Clave de cassette: independiente del proveedor que grabó la respuesta."""
+    payload = json.dumps({"system": system_prompt, "prompt": prompt}, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CassetteStore:
+    """Respuestas grabadas, un archivo JSON por clave."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                return json.load(f)["response"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put(self, key: str, response: str, provider: str = "", model: str = "",
+            prompt: str = "") -> None:
+        entry = {
+            "key": key,
+            "provider": provider,
+            "model": model,
+            "recorded_at": time.time(),
+            "prompt_preview": prompt[:200],
+            "response": response,
+        }
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            # Escritura atómica: nunca queda un cassette a medio escribir
+            tmp_path = self._path(key) + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self._path(key))
+
+
+def _between(text: str, start: str, end: str) -> str:
+    """Texto entre dos marcadores (vacío si no están)."""
+    match = re.search(re.escape(start) + r"(.*?)" + re.escape(end), text, re.DOTALL)
+    return match.group(1).strip() if match else ""
+
+
+def _content_lines(text: str, limit: int) -> List[str]:
+    """Primeras líneas no vacías de un documento, sin viñetas."""
+    lines = [line.strip(" \t•-*") for line in text.splitlines()]
+    return [line for line in lines if line][:limit]
+
+
+def _keywords(text: str, limit: int = 12) -> List[str]:
+    """Palabras significativas de un texto, en orden de aparición y sin repetir."""
+    seen: Dict[str, None] = {}
+    for word in re.findall(r"[A-Za-zÁÉÍÓÚÑáéíóúñ+#.]{4,}", text):
+        word = word.strip(".").lower()
+        if word and word not in _STOPWORDS:
+            seen.setdefault(word, None)
+        if len(seen) >= limit:
+            break
+    return list(seen)
+
+
+def _synthetic_cv(source: str, extra: str, title: str) -> str:
+    lines = _content_lines(source, 40)
+    header = lines[0] if lines else "Nombre Apellido"
+    body = lines[1:] or ["Sin información adicional en el documento base"]
+    training = _content_lines(extra, 8)
+
+    parts = [
+        header,
+        "",
+        "**Extracto**",
+        f"{title} generado localmente a partir del documento base ({len(source)} caracteres).",
+        "",
+        "**Experiencia Profesional**",
+        *[f"• {line}" for line in body[:20]],
+        "",
+        "**Educación**",
+        *([f"• {line}" for line in training] or ["• Formación incluida en el documento base"]),
+        "",
+        "**Aptitudes Técnicas**",
+        "• " + ", ".join(_keywords(source, 8) or ["comunicación", "trabajo en equipo"]),
+    ]
+    return "\n".join(parts)
+
+
+def _synthetic_linkedin(master_cv: str) -> str:
+    lines = _content_lines(master_cv, 10)
+    skills = _keywords(master_cv, 8) or ["comunicación", "trabajo en equipo"]
+    return "\n".join([
+        "**Titular (Headline)**",
+        (lines[0] if lines else "Profesional en búsqueda de nuevos desafíos")[:120],
+        "",
+        "**Acerca de — versión breve**",
+        "Perfil generado localmente a partir del CV Maestro.",
+        "",
+        "**Acerca de — versión extendida**",
+        " ".join(lines[1:5]) or "Perfil generado localmente a partir del CV Maestro.",
+        "",
+        "**Habilidades (Skills)**",
+        *[f"- {skill}" for skill in skills],
+        "",
+        "**Destacados recomendados (Featured)**",
+        "- CV Maestro — versión completa del perfil profesional. Enlace: [sin enlace]",
+    ])
+
+
+def _synthetic_job(raw_job: str) -> str:
+    lines = _content_lines(raw_job, 12)
+    return "\n".join([
+        f"**Título del Puesto:** {lines[0] if lines else 'Puesto'}",
+        "",
+        "**Resumen del Rol:**",
+        " ".join(lines[1:3]) or "Sin resumen en la descripción original.",
+        "",
+        "**Requisitos Técnicos:**",
+        *[f"- {keyword}" for keyword in _keywords(raw_job, 8)],
+    ])
+
+
+def _synthetic_condensed(fragment: str) -> str:
+    lines = _content_lines(fragment, 12)
+    return "\n".join([
+        "**Programa condensado**",
+        *[f"- {line[:100]}" for line in lines],
+        "- Temas: " + ", ".join(_keywords(fragment, 10) or ["sin temas identificados"]),
+    ])
+
+
+def _synthetic_ats_data(prompt: str) -> Dict:
+    """Análisis ATS sintético con los campos de la salida estructurada (ver ats_analyzer)."""
+    cv_text = _between(prompt, "--- INICIO DEL CV ---", "--- FIN DEL CV ---")
+    if not cv_text:
+        # Re-análisis: el prompt trae solo las secciones modificadas
+        cv_text = _between(prompt, "--- INICIO DE LAS SECCIONES MODIFICADAS ---",
+                           "--- FIN DE LAS SECCIONES MODIFICADAS ---")
+    job_text = _between(prompt, "--- DESCRIPCIÓN DEL PUESTO ---", "--- FIN DESCRIPCIÓN ---")
+
+    cv_lower = cv_text.lower()
+    expected = _keywords(job_text or cv_text, 12)
+    found = [kw for kw in expected if kw in cv_lower]
+    missing = [kw for kw in expected if kw not in cv_lower]
+
+    if len(cv_text) < 80:
+        score = 15
+    else:
+        ratio = len(found) / len(expected) if expected else 0.5
+        score = int(40 + 55 * ratio)
+
+    if score >= 85:
+        level = "Excelente"
+    elif score >= 70:
+        level = "Bueno"
+    elif score >= 55:
+        level = "Aceptable"
+    elif score >= 30:
+        level = "Necesita Mejoras"
+    else:
+        level = "Crítico"
+
+    format_points = 20 if "**" in cv_text else 12
+    keyword_points = min(40, int(40 * len(found) / len(expected))) if expected else 20
+
+    return {
+        "score": score,
+        "level": level,
+        "keywords_found": found,
+        "keywords_missing": [f"{kw} (sugerencia: agregar en experiencia/proyectos con ejemplo concreto)"
+                             for kw in missing],
+        "strengths": [
+            "Secciones identificables por sistemas ATS",
+            f"{len(found)} palabras clave del puesto presentes",
+        ],
+        "weaknesses": [f"{len(missing)} palabras clave del puesto ausentes"],
+        "recommendations": [
+            "Incorporar las palabras clave faltantes con ejemplos concretos",
+            "Cuantificar logros cuando existan datos reales",
+            "Mantener encabezados de sección estándar",
+        ],
+        "details": [
+            {"criterion": "Formato y Estructura", "score": format_points, "max_score": 25,
+             "comment": "análisis local"},
+            {"criterion": "Palabras Clave", "score": keyword_points, "max_score": 40,
+             "comment": "análisis local"},
+            {"criterion": "Contenido y Claridad", "score": 14, "max_score": 20, "comment": "análisis local"},
+            {"criterion": "Optimización ATS", "score": 10, "max_score": 15, "comment": "análisis local"},
+        ],
+    }
+
+
+def _synthetic_ats(prompt: str) -> str:
+    """Análisis ATS sintético en el formato markdown con `**SCORE_ATS:**`."""
+    data = _synthetic_ats_data(prompt)
+    return "\n".join([
+        f"**SCORE_ATS:** {data['score']}",
+        "",
+        f"**NIVEL:** {data['level']}",
+        "",
+        "**PALABRAS_CLAVE_ENCONTRADAS:**",
+        *([f"- {kw}" for kw in data["keywords_found"]] or ["- (ninguna)"]),
+        "",
+        "**PALABRAS_CLAVE_FALTANTES:**",
+        *([f"- {kw}" for kw in data["keywords_missing"]] or ["- (ninguna)"]),
+        "",
+        "**FORTALEZAS:**",
+        *[f"- {item}" for item in data["strengths"]],
+        "",
+        "**DEBILIDADES:**",
+        *[f"- {item}" for item in data["weaknesses"]],
+        "",
+        "**RECOMENDACIONES:**",
+        *[f"{i}. {item}" for i, item in enumerate(data["recommendations"], 1)],
+        "",
+        "**DETALLES_POR_CRITERIO:**",
+        *[f"- {d['criterion']}: [{d['score']}/{d['max_score']}] - {d['comment']}" for d in data["details"]],
+    ])
+
+
+def synthesize_response(prompt: str, structured: bool = False) -> str:
+    """
+    Genera una respuesta determinista con el formato de la etapa que pide el prompt.
+    Con `structured`, el análisis ATS se entrega como JSON (salida estructurada).
+    """
+    if "SCORE_ATS" in prompt:
+        if structured:
+            return json.dumps(_synthetic_ats_data(prompt), ensure_ascii=False)
+        return _synthetic_ats(prompt)
+    if "--- INICIO DEL FRAGMENTO DEL PROGRAMA ---" in prompt:
+        return _synthetic_condensed(_between(prompt, "--- INICIO DEL FRAGMENTO DEL PROGRAMA ---",
+                                             "--- FIN DEL FRAGMENTO DEL PROGRAMA ---"))
+    if "PERFIL COMPLETO DE LINKEDIN" in prompt:
+        return _synthetic_linkedin(_between(prompt, "--- INICIO DEL CV MAESTRO ---", "--- FIN DEL CV MAESTRO ---"))
+    if "**CV Target**" in prompt:
+        master_cv = _between(prompt, "--- INICIO DEL CV MAESTRO ---", "--- FIN DEL CV MAESTRO ---")
+        return _synthetic_cv(master_cv, "", "CV Target")
+    if "CV Maestro" in prompt and "--- INICIO DEL CV BASE ---" in prompt:
+        cv_text = _between(prompt, "--- INICIO DEL CV BASE ---", "--- FIN DEL CV BASE ---")
+        studies = _between(prompt, "--- INICIO DEL PROGRAMA DE ESTUDIOS ---", "--- FIN DEL PROGRAMA DE ESTUDIOS ---")
+        return _synthetic_cv(cv_text, studies, "CV Maestro")
+    if "**Título del Puesto**" in prompt:
+        return _synthetic_job(_between(prompt, "--- INICIO DE LA DESCRIPCIÓN EN BRUTO ---",
+                                       "--- FIN DE LA DESCRIPCIÓN EN BRUTO ---"))
+    return f"Respuesta local sintética ({len(prompt)} caracteres de entrada)."
+
+
+class LocalProvider:
+    """Proveedor offline: cassettes grabados o respuestas sintéticas con latencia simulada."""
+
+    def __init__(self, cassette_dir: str, mode: str = "replay", latency: float = 0.3,
+                 tokens_per_second: float = 200):
+        self.store = CassetteStore(cassette_dir)
+        self.mode = mode
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self._seen_prefixes: Set[str] = set()
+
+    def respond(self, system_prompt: str, prompt: str, structured: bool = False) -> str:
+        """Respuesta completa para el prompt (sin simular tiempos)."""
+        if self.mode != "synthetic":
+            recorded = self.store.get(cassette_key(system_prompt, prompt))
+            if recorded is not None:
+                return recorded
+            if self.mode == "strict":
+                raise LookupError("No hay cassette grabado para este prompt (AI_LOCAL_MODE=strict)")
+        return synthesize_response(prompt, structured)
+
+    def record(self, system_prompt: str, prompt: str, response: str, provider: str, model: str) -> None:
+        """Graba una respuesta real como cassette."""
+        self.store.put(cassette_key(system_prompt, prompt), response, provider, model, prompt)
+
+    def _cached_prefix_tokens(self, system_prompt: str, prompt: str) -> int:
+        """Tokens del prefijo estático si ya se envió antes (caché de prefijos simulada)."""
+        prefix = system_prompt + static_prefix(prompt)
+        tokens = len(prefix) // CHARS_PER_TOKEN
+        if tokens < PREFIX_CACHE_MIN_TOKENS:
+            return 0
+        key = hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+        if key in self._seen_prefixes:
+            return tokens
+        self._seen_prefixes.add(key)
+        return 0
+
+    def _usage(self, system_prompt: str, prompt: str, response: str, usage: Optional[Dict],
+               truncated: bool = False) -> None:
+        if usage is not None:
+            usage.update(
+                prompt_tokens=(len(system_prompt) + len(prompt)) // CHARS_PER_TOKEN,
+                completion_tokens=len(response) // CHARS_PER_TOKEN,
+                cached_tokens=self._cached_prefix_tokens(system_prompt, prompt),
+            )
+            if truncated:
+                usage["truncated"] = True
+
+    def _budgeted(self, system_prompt: str, prompt: str, max_tokens: Optional[int],
+                  structured: bool = False):
+        """Respuesta recortada a `max_tokens` (como haría un proveedor real) y si se recortó."""
+        response = self.respond(system_prompt, prompt, structured)
+        if max_tokens and len(response) > max_tokens * CHARS_PER_TOKEN:
+            return response[:max_tokens * CHARS_PER_TOKEN], True
+        return response, False
+
+    async def agenerate(self, system_prompt: str, prompt: str, usage: Optional[Dict] = None,
+                        max_tokens: Optional[int] = None, structured: bool = False) -> str:
+        response, truncated = self._budgeted(system_prompt, prompt, max_tokens, structured)
+        delay = self.latency
+        if self.tokens_per_second:
+            delay += len(response) / CHARS_PER_TOKEN / self.tokens_per_second
+        await asyncio.sleep(delay)
+        self._usage(system_prompt, prompt, response, usage, truncated)
+        return response
+
+    async def astream(self, system_prompt: str, prompt: str, usage: Optional[Dict] = None,
+                      max_tokens: Optional[int] = None) -> AsyncIterator[str]:
+        response, truncated = self._budgeted(system_prompt, prompt, max_tokens)
+        await asyncio.sleep(self.latency)
+
+        # Fragmentos de ~4 palabras, como los que envían los proveedores reales
+        words = re.findall(r"\S+\s*|\s+", response)
+        for i in range(0, len(words), 4):
+            chunk = "".join(words[i:i + 4])
+            if self.tokens_per_second:
+                await asyncio.sleep(len(chunk) / CHARS_PER_TOKEN / self.tokens_per_second)
+            yield chunk
+
+        self._usage(system_prompt, prompt, response, usage, truncated)
+
+
+_local_provider: Optional[LocalProvider] = None
+_local_provider_lock = threading.Lock()
+
+
+def get_local_provider() -> LocalProvider:
+    """Devuelve el proveedor local configurado desde el entorno."""
+    global _local_provider
+
+    with _local_provider_lock:
+        if _local_provider is None:
+            _local_provider = LocalProvider(
+                cassette_dir=os.getenv("AI_LOCAL_CASSETTE_DIR", ".cache/ai_cassettes"),
+                mode=os.getenv("AI_LOCAL_MODE", "replay"),
+                latency=float(os.getenv("AI_LOCAL_LATENCY", "0.3")),
+                tokens_per_second=float(os.getenv("AI_LOCAL_TOKENS_PER_SECOND", "200")),
+            )
+        return _local_provider
+
+
+def recording_enabled() -> bool:
+    """True si las respuestas reales deben grabarse como cassettes."""
+    return os.getenv("AI_LOCAL_RECORD", "0") == "1"
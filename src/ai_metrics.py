@@ -0,0 +1,316 @@
+# src/ai_metrics.py
+
+"""
+Métricas estructuradas de las llamadas a los proveedores de IA.
+
+Cada generación produce un `CallRecord` (etapa, proveedor, modelo, tokens de
+entrada/salida/cacheados informados por el proveedor, huella del prefijo
+estático del prompt, presupuesto de salida y si se agotó, latencia, tiempo al primer token, reintentos, fallback y tamaño
+del resultado) que se envía a todos los sinks registrados:
+
+- `RingBufferSink`: últimos N registros en memoria (siempre activo)
+- `PrometheusExporter`: contadores e histogramas agregados en formato de
+  texto de Prometheus (siempre activo)
+- `JsonlSink`: un registro JSON por línea en un archivo (si se configura ruta)
+
+Se pueden añadir sinks propios con `register_metrics_sink()`: cualquier
+objeto con un método `emit(record)`.
+
+Configuración por variables de entorno:
+- AI_METRICS_BUFFER_SIZE: registros guardados en memoria (por defecto 500)
+- AI_METRICS_JSONL_PATH: archivo JSONL de registros (vacío = desactivado)
+- AI_METRICS_PORT: puerto del endpoint /metrics para Prometheus (vacío = desactivado)
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from typing import TYPE_CHECKING, Callable, Deque, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+# Límites superiores (segundos) de los buckets de los histogramas
+LATENCY_BUCKETS = (0.5, 1, 2, 5, 10, 20, 30, 60, 120, 240)
+
+
+@dataclass
+class CallRecord:
+    """Registro de una generación completa (con reintentos y fallback incluidos)."""
+    stage: str
+    requested_provider: str
+    streaming: bool = False
+    provider: Optional[str] = None
+    model: Optional[str] = None
+    status: str = "error"  # ok | cache | error | timeout | too_large | cancelled
+    routed_to: Optional[str] = None  # primer candidato elegido por el ruteo ("proveedor/modelo")
+    fallback: bool = False
+    retries: int = 0
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    cached_tokens: Optional[int] = None
+    output_budget: Optional[int] = None
+    truncated: bool = False
+    latency_seconds: float = 0.0
+    ttft_seconds: Optional[float] = None
+    prompt_chars: int = 0
+    estimated_prompt_tokens: Optional[int] = None  # medición local antes de enviar (ai_tokens)
+    prefix_fingerprint: Optional[str] = None
+    result_chars: int = 0
+    timestamp: float = field(default_factory=time.time)
+
+    def add_usage(self, usage: Dict[str, Optional[int]]) -> None:
+        """Acumula los tokens informados por el proveedor."""
+        for name in ("prompt_tokens", "completion_tokens", "cached_tokens"):
+            value = usage.get(name)
+            if value is not None:
+                setattr(self, name, (getattr(self, name) or 0) + value)
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+class RingBufferSink:
+    """Guarda los últimos registros en memoria."""
+
+    def __init__(self, max_records: int = 500):
+        self._records: Deque[CallRecord] = deque(maxlen=max_records)
+        self._lock = threading.Lock()
+
+    def emit(self, record: CallRecord) -> None:
+        with self._lock:
+            self._records.append(record)
+
+    def records(self, limit: Optional[int] = None) -> List[CallRecord]:
+        """Registros del más antiguo al más reciente (los últimos `limit` si se indica)."""
+        with self._lock:
+            records = list(self._records)
+        return records[-limit:] if limit else records
+
+
+class JsonlSink:
+    """Añade cada registro como una línea JSON al final de un archivo."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def emit(self, record: CallRecord) -> None:
+        line = json.dumps(record.to_dict(), ensure_ascii=False)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    pairs = []
+    for name, value in labels:
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class PrometheusExporter:
+    """Agrega los registros en contadores e histogramas con formato de texto de Prometheus."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Tuple, float]] = {}
+        self._histograms: Dict[str, Dict[Tuple, List[float]]] = {}
+
+    def _inc(self, name: str, labels: Tuple, value: float = 1) -> None:
+        series = self._counters.setdefault(name, {})
+        series[labels] = series.get(labels, 0) + value
+
+    def _observe(self, name: str, labels: Tuple, value: float) -> None:
+        # [conteo por bucket..., +Inf, suma]
+        series = self._histograms.setdefault(name, {})
+        values = series.setdefault(labels, [0.0] * (len(self.buckets) + 2))
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                values[i] += 1
+        values[-2] += 1
+        values[-1] += value
+
+    def emit(self, record: CallRecord) -> None:
+        provider = record.provider or "none"
+        model = record.model or "none"
+        call_labels = (("stage", record.stage), ("provider", provider), ("model", model),
+                       ("status", record.status))
+        provider_labels = (("provider", provider), ("model", model))
+
+        with self._lock:
+            self._inc("ai_calls_total", call_labels)
+            if record.retries:
+                self._inc("ai_retries_total", provider_labels, record.retries)
+            if record.fallback:
+                self._inc("ai_fallbacks_total", (("stage", record.stage),))
+            if record.truncated:
+                self._inc("ai_truncated_total", (("stage", record.stage),))
+            if record.output_budget:
+                self._inc("ai_output_budget_tokens_total", (("stage", record.stage),), record.output_budget)
+            for kind in ("prompt", "completion", "cached"):
+                tokens = getattr(record, f"{kind}_tokens")
+                if tokens:
+                    self._inc("ai_tokens_total", provider_labels + (("kind", kind),), tokens)
+            if record.prefix_fingerprint and record.prompt_tokens:
+                prefix_labels = (("stage", record.stage), ("prefix", record.prefix_fingerprint))
+                self._inc("ai_prefix_tokens_total", prefix_labels + (("kind", "prompt"),), record.prompt_tokens)
+                self._inc("ai_prefix_tokens_total", prefix_labels + (("kind", "cached"),),
+                          record.cached_tokens or 0)
+            if record.result_chars:
+                self._inc("ai_result_chars_total", (("stage", record.stage),), record.result_chars)
+
+            latency_labels = (("stage", record.stage), ("provider", provider))
+            self._observe("ai_call_latency_seconds", latency_labels, record.latency_seconds)
+            if record.ttft_seconds is not None:
+                self._observe("ai_time_to_first_token_seconds", latency_labels, record.ttft_seconds)
+
+    def render(self) -> str:
+        """Texto en formato de exposición de Prometheus."""
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(labels)} {value:g}")
+
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for labels, values in sorted(series.items()):
+                    for bound, count in zip(self.buckets, values):
+                        bucket_labels = labels + (("le", f"{bound:g}"),)
+                        lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {count:g}")
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {values[-2]:g}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {values[-2]:g}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {values[-1]:.6f}")
+
+        return "\n".join(lines) + "\n"
+
+
+def render_gauges(name: str, help_text: str, series: Dict[Tuple, float]) -> str:
+    """Formatea un conjunto de gauges (estado puntual, ej. caché o circuitos)."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+    for labels, value in sorted(series.items()):
+        lines.append(f"{name}{_format_labels(labels)} {value:g}")
+    return "\n".join(lines) + "\n"
+
+
+# Sinks globales del proceso
+_sinks: Optional[List] = None
+_ring_buffer: Optional[RingBufferSink] = None
+_prometheus: Optional[PrometheusExporter] = None
+_sinks_lock = threading.Lock()
+
+
+def _init_sinks() -> List:
+    """Crea los sinks por defecto según el entorno. Requiere `_sinks_lock` tomado."""
+    global _sinks, _ring_buffer, _prometheus
+
+    if _sinks is None:
+        _ring_buffer = RingBufferSink(int(os.getenv("AI_METRICS_BUFFER_SIZE", "500")))
+        _prometheus = PrometheusExporter()
+        _sinks = [_ring_buffer, _prometheus]
+
+        jsonl_path = os.getenv("AI_METRICS_JSONL_PATH", "").strip()
+        if jsonl_path:
+            _sinks.append(JsonlSink(jsonl_path))
+            print(f"📈 Métricas IA: registrando llamadas en {jsonl_path}")
+
+    return _sinks
+
+
+def register_metrics_sink(sink) -> None:
+    """Añade un sink propio (objeto con método `emit(record)`)."""
+    with _sinks_lock:
+        _init_sinks().append(sink)
+
+
+def emit_call_record(record: CallRecord) -> None:
+    """Envía un registro a todos los sinks. Un sink que falla no afecta la generación."""
+    with _sinks_lock:
+        sinks = list(_init_sinks())
+
+    for sink in sinks:
+        try:
+            sink.emit(record)
+        except Exception as e:
+            print(f"⚠️ Métricas IA: sink {type(sink).__name__} falló: {type(e).__name__}: {str(e)}")
+
+
+def get_recent_calls(limit: Optional[int] = None) -> List[Dict]:
+    """Últimos registros de llamadas como dicts (del más antiguo al más reciente)."""
+    with _sinks_lock:
+        _init_sinks()
+        ring_buffer = _ring_buffer
+    return [record.to_dict() for record in ring_buffer.records(limit)]
+
+
+def summarize_prefix_cache(records: List[Dict]) -> List[Dict]:
+    """
+    Agrupa registros por etapa y huella de prefijo: llamadas, tokens de entrada
+    y cuántos de ellos sirvió la caché de prefijos del proveedor.
+    """
+    groups: Dict[Tuple[str, str], Dict] = {}
+    for record in records:
+        fingerprint = record.get("prefix_fingerprint")
+        if not fingerprint or not record.get("prompt_tokens"):
+            continue
+        group = groups.setdefault((record["stage"], fingerprint), {
+            "stage": record["stage"], "prefix": fingerprint,
+            "calls": 0, "prompt_tokens": 0, "cached_tokens": 0,
+        })
+        group["calls"] += 1
+        group["prompt_tokens"] += record["prompt_tokens"]
+        group["cached_tokens"] += record.get("cached_tokens") or 0
+
+    summary = sorted(groups.values(), key=lambda g: (g["stage"], g["prefix"]))
+    for group in summary:
+        group["cached_ratio"] = round(group["cached_tokens"] / group["prompt_tokens"], 3)
+    return summary
+
+
+def render_call_metrics() -> str:
+    """Métricas agregadas de llamadas en formato de texto de Prometheus."""
+    with _sinks_lock:
+        _init_sinks()
+        exporter = _prometheus
+    return exporter.render()
+
+
+def serve_prometheus(port: int, render: Callable[[], str]) -> "ThreadingHTTPServer":
+    """
+    Expone `render()` en http://0.0.0.0:<port>/metrics desde un hilo daemon.
+    Streamlit no permite rutas propias, por eso el endpoint va en un servidor aparte.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="ai-metrics-server", daemon=True)
+    thread.start()
+    print(f"📈 Métricas IA disponibles en http://0.0.0.0:{port}/metrics")
+    return server
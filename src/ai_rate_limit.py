@@ -0,0 +1,155 @@
+# src/ai_rate_limit.py
+
+"""
+Limitador de tasa del lado del cliente, compartido por todo el proceso.
+
+Cada proveedor tiene dos token buckets: peticiones por minuto y tokens
+estimados por minuto. Todas las sesiones de Streamlit comparten los mismos
+buckets (las llamadas corren en el event loop único de `ai_service`), así
+que el proceso en conjunto no supera la cuota del proveedor y se evitan las
+ráfagas de errores 429.
+
+Las llamadas que exceden la cuota esperan en cola en orden de llegada
+(asyncio.Lock es FIFO), por lo que ninguna sesión queda postergada
+indefinidamente. La profundidad de la cola se expone en `get_rate_limit_status()`.
+
+Configuración por variables de entorno (0 = sin límite):
+- OPENAI_RPM / OPENAI_TPM: peticiones y tokens por minuto para OpenAI (500 / 200000)
+- GEMINI_RPM / GEMINI_TPM: peticiones y tokens por minuto para Gemini (15 / 250000)
+"""
+
+import asyncio
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from .ai_tokens import count_tokens
+
+# Límites por defecto (cuotas de nivel inicial de cada proveedor)
+DEFAULT_LIMITS = {
+    "openai": {"rpm": 500, "tpm": 200000},
+    "gemini": {"rpm": 15, "tpm": 250000},
+}
+
+
+def estimate_request_tokens(prompt: str, max_output_tokens: int) -> int:
+    """
+    Estima los tokens que consume una petición frente a la cuota: entrada
+    (`ai_tokens.count_tokens`) más el máximo de salida solicitado (así los
+    cuenta OpenAI).
+    """
+    return count_tokens(prompt) + max_output_tokens
+
+
+class TokenBucketLimiter:
+    """Token buckets de peticiones/min y tokens/min con cola FIFO."""
+
+    def __init__(self, name: str, requests_per_minute: float, tokens_per_minute: float):
+        self.name = name
+        self.rpm = requests_per_minute
+        self.tpm = tokens_per_minute
+
+        # Los buckets arrancan llenos (permite una ráfaga inicial de hasta 1 minuto de cuota)
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._updated = time.monotonic()
+
+        self._lock: Optional[asyncio.Lock] = None
+        self._waiting = 0
+        self._granted = 0
+        self._total_wait = 0.0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        if self.rpm:
+            self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        if self.tpm:
+            self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    def _wait_time(self, tokens: float) -> float:
+        """Segundos hasta que haya cupo para una petición de `tokens`."""
+        wait = 0.0
+        if self.rpm and self._requests < 1:
+            wait = max(wait, (1 - self._requests) * 60 / self.rpm)
+        if self.tpm and self._tokens < tokens:
+            wait = max(wait, (tokens - self._tokens) * 60 / self.tpm)
+        return wait
+
+    async def acquire(self, tokens: int) -> float:
+        """
+        Espera (en orden de llegada) hasta que haya cupo y lo consume.
+        Retorna los segundos esperados en cola.
+        """
+        # Una petición mayor que la cuota completa se limita a la cuota
+        # para que no bloquee la cola para siempre
+        tokens = min(tokens, self.tpm) if self.tpm else 0
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        started = time.monotonic()
+        self._waiting += 1
+        try:
+            async with self._lock:
+                while True:
+                    self._refill()
+                    wait = self._wait_time(tokens)
+                    if wait <= 0:
+                        break
+                    await asyncio.sleep(wait)
+
+                if self.rpm:
+                    self._requests -= 1
+                self._tokens -= tokens
+        finally:
+            self._waiting -= 1
+
+        waited = time.monotonic() - started
+        self._granted += 1
+        self._total_wait += waited
+        if waited > 0.5:
+            print(f"🚦 {self.name}: petición demorada {waited:.1f}s por límite de tasa")
+        return waited
+
+    def status(self) -> Dict:
+        """Cupo disponible y cola de espera actual."""
+        self._refill()
+        return {
+            "queue_depth": self._waiting,
+            "requests_available": round(self._requests, 1) if self.rpm else None,
+            "tokens_available": int(self._tokens) if self.tpm else None,
+            "rpm": self.rpm,
+            "tpm": self.tpm,
+            "granted": self._granted,
+            "avg_wait_seconds": round(self._total_wait / self._granted, 3) if self._granted else 0.0,
+        }
+
+
+# Limitadores globales por proveedor
+_limiters: Dict[str, Optional[TokenBucketLimiter]] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str) -> Optional[TokenBucketLimiter]:
+    """
+    Devuelve el limitador compartido de un proveedor.
+    Retorna None si ese proveedor no tiene límites configurados (RPM y TPM en 0).
+    """
+    with _limiters_lock:
+        if provider not in _limiters:
+            defaults = DEFAULT_LIMITS.get(provider, {"rpm": 0, "tpm": 0})
+            prefix = provider.upper()
+            rpm = float(os.getenv(f"{prefix}_RPM", str(defaults["rpm"])))
+            tpm = float(os.getenv(f"{prefix}_TPM", str(defaults["tpm"])))
+            _limiters[provider] = TokenBucketLimiter(provider, rpm, tpm) if (rpm or tpm) else None
+        return _limiters[provider]
+
+
+def get_rate_limit_status() -> Dict[str, Dict]:
+    """Estado de los limitadores ya usados en el proceso (cupo y profundidad de cola)."""
+    with _limiters_lock:
+        limiters = {name: limiter for name, limiter in _limiters.items() if limiter is not None}
+    return {name: limiter.status() for name, limiter in limiters.items()}
@@ -0,0 +1,192 @@
+# src/ai_retry.py
+
+"""
+Timeouts, reintentos y plazos (deadlines) para las llamadas a proveedores de IA.
+
+- Errores reintentables: 408, 409, 429 y 5xx, timeouts y fallos de conexión.
+  El resto (clave inválida, modelo inexistente, 400...) falla de inmediato.
+- Backoff exponencial con "full jitter": espera aleatoria entre 0 y
+  min(AI_BACKOFF_MAX, AI_BACKOFF_BASE * 2^intento). Si el proveedor indica
+  `Retry-After`, se respeta ese valor como mínimo.
+- Plazo por etapa del pipeline (master, linkedin, target, ats...): ninguna
+  espera ni reintento se extiende más allá del plazo de la etapa en curso.
+
+Configuración por variables de entorno:
+- AI_CONNECT_TIMEOUT: segundos para establecer conexión (por defecto 10)
+- AI_READ_TIMEOUT: segundos máximos de espera de respuesta por intento (por defecto 120)
+- AI_MAX_RETRIES: reintentos por llamada tras el primer intento (por defecto 2)
+- AI_BACKOFF_BASE / AI_BACKOFF_MAX: base y tope del backoff en segundos (1 / 20)
+- AI_DEADLINE_<ETAPA>: plazo total en segundos de una etapa, ej. AI_DEADLINE_MASTER
+"""
+
+import asyncio
+import contextvars
+import os
+import random
+import re
+from typing import Awaitable, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Plazo total por etapa del pipeline (segundos)
+STAGE_DEADLINES = {
+    "master": 240,
+    "linkedin": 150,
+    "target": 180,
+    "ats": 120,
+    "condense": 120,
+    "general": 180,
+}
+
+# Códigos HTTP que vale la pena reintentar
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+# Nombres de excepciones de red/timeout de los SDKs (sin importar los SDKs)
+_RETRYABLE_EXCEPTION_NAMES = {
+    "APITimeoutError",
+    "APIConnectionError",
+    "TimeoutException",
+    "ConnectError",
+    "ReadTimeout",
+    "ConnectTimeout",
+    "RemoteProtocolError",
+    "DeadlineExceeded",
+    "ServiceUnavailable",
+    "InternalServerError",
+    "ResourceExhausted",
+    "TooManyRequests",
+}
+
+# Instante (loop.time()) en que vence el plazo de la etapa actual
+_deadline_at: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "ai_deadline_at", default=None
+)
+
+
+def connect_timeout() -> float:
+    return float(os.getenv("AI_CONNECT_TIMEOUT", "10"))
+
+
+def read_timeout() -> float:
+    return float(os.getenv("AI_READ_TIMEOUT", "120"))
+
+
+def max_retries() -> int:
+    return int(os.getenv("AI_MAX_RETRIES", "2"))
+
+
+def stage_deadline(stage: str) -> float:
+    """Plazo total en segundos para una etapa (configurable con AI_DEADLINE_<ETAPA>)."""
+    default = STAGE_DEADLINES.get(stage, STAGE_DEADLINES["general"])
+    return float(os.getenv(f"AI_DEADLINE_{stage.upper()}", str(default)))
+
+
+def set_deadline(seconds: float) -> contextvars.Token:
+    """Fija el plazo de la etapa actual (se hereda en las tareas que se creen después)."""
+    return _deadline_at.set(asyncio.get_running_loop().time() + seconds)
+
+
+def reset_deadline(token: contextvars.Token) -> None:
+    _deadline_at.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """Segundos que quedan del plazo actual, o None si no hay plazo."""
+    deadline = _deadline_at.get()
+    if deadline is None:
+        return None
+    return deadline - asyncio.get_running_loop().time()
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    """Extrae el código HTTP de una excepción de OpenAI (status_code) o Google (code)."""
+    for attr in ("status_code", "code"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Indica si el error es transitorio (límite de uso, 5xx, timeout o red)."""
+    if isinstance(exc, asyncio.TimeoutError):
+        return True
+
+    status = _status_code(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+
+    return type(exc).__name__ in _RETRYABLE_EXCEPTION_NAMES
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """
+    Devuelve la espera sugerida por el proveedor, si la hay.
+    OpenAI la envía en las cabeceras `retry-after-ms`/`retry-after`;
+    Gemini la incluye en el mensaje de error (`retry_delay { seconds: N }`).
+    """
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is not None:
+        try:
+            if headers.get("retry-after-ms"):
+                return float(headers["retry-after-ms"]) / 1000
+            if headers.get("retry-after"):
+                return float(headers["retry-after"])
+        except (TypeError, ValueError):
+            pass
+
+    match = re.search(r"retry_delay\s*\{\s*seconds:\s*(\d+)", str(exc))
+    if match:
+        return float(match.group(1))
+
+    return None
+
+
+def backoff_delay(attempt: int) -> float:
+    """Espera con backoff exponencial y jitter completo para el intento `attempt` (0-based)."""
+    base = float(os.getenv("AI_BACKOFF_BASE", "1"))
+    cap = float(os.getenv("AI_BACKOFF_MAX", "20"))
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def retry_delay(exc: BaseException, attempt: int) -> Optional[float]:
+    """
+    Segundos a esperar antes de reintentar tras `exc`, o None si no debe
+    reintentarse (error fatal, sin reintentos restantes o sin tiempo en el plazo).
+    """
+    if attempt >= max_retries() or not is_retryable(exc):
+        return None
+
+    delay = backoff_delay(attempt)
+    suggested = retry_after_seconds(exc)
+    if suggested is not None:
+        delay = max(delay, suggested)
+
+    remaining = remaining_time()
+    if remaining is not None and delay >= remaining:
+        return None
+
+    return delay
+
+
+async def call_with_retries(fn: Callable[[], Awaitable[T]], label: str) -> T:
+    """
+    Ejecuta `fn` reintentando los errores transitorios.
+    Cada intento queda acotado por el tiempo restante del plazo de la etapa.
+    Propaga la última excepción si no se pudo completar.
+    """
+    attempt = 0
+    while True:
+        try:
+            remaining = remaining_time()
+            if remaining is not None and remaining <= 0:
+                raise asyncio.TimeoutError("Plazo de la etapa agotado")
+            return await asyncio.wait_for(fn(), timeout=remaining)
+        except Exception as e:
+            delay = retry_delay(e, attempt)
+            if delay is None:
+                raise
+            attempt += 1
+            print(f"🔁 {label}: {type(e).__name__}, reintento {attempt}/{max_retries()} en {delay:.1f}s")
+            await asyncio.sleep(delay)
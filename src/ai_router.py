@@ -0,0 +1,275 @@
+# src/ai_router.py
+
+"""
+Ruteo de peticiones entre proveedores/modelos según su estado observado.
+
+En modo auto, en lugar del orden fijo OpenAI → Gemini, una política de ruteo
+ordena los candidatos para cada petición a partir de:
+- Latencias recientes (p50/p95, ventanas de `ai_health.py`)
+- Tasa de error reciente (circuit breakers de `ai_health.py`)
+- Tamaño del prompt: los prompts largos (ej. programas de estudio de varios
+  PDFs) van al modelo con más contexto y mejor throughput observado
+  (tokens de salida por segundo); los cortos (ej. análisis ATS) al más rápido.
+
+Políticas incluidas:
+- "adaptive" (por defecto): la descrita arriba. Sin muestras suficientes
+  conserva el orden por defecto (OpenAI primero).
+- "static": siempre el orden por defecto.
+
+Se pueden registrar políticas propias con `register_routing_policy()`:
+cualquier objeto con un método `rank(candidates, request)` que retorne
+(candidatos ordenados, motivo). Sea cual sea la política, los candidatos con
+el circuito abierto quedan al final.
+
+Cada decisión se registra en el log y en memoria (`get_routing_decisions()`).
+
+Configuración por variables de entorno:
+- AI_ROUTING_POLICY: política a usar (por defecto "adaptive")
+- AI_ROUTER_LONG_PROMPT_TOKENS: desde cuántos tokens un prompt es largo (por defecto 6000)
+- AI_ROUTER_MIN_SAMPLES: muestras mínimas para confiar en la latencia (por defecto 5)
+- AI_ROUTER_ERROR_PENALTY: peso de la tasa de error en la latencia esperada (por defecto 2)
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from typing import Deque, Dict, List, Optional, Tuple
+
+from .ai_health import LatencyWindow, get_circuit_breaker, get_latency_window
+
+# Ventana de contexto (tokens) por prefijo de nombre de modelo
+MODEL_CONTEXT_TOKENS = {
+    "gpt-4.1": 1_047_576,
+    "gpt-4o": 128_000,
+    "gpt-4-turbo": 128_000,
+    "gpt-4-1106": 128_000,
+    "gpt-4-0125": 128_000,
+    "gpt-4-32k": 32_768,
+    "gpt-4": 8_192,
+    "gpt-3.5": 16_385,
+    "o1": 200_000,
+    "o3": 200_000,
+    "o4": 200_000,
+    "gemini": 1_048_576,
+    "local": 1_048_576,
+}
+DEFAULT_CONTEXT_TOKENS = 128_000
+
+
+def model_context_tokens(model: str) -> int:
+    """Ventana de contexto conocida del modelo (el prefijo más largo que coincida)."""
+    matches = [prefix for prefix in MODEL_CONTEXT_TOKENS if model.startswith(prefix)]
+    return MODEL_CONTEXT_TOKENS[max(matches, key=len)] if matches else DEFAULT_CONTEXT_TOKENS
+
+
+@dataclass
+class CandidateStats:
+    """Estado observado de un proveedor/modelo al momento de rutear."""
+    provider: str
+    model: str
+    latency_p50: Optional[float]
+    latency_p95: Optional[float]
+    samples: int
+    error_rate: float
+    breaker_open: bool
+    context_tokens: int
+    tokens_per_second: Optional[float]
+
+    @property
+    def name(self) -> str:
+        return f"{self.provider}/{self.model}"
+
+
+@dataclass
+class RouteRequest:
+    """Datos de la petición relevantes para el ruteo."""
+    stage: str
+    prompt_tokens: int
+    max_tokens: int
+
+
+@dataclass
+class RoutingDecision:
+    """Orden elegido para una petición y por qué."""
+    policy: str
+    stage: str
+    prompt_tokens: int
+    order: List[str]
+    reason: str
+    timestamp: float = field(default_factory=time.time)
+
+
+class StaticPolicy:
+    """Orden por defecto (OpenAI primero, Gemini como fallback)."""
+
+    name = "static"
+
+    def rank(self, candidates: List[CandidateStats],
+             request: RouteRequest) -> Tuple[List[CandidateStats], str]:
+        return list(candidates), "orden por defecto"
+
+
+class AdaptivePolicy:
+    """Ordena por latencia esperada o, con prompts largos, por contexto y throughput."""
+
+    name = "adaptive"
+
+    def __init__(self, long_prompt_tokens: int = 6000, min_samples: int = 5,
+                 error_penalty: float = 2.0):
+        self.long_prompt_tokens = long_prompt_tokens
+        self.min_samples = min_samples
+        self.error_penalty = error_penalty
+
+    def _expected_latency(self, candidate: CandidateStats) -> Optional[float]:
+        if candidate.samples < self.min_samples or candidate.latency_p50 is None:
+            return None
+        return candidate.latency_p50 * (1 + self.error_penalty * candidate.error_rate)
+
+    def rank(self, candidates: List[CandidateStats],
+             request: RouteRequest) -> Tuple[List[CandidateStats], str]:
+        needed = request.prompt_tokens + request.max_tokens
+        fitting = [c for c in candidates if c.context_tokens >= needed]
+        too_small = [c for c in candidates if c not in fitting]
+        if not fitting:
+            fitting, too_small = list(candidates), []
+
+        if request.prompt_tokens >= self.long_prompt_tokens:
+            # Sin muestras se asume el mejor throughput conocido: desempata el contexto
+            known = [c.tokens_per_second for c in fitting if c.tokens_per_second]
+            best = max(known) if known else 0.0
+            ranked = sorted(fitting, key=lambda c: (-(c.tokens_per_second or best), -c.context_tokens))
+            reason = f"prompt largo (~{request.prompt_tokens} tokens): contexto y throughput"
+        else:
+            # Sin muestras suficientes se asume la mejor latencia conocida (sorted es estable)
+            expected = {c.name: self._expected_latency(c) for c in fitting}
+            known = [value for value in expected.values() if value is not None]
+            best = min(known) if known else 0.0
+            ranked = sorted(fitting, key=lambda c: best if expected[c.name] is None else expected[c.name])
+            if known:
+                details = ", ".join(
+                    f"{c.name} {expected[c.name]:.1f}s" if expected[c.name] is not None else f"{c.name} s/d"
+                    for c in ranked
+                )
+                reason = f"latencia esperada ({details})"
+            else:
+                reason = "sin muestras de latencia, orden por defecto"
+
+        if too_small:
+            reason += f"; sin contexto suficiente: {', '.join(c.name for c in too_small)}"
+        return ranked + too_small, reason
+
+
+# Throughput observado (tokens de salida por segundo) por (proveedor, modelo)
+_throughput_windows: Dict[Tuple[str, str], LatencyWindow] = {}
+_throughput_lock = threading.Lock()
+
+
+def record_throughput(provider: str, model: str, completion_tokens: Optional[int], seconds: float) -> None:
+    """Registra los tokens de salida por segundo de una llamada exitosa."""
+    if not completion_tokens or seconds <= 0:
+        return
+    key = (provider, model)
+    with _throughput_lock:
+        window = _throughput_windows.get(key)
+        if window is None:
+            window = LatencyWindow(int(os.getenv("AI_LATENCY_WINDOW_SIZE", "100")))
+            _throughput_windows[key] = window
+    window.add(completion_tokens / seconds)
+
+
+def _throughput(provider: str, model: str) -> Optional[float]:
+    with _throughput_lock:
+        window = _throughput_windows.get((provider, model))
+    return window.quantile(0.5) if window is not None else None
+
+
+def candidate_stats(provider: str, model: str) -> CandidateStats:
+    """Estado observado actual de un proveedor/modelo."""
+    breaker = get_circuit_breaker(provider, model)
+    snapshot = breaker.snapshot()
+    window = get_latency_window(provider, model)
+    return CandidateStats(
+        provider=provider,
+        model=model,
+        latency_p50=window.quantile(0.5),
+        latency_p95=window.quantile(0.95),
+        samples=window.count(),
+        error_rate=snapshot["error_rate"],
+        breaker_open=breaker.is_open(),
+        context_tokens=model_context_tokens(model),
+        tokens_per_second=_throughput(provider, model),
+    )
+
+
+# Políticas registradas y decisiones recientes
+_policies: Dict[str, object] = {}
+_policies_lock = threading.Lock()
+_decisions: Deque[RoutingDecision] = deque(maxlen=200)
+
+
+def register_routing_policy(name: str, policy) -> None:
+    """Registra una política (objeto con `rank(candidates, request)`) bajo `name`."""
+    with _policies_lock:
+        _policies[name] = policy
+
+
+def get_routing_policy():
+    """Política configurada en AI_ROUTING_POLICY ("static" si el nombre no existe)."""
+    name = os.getenv("AI_ROUTING_POLICY", "adaptive").strip().lower()
+    with _policies_lock:
+        # Las incluidas se siembran aunque antes se haya registrado una política propia
+        if "static" not in _policies:
+            _policies["static"] = StaticPolicy()
+        if "adaptive" not in _policies:
+            _policies["adaptive"] = AdaptivePolicy(
+                long_prompt_tokens=int(os.getenv("AI_ROUTER_LONG_PROMPT_TOKENS", "6000")),
+                min_samples=int(os.getenv("AI_ROUTER_MIN_SAMPLES", "5")),
+                error_penalty=float(os.getenv("AI_ROUTER_ERROR_PENALTY", "2")),
+            )
+        policy = _policies.get(name)
+        if policy is None:
+            print(f"⚠️ Política de ruteo '{name}' desconocida, se usa 'static'")
+            policy = _policies["static"]
+        return policy
+
+
+def route(candidates: List[Tuple[str, str]], request: RouteRequest) -> List[Tuple[str, str]]:
+    """
+    Ordena los candidatos (proveedor, modelo) para una petición según la
+    política configurada. Los que tienen el circuito abierto van al final.
+    """
+    if len(candidates) < 2:
+        return list(candidates)
+
+    policy = get_routing_policy()
+    stats = [candidate_stats(provider, model) for provider, model in candidates]
+    try:
+        ranked, reason = policy.rank(stats, request)
+    except Exception as e:
+        print(f"⚠️ Política de ruteo {getattr(policy, 'name', policy)} falló: {type(e).__name__}: {str(e)}")
+        ranked, reason = stats, "orden por defecto (la política falló)"
+
+    open_breakers = [c for c in ranked if c.breaker_open]
+    if open_breakers and len(open_breakers) < len(ranked):
+        ranked = [c for c in ranked if not c.breaker_open] + open_breakers
+        reason += f"; circuito abierto: {', '.join(c.name for c in open_breakers)}"
+
+    decision = RoutingDecision(
+        policy=getattr(policy, "name", type(policy).__name__),
+        stage=request.stage,
+        prompt_tokens=request.prompt_tokens,
+        order=[c.name for c in ranked],
+        reason=reason,
+    )
+    _decisions.append(decision)
+    print(f"🧭 Ruteo [{decision.policy}] etapa '{request.stage}': {' → '.join(decision.order)} ({reason})")
+
+    return [(c.provider, c.model) for c in ranked]
+
+
+def get_routing_decisions(limit: Optional[int] = None) -> List[Dict]:
+    """Últimas decisiones de ruteo como dicts (de la más antigua a la más reciente)."""
+    decisions = [asdict(decision) for decision in list(_decisions)]
+    return decisions[-limit:] if limit else decisions
@@ -8,23 +8,123 @@ El objetivo es exponer una función simple:
     generate_cv_output(prompt: str) -> str
 
 que reciba un prompt y devuelva texto generado, con fallback automático
-si OpenAI falla.
+si OpenAI falla. `generate_cv_output_stream` ofrece la misma lógica
+emitiendo el texto por fragmentos a medida que llega.
+
+Núcleo asíncrono:
+    Todas las llamadas a los proveedores se ejecutan como corrutinas en un
+    único event loop compartido por el proceso (en un hilo en segundo plano).
+    `agenerate_cv_output` y `agenerate_cv_output_stream` son la API nativa
+    asyncio; las funciones síncronas solo delegan en ese loop, de modo que
+    muchas generaciones concurrentes (de varias sesiones de Streamlit) se
+    multiplexan sobre las mismas conexiones sin un hilo por llamada.
+
+Límite de tasa:
+    Antes de cada petición (y de cada reintento) se reserva cupo en los token
+    buckets del proveedor (`ai_rate_limit.py`), compartidos por todo el proceso.
+
+Métricas:
+    Cada generación emite un `CallRecord` (`ai_metrics.py`) con etapa,
+    proveedor, modelo, tokens informados por el proveedor, latencia, tiempo al
+    primer token, reintentos y fallback. Ver `get_prometheus_metrics()`.
+
+Single-flight (AI_SINGLE_FLIGHT_ENABLED=1 por defecto):
+    Peticiones idénticas simultáneas (mismo prompt, modelo, proveedor, etapa y
+    presupuesto) comparten una única llamada al proveedor (`ai_single_flight.py`).
+
+Lotes (generate_cv_outputs / iter_cv_outputs):
+    Varios prompts con concurrencia acotada (AI_BATCH_CONCURRENCY, por defecto
+    4); cada ítem conserva su propio error sin interrumpir al resto.
+
+Salida estructurada (response_schema):
+    Con un esquema JSON la respuesta es un JSON que lo cumple (function
+    calling en OpenAI, `response_schema` en Gemini) en lugar de markdown a
+    parsear con expresiones regulares. Ver `ats_analyzer.py`.
+
+Tamaño del prompt:
+    Cada prompt se mide localmente antes de enviarlo (`ai_tokens.py`). Los
+    candidatos en cuyo contexto no entra se omiten, y si supera
+    AI_MAX_PROMPT_TOKENS o no entra en ninguno se responde un error amigable
+    (estado "too_large") sin llamar al proveedor.
+
+Caché de prefijos:
+    Los prompts ponen las instrucciones estáticas primero y los documentos al
+    final (`prompts.py`); cada registro guarda la huella de ese prefijo y los
+    `cached_tokens` informados, resumidos en `get_prefix_cache_stats()`.
+
+Presupuestos de salida:
+    `max_tokens` se ajusta a cada etapa y al tamaño de su documento de
+    referencia (`ai_budgets.py`), con AI_MAX_OUTPUT_TOKENS como techo.
+
+Proveedor local (provider="local"):
+    Respuestas offline deterministas (cassettes grabados o sintéticas, ver
+    `ai_local.py`) para pruebas de carga sin red ni consumo de cuota.
+    AI_FORCE_PROVIDER=local lo aplica a todas las llamadas de la app.
+
+Ruteo (modo auto):
+    El orden de los proveedores lo decide una política de ruteo enchufable
+    (`ai_router.py`, AI_ROUTING_POLICY) según latencia y tasa de error
+    recientes y el tamaño del prompt; cada decisión queda en el log.
+
+Hedging (opcional, AI_HEDGE_ENABLED=1):
+    En modo auto, si el primer proveedor elegido no respondió dentro de un
+    cuantil de su latencia observada, se lanza el segundo en paralelo y gana
+    la primera respuesta válida.
+
+Arranque en frío:
+    Los SDKs de los proveedores no se importan al cargar este módulo sino en
+    el primer uso (o en segundo plano desde `warm_up_providers()`).
 
 Requisitos:
 - Variable de entorno OPENAI_API_KEY (primaria)
 - Variable de entorno GEMINI_API_KEY (fallback)
 - Paquetes:
     - python-dotenv
-    - openai>=1.0.0
+    - openai>=1.26.0
     - google-generativeai
 """
 
+import asyncio
+import contextvars
+import functools
+import json
 import os
-from typing import Optional
+import threading
+import time
+from typing import TYPE_CHECKING, AsyncIterator, Awaitable, Dict, Iterator, List, Optional, Tuple, TypeVar
 
 from dotenv import load_dotenv
-from openai import OpenAI
-import google.generativeai as genai
+
+from .ai_budgets import compute_output_budget
+from .ai_cache import get_response_cache, make_cache_key
+from .ai_local import get_local_provider, recording_enabled
+from .ai_retry import (
+    call_with_retries,
+    read_timeout,
+    reset_deadline,
+    retry_delay,
+    set_deadline,
+    stage_deadline,
+)
+from .ai_metrics import (
+    CallRecord,
+    emit_call_record,
+    get_recent_calls,
+    render_call_metrics,
+    render_gauges,
+    serve_prometheus,
+    summarize_prefix_cache,
+)
+from .ai_health import get_circuit_breaker, get_latency_window, get_provider_health, record_latency
+from .ai_rate_limit import estimate_request_tokens, get_rate_limit_status, get_rate_limiter
+from .ai_router import RouteRequest, get_routing_decisions, model_context_tokens, record_throughput, route
+from .ai_sessions import get_session_manager, preload_sdks
+from .ai_single_flight import SingleFlight
+from .ai_tokens import PromptTooLargeError, count_tokens, fits_context, max_prompt_tokens
+from .prompts import prefix_fingerprint
+
+if TYPE_CHECKING:
+    import google.generativeai as genai
 
 # Carga las variables de entorno desde un archivo .env (si existe).
 load_dotenv()
@@ -32,161 +132,590 @@ load_dotenv()
 # Modelos por defecto
 DEFAULT_OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 DEFAULT_GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-flash-latest")
+DEFAULT_LOCAL_MODEL = "local"
+
+# Instrucciones de sistema comunes a ambos proveedores
+SYSTEM_PROMPT = (
+    "Eres un asistente experto en redacción profesional. "
+    "Debes seguir EXACTAMENTE las instrucciones del usuario. "
+    "No debes inventar datos, habilidades, experiencia, logros "
+    "ni información no presente en el prompt. "
+    "Mantén un tono profesional, claro y preciso."
+)
 
-# Clientes globales reutilizables
-_openai_client: Optional[OpenAI] = None
-_gemini_configured: bool = False
+# Parámetros de muestreo (forman parte de la clave de caché junto con max_tokens,
+# que se calcula por llamada en ai_budgets)
+GENERATION_PARAMS = {
+    "temperature": 0.1,
+    "top_p": 1,
+}
 
+# Nombres para mostrar en logs
+_PROVIDER_LABELS = {
+    "openai": "OpenAI",
+    "gemini": "Gemini",
+    "local": "Local",
+}
 
-def _get_openai_client() -> Optional[OpenAI]:
+
+@functools.lru_cache(maxsize=64)
+def _gemini_generation_config(max_tokens: int,
+                              schema_json: Optional[str] = None) -> "genai.types.GenerationConfig":
     """
-    Devuelve una instancia de cliente de OpenAI.
-    Retorna None si no encuentra la API key configurada.
+    Configuración de generación de Gemini (se construye una vez por presupuesto
+    y esquema). Con `schema_json` la respuesta es un JSON que cumple ese esquema.
     """
-    global _openai_client
+    import google.generativeai as genai
+
+    structured = {}
+    if schema_json:
+        structured = {"response_mime_type": "application/json", "response_schema": json.loads(schema_json)}
+    return genai.types.GenerationConfig(
+        temperature=GENERATION_PARAMS["temperature"],
+        top_p=GENERATION_PARAMS["top_p"],
+        max_output_tokens=max_tokens,
+        **structured,
+    )
+
+
+T = TypeVar("T")
 
-    if _openai_client is None:
-        api_key = os.getenv("OPENAI_API_KEY")
-        if api_key:
-            _openai_client = OpenAI(api_key=api_key)
+# Contadores de hedging en modo auto (ver _agenerate_hedged)
+_hedge_stats = {
+    "requests": 0,
+    "hedged": 0,
+    "primary_wins": 0,
+    "hedge_wins": 0,
+}
 
-    return _openai_client
+# Peticiones idénticas en curso (ver _agenerate_shared / _astream_shared)
+_single_flight = SingleFlight()
 
+# Registro de métricas de la generación en curso (ver _agenerate)
+_current_call: contextvars.ContextVar[Optional[CallRecord]] = contextvars.ContextVar(
+    "ai_current_call", default=None
+)
 
-def _configure_gemini() -> bool:
+# Esquema JSON de la respuesta estructurada en curso (ver `response_schema`)
+_response_schema: contextvars.ContextVar[Optional[Dict]] = contextvars.ContextVar(
+    "ai_response_schema", default=None
+)
+
+# Función que el modelo de OpenAI "llama" para entregar la respuesta estructurada
+STRUCTURED_FUNCTION_NAME = "entregar_resultado"
+
+
+def _schema_json() -> Optional[str]:
+    """Esquema de la respuesta estructurada en curso, serializado (o None)."""
+    schema = _response_schema.get()
+    return json.dumps(schema, sort_keys=True, ensure_ascii=False) if schema is not None else None
+
+
+def _structured_params(params: Dict) -> Dict:
+    """Agrega el esquema en curso a los parámetros de una clave de caché."""
+    schema = _response_schema.get()
+    if schema is not None:
+        params["response_schema"] = schema
+    return params
+
+# Event loop compartido por todo el proceso
+_event_loop: Optional[asyncio.AbstractEventLoop] = None
+_event_loop_lock = threading.Lock()
+
+
+def _get_event_loop() -> asyncio.AbstractEventLoop:
     """
-    Configura el cliente de Gemini.
-    Retorna True si se configuró exitosamente.
+    Devuelve el event loop compartido, creándolo en un hilo daemon la primera vez.
+    Los clientes asíncronos de los proveedores quedan ligados a este loop.
     """
-    global _gemini_configured
-    
-    # Siempre reconfigurar para asegurar que esté actualizado
-    api_key = os.getenv("GEMINI_API_KEY")
-    if api_key:
-        genai.configure(api_key=api_key)
-        _gemini_configured = True
-        return True
-    
-    return False
+    global _event_loop
+
+    with _event_loop_lock:
+        if _event_loop is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="ai-event-loop", daemon=True)
+            thread.start()
+            _event_loop = loop
+
+    return _event_loop
 
 
-def _generate_with_openai(prompt: str, model: str) -> Optional[str]:
+def _run_sync(coro: Awaitable[T]) -> T:
+    """Ejecuta una corrutina en el loop compartido y bloquea hasta su resultado."""
+    return asyncio.run_coroutine_threadsafe(coro, _get_event_loop()).result()
+
+
+async def _on_shared_loop(coro: Awaitable[T]) -> T:
     """
-    Intenta generar contenido con OpenAI.
-    Retorna el texto generado o None si falla.
+    Espera `coro` garantizando que corra en el loop compartido.
+    Permite usar la API asíncrona desde otro event loop (ej. un servidor ASGI).
     """
-    try:
-        # Obtener cliente fresco cada vez para evitar problemas de caché
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            print("⚠️ OpenAI: No se encontró OPENAI_API_KEY")
-            return None
-        
-        client = OpenAI(api_key=api_key)
-
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "Eres un asistente experto en redacción profesional. "
-                        "Debes seguir EXACTAMENTE las instrucciones del usuario. "
-                        "No debes inventar datos, habilidades, experiencia, logros "
-                        "ni información no presente en el prompt. "
-                        "Mantén un tono profesional, claro y preciso."
-                    ),
-                },
-                {
-                    "role": "user",
-                    "content": prompt,
-                }
-            ],
-            temperature=0.1,
-            top_p=1,
-            max_tokens=7000,
-            frequency_penalty=0,
-            presence_penalty=0
-        )
+    loop = _get_event_loop()
+    if asyncio.get_running_loop() is loop:
+        return await coro
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
 
-        return response.choices[0].message.content
 
-    except Exception as e:
-        error_msg = f"{type(e).__name__}: {str(e)}"
-        print(f"❌ OpenAI error: {error_msg}")
+async def _anext(agen: AsyncIterator[T]) -> T:
+    """Envuelve `__anext__` en una corrutina para poder enviarla a otro loop."""
+    return await agen.__anext__()
+
+
+async def _aclose(agen) -> None:
+    await agen.aclose()
+
+
+async def _awarm_up() -> dict:
+    status = await get_session_manager().awarm_up(
+        openai_model=DEFAULT_OPENAI_MODEL,
+        gemini_model=DEFAULT_GEMINI_MODEL,
+    )
+    print(f"🔥 Warm-up de proveedores IA: {status}")
+    return status
+
+
+def warm_up_providers() -> dict:
+    """
+    Pre-construye los clientes de ambos proveedores y abre sus conexiones.
+    Pensado para ejecutarse una vez al iniciar la app (idealmente en segundo plano).
+
+    Los SDKs se importan antes, en el hilo que llama, para no bloquear con
+    la importación el event loop compartido.
+    """
+    preload_sdks()
+    return _run_sync(_awarm_up())
+
+
+def _openai_usage(usage, out: Optional[Dict]) -> None:
+    """Copia a `out` los tokens informados por OpenAI (`usage` de la respuesta)."""
+    if out is None or usage is None:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    out.update(
+        prompt_tokens=usage.prompt_tokens,
+        completion_tokens=usage.completion_tokens,
+        cached_tokens=getattr(details, "cached_tokens", None),
+    )
+
+
+def _gemini_usage(metadata, out: Optional[Dict]) -> None:
+    """Copia a `out` los tokens informados por Gemini (`usage_metadata` de la respuesta)."""
+    if out is None or metadata is None:
+        return
+    out.update(
+        prompt_tokens=getattr(metadata, "prompt_token_count", None),
+        completion_tokens=getattr(metadata, "candidates_token_count", None),
+        cached_tokens=getattr(metadata, "cached_content_token_count", None),
+    )
+
+
+def _mark_truncated(truncated: bool, out: Optional[Dict]) -> None:
+    """Anota en `out` si la respuesta se cortó por alcanzar el presupuesto de salida."""
+    if out is not None and truncated:
+        out["truncated"] = True
+
+
+def _gemini_hit_limit(response) -> bool:
+    """True si Gemini terminó por alcanzar max_output_tokens."""
+    candidates = getattr(response, "candidates", None) or []
+    return any(getattr(c.finish_reason, "name", "") == "MAX_TOKENS" for c in candidates)
+
+
+async def _agenerate_with_openai(prompt: str, model: str, max_tokens: int,
+                                 usage: Optional[Dict] = None) -> Optional[str]:
+    """
+    Genera contenido con OpenAI, con a lo sumo `max_tokens` de salida.
+    Retorna el texto generado, None si no hay API key, o lanza el error del
+    proveedor (los reintentos se deciden en `_agenerate_cached`).
+    Si se pasa `usage`, se completa con los tokens consumidos.
+    """
+    # Cliente compartido; solo se reconstruye si cambia la API key
+    client = get_session_manager().get_openai_client()
+    if client is None:
+        print("⚠️ OpenAI: No se encontró OPENAI_API_KEY")
         return None
 
+    schema = _response_schema.get()
+    structured = {}
+    if schema is not None:
+        # Function calling forzado: la respuesta son los argumentos de la función
+        structured = {
+            "tools": [{
+                "type": "function",
+                "function": {"name": STRUCTURED_FUNCTION_NAME, "parameters": schema},
+            }],
+            "tool_choice": {"type": "function", "function": {"name": STRUCTURED_FUNCTION_NAME}},
+        }
 
-def _generate_with_gemini(prompt: str, model: str) -> Optional[str]:
+    response = await client.chat.completions.create(
+        model=model,
+        messages=[
+            {
+                "role": "system",
+                "content": SYSTEM_PROMPT,
+            },
+            {
+                "role": "user",
+                "content": prompt,
+            }
+        ],
+        temperature=GENERATION_PARAMS["temperature"],
+        top_p=GENERATION_PARAMS["top_p"],
+        max_tokens=max_tokens,
+        frequency_penalty=0,
+        presence_penalty=0,
+        **structured
+    )
+
+    _openai_usage(response.usage, usage)
+    _mark_truncated(response.choices[0].finish_reason == "length", usage)
+    message = response.choices[0].message
+    if schema is not None and message.tool_calls:
+        return message.tool_calls[0].function.arguments
+    return message.content
+
+
+async def _agenerate_with_gemini(prompt: str, model: str, max_tokens: int,
+                                 usage: Optional[Dict] = None) -> Optional[str]:
+    """
+    Genera contenido con Gemini, con a lo sumo `max_tokens` de salida.
+    Retorna el texto generado, None si no hay API key, o lanza el error del
+    proveedor (los reintentos se deciden en `_agenerate_cached`).
+    Si se pasa `usage`, se completa con los tokens consumidos.
+    """
+    # Modelo compartido; genai.configure solo se repite si cambia la API key
+    model_instance = get_session_manager().get_gemini_model(model)
+    if model_instance is None:
+        print("⚠️ Gemini: No se encontró GEMINI_API_KEY")
+        return None
+
+    # Construir prompt completo con instrucciones del sistema
+    full_prompt = f"{SYSTEM_PROMPT}\n\n{prompt}"
+
+    response = await model_instance.generate_content_async(
+        full_prompt,
+        generation_config=_gemini_generation_config(max_tokens, _schema_json()),
+        request_options={"timeout": read_timeout()},
+    )
+
+    _gemini_usage(response.usage_metadata, usage)
+    _mark_truncated(_gemini_hit_limit(response), usage)
+    return response.text
+
+
+async def _astream_with_openai(prompt: str, model: str, max_tokens: int,
+                               usage: Optional[Dict] = None) -> AsyncIterator[str]:
     """
-    Intenta generar contenido con Gemini.
-    Retorna el texto generado o None si falla.
+    Genera contenido con OpenAI en streaming.
+    Lanza la excepción del proveedor si falla (el llamador decide el fallback).
+    Si se pasa `usage`, se completa con los tokens consumidos al terminar.
     """
+    client = get_session_manager().get_openai_client()
+    if client is None:
+        raise RuntimeError("No se encontró OPENAI_API_KEY")
+
+    stream = await client.chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ],
+        temperature=GENERATION_PARAMS["temperature"],
+        top_p=GENERATION_PARAMS["top_p"],
+        max_tokens=max_tokens,
+        frequency_penalty=0,
+        presence_penalty=0,
+        stream=True,
+        # El último fragmento trae el consumo de tokens (sin choices)
+        stream_options={"include_usage": True},
+    )
+
     try:
-        if not _configure_gemini():
-            print("⚠️ Gemini: No se encontró GEMINI_API_KEY")
-            return None
-
-        # Construir prompt completo con instrucciones del sistema
-        full_prompt = (
-            "Eres un asistente experto en redacción profesional. "
-            "Debes seguir EXACTAMENTE las instrucciones del usuario. "
-            "No debes inventar datos, habilidades, experiencia, logros "
-            "ni información no presente en el prompt. "
-            "Mantén un tono profesional, claro y preciso.\n\n"
-            f"{prompt}"
-        )
+        async for chunk in stream:
+            if chunk.usage is not None:
+                _openai_usage(chunk.usage, usage)
+            if chunk.choices and chunk.choices[0].finish_reason == "length":
+                _mark_truncated(True, usage)
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    finally:
+        # Libera la conexión si el consumidor abandona el stream antes de terminar
+        await stream.close()
 
-        model_instance = genai.GenerativeModel(model)
-        
-        # Configuración de seguridad más permisiva
-        safety_settings = [
-            {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
-            {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
-            {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
-            {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
-        ]
-        
-        response = model_instance.generate_content(
-            full_prompt,
-            generation_config=genai.types.GenerationConfig(
-                temperature=0.1,
-                top_p=1,
-                max_output_tokens=7000,
-            ),
-            safety_settings=safety_settings
-        )
 
-        return response.text
+async def _astream_with_gemini(prompt: str, model: str, max_tokens: int,
+                               usage: Optional[Dict] = None) -> AsyncIterator[str]:
+    """
+    Genera contenido con Gemini en streaming.
+    Lanza la excepción del proveedor si falla (el llamador decide el fallback).
+    Si se pasa `usage`, se completa con los tokens consumidos al terminar.
+    """
+    model_instance = get_session_manager().get_gemini_model(model)
+    if model_instance is None:
+        raise RuntimeError("No se encontró GEMINI_API_KEY")
 
+    response = await model_instance.generate_content_async(
+        f"{SYSTEM_PROMPT}\n\n{prompt}",
+        generation_config=_gemini_generation_config(max_tokens),
+        stream=True,
+        request_options={"timeout": read_timeout()},
+    )
+
+    async for chunk in response:
+        # Cada fragmento trae el consumo acumulado; el último es el total
+        _gemini_usage(chunk.usage_metadata, usage)
+        _mark_truncated(_gemini_hit_limit(chunk), usage)
+        if chunk.parts:
+            yield chunk.text
+
+
+async def _agenerate_with_local(prompt: str, model: str, max_tokens: int,
+                                usage: Optional[Dict] = None) -> Optional[str]:
+    """Genera contenido con el proveedor local offline (cassette o respuesta sintética)."""
+    return await get_local_provider().agenerate(SYSTEM_PROMPT, prompt, usage, max_tokens,
+                                                structured=_response_schema.get() is not None)
+
+
+async def _astream_with_local(prompt: str, model: str, max_tokens: int,
+                              usage: Optional[Dict] = None) -> AsyncIterator[str]:
+    """Genera contenido con el proveedor local offline en streaming."""
+    async for chunk in get_local_provider().astream(SYSTEM_PROMPT, prompt, usage, max_tokens):
+        yield chunk
+
+
+_GENERATORS = {
+    "openai": _agenerate_with_openai,
+    "gemini": _agenerate_with_gemini,
+    "local": _agenerate_with_local,
+}
+
+_STREAMERS = {
+    "openai": _astream_with_openai,
+    "gemini": _astream_with_gemini,
+    "local": _astream_with_local,
+}
+
+
+async def _acquire_rate_limit(provider: str, prompt: str, max_tokens: int) -> float:
+    """
+    Espera turno en el limitador de tasa del proveedor (si tiene límites configurados).
+    Retorna los segundos esperados en cola, que no cuentan como latencia del proveedor.
+    """
+    limiter = get_rate_limiter(provider)
+    if limiter is None:
+        return 0.0
+    return await limiter.acquire(estimate_request_tokens(f"{SYSTEM_PROMPT}\n\n{prompt}", max_tokens))
+
+
+def get_rate_limiter_status() -> dict:
+    """Cupo disponible y profundidad de cola de los limitadores de tasa por proveedor."""
+    return get_rate_limit_status()
+
+
+def _cache_key(provider: str, prompt: str, model: str, max_tokens: int) -> str:
+    """Clave de caché para una petición a un proveedor/modelo concreto."""
+    params = _structured_params(dict(GENERATION_PARAMS, max_tokens=max_tokens))
+    return make_cache_key(provider, model, SYSTEM_PROMPT, prompt, params)
+
+
+def _get_cached(provider: str, prompt: str, model: str, max_tokens: int) -> Optional[str]:
+    """Busca una respuesta previa idéntica en la caché."""
+    cache = get_response_cache()
+    if cache is None:
+        return None
+
+    cached = cache.get(_cache_key(provider, prompt, model, max_tokens))
+    if cached is not None:
+        print(f"⚡ Respuesta obtenida de caché ({provider}/{model})")
+    return cached
+
+
+def _store_cached(provider: str, prompt: str, model: str, max_tokens: int, result: str) -> None:
+    """Guarda una respuesta exitosa en la caché (y como cassette si se está grabando)."""
+    cache = get_response_cache()
+    if cache is not None:
+        cache.set(_cache_key(provider, prompt, model, max_tokens), result)
+
+    if provider != "local" and recording_enabled():
+        try:
+            get_local_provider().record(SYSTEM_PROMPT, prompt, result, provider, model)
+        except OSError as e:
+            print(f"⚠️ No se pudo grabar el cassette: {type(e).__name__}: {str(e)}")
+
+
+async def _agenerate_cached(provider: str, prompt: str, model: str, max_tokens: int,
+                            lookup: bool = True) -> Optional[str]:
+    """
+    Genera con el proveedor indicado consultando antes la caché.
+    Solo se guardan respuestas exitosas.
+
+    lookup=False omite la consulta (cuando el llamador ya la hizo).
+    """
+    if lookup:
+        cached = _get_cached(provider, prompt, model, max_tokens)
+        if cached is not None:
+            _mark_cache_hit(provider, model)
+            return cached
+
+    breaker = get_circuit_breaker(provider, model)
+    if not breaker.allow_request():
+        print(f"🚫 {_PROVIDER_LABELS[provider]} ({model}): circuito abierto, se omite la llamada")
+        return None
+
+    record = _current_call.get()
+    usage: Dict = {}
+    queued = 0.0
+    attempts = 0
+
+    async def attempt() -> Optional[str]:
+        # Cada intento (reintentos incluidos) consume cupo del limitador
+        nonlocal queued, attempts
+        attempts += 1
+        usage.clear()
+        queued += await _acquire_rate_limit(provider, prompt, max_tokens)
+        return await _GENERATORS[provider](prompt, model, max_tokens, usage)
+
+    label = _PROVIDER_LABELS[provider]
+    started = time.monotonic()
+    try:
+        result = await call_with_retries(attempt, label)
+    except asyncio.CancelledError:
+        breaker.release()
+        raise
     except Exception as e:
         error_msg = f"{type(e).__name__}: {str(e)}"
-        print(f"❌ Gemini error: {error_msg}")
-        return None
+        print(f"❌ {label} error: {error_msg}")
+        result = None
+    latency = time.monotonic() - started - queued
+
+    if record is not None:
+        record.retries += max(0, attempts - 1)
+        if result or record.provider is None:
+            record.provider, record.model = provider, model
+        if result:
+            record.status = "ok"
+            record.add_usage(usage)
+            record.truncated = bool(usage.get("truncated"))
+
+    if result:
+        breaker.record_success(latency)
+        record_latency(provider, model, latency)
+        record_throughput(provider, model, usage.get("completion_tokens"), latency)
+        _store_cached(provider, prompt, model, max_tokens, result)
+    else:
+        breaker.record_failure(latency)
+
+    return result
+
 
+def _mark_cache_hit(provider: str, model: str) -> None:
+    """Anota en el registro de métricas en curso que la respuesta salió de caché."""
+    record = _current_call.get()
+    if record is not None:
+        record.status = "cache"
+        record.provider, record.model = provider, model
 
-def generate_cv_output(prompt: str, model: Optional[str] = None, provider: str = "auto") -> str:
+
+def _finish_record(record: CallRecord, requested_model: Optional[str], started: float,
+                   result_chars: int) -> None:
+    """Completa latencia, fallback y tamaño del resultado, y emite el registro."""
+    record.latency_seconds = round(time.monotonic() - started, 4)
+    if record.truncated:
+        print(f"✂️ Etapa '{record.stage}': la respuesta alcanzó el presupuesto de {record.output_budget} tokens")
+    if record.status in ("ok", "cache"):
+        record.result_chars = result_chars
+    if record.cached_tokens:
+        print(f"♻️ Etapa '{record.stage}': {record.cached_tokens}/{record.prompt_tokens} tokens de entrada "
+              f"servidos desde la caché de prefijos del proveedor")
+    if record.provider is not None:
+        first = record.routed_to or "/".join(_resolve_candidates(record.requested_provider, requested_model)[0])
+        record.fallback = f"{record.provider}/{record.model}" != first
+    emit_call_record(record)
+
+
+def get_cache_stats() -> dict:
+    """Devuelve los contadores de la caché de respuestas (vacío si está desactivada)."""
+    cache = get_response_cache()
+    return cache.stats() if cache is not None else {}
+
+
+def _resolve_candidates(provider: str, model: Optional[str]) -> List[Tuple[str, str]]:
     """
-    Genera texto del CV usando IA con fallback automático o proveedor específico.
+    Devuelve la lista ordenada de (proveedor, modelo) a intentar.
+    En modo auto el modelo elegido aplica a OpenAI y Gemini usa su modelo por defecto.
+    """
+    if provider == "openai":
+        return [("openai", model or DEFAULT_OPENAI_MODEL)]
+    if provider == "gemini":
+        return [("gemini", model or DEFAULT_GEMINI_MODEL)]
+    if provider == "local":
+        return [("local", model or DEFAULT_LOCAL_MODEL)]
+    return [
+        ("openai", model or DEFAULT_OPENAI_MODEL),
+        ("gemini", DEFAULT_GEMINI_MODEL),
+    ]
 
-    Parámetros:
-        prompt: Instrucciones completas que describen la tarea a la IA.
-        model: Nombre del modelo a utilizar (opcional).
-        provider: "auto" (fallback), "openai", o "gemini"
 
-    Retorna:
-        Texto generado por el modelo o un mensaje de error amigable.
+def _fit_candidates(candidates: List[Tuple[str, str]], prompt: str, max_tokens: int,
+                    record: Optional[CallRecord]) -> Tuple[List[Tuple[str, str]], int]:
+    """
+    Mide el prompt antes de enviarlo y descarta los candidatos en cuya ventana
+    de contexto no entra. Retorna (candidatos, tokens del prompt).
+
+    Lanza `PromptTooLargeError` sin tocar la red si el prompt supera
+    AI_MAX_PROMPT_TOKENS o no entra en ningún candidato.
+    """
+    stage = record.stage if record is not None else "general"
+    prompt_tokens = count_tokens(f"{SYSTEM_PROMPT}\n\n{prompt}", candidates[0][1])
+    if record is not None:
+        record.estimated_prompt_tokens = prompt_tokens
+
+    limit = max_prompt_tokens()
+    if limit and prompt_tokens > limit:
+        print(f"📏 Etapa '{stage}': prompt de ~{prompt_tokens} tokens supera AI_MAX_PROMPT_TOKENS={limit}")
+        raise PromptTooLargeError(prompt_tokens, limit, stage)
+
+    fitting = [c for c in candidates if fits_context(prompt_tokens, c[1], max_tokens)]
+    for candidate_provider, candidate_model in candidates:
+        if (candidate_provider, candidate_model) not in fitting:
+            print(f"📏 {_PROVIDER_LABELS[candidate_provider]} ({candidate_model}): ~{prompt_tokens} tokens "
+                  f"de entrada no entran en su contexto, se omite")
+    if not fitting:
+        context = max(model_context_tokens(candidate_model) for _, candidate_model in candidates)
+        raise PromptTooLargeError(prompt_tokens, context - max_tokens, stage)
+    return fitting, prompt_tokens
+
+
+def _route_candidates(candidates: List[Tuple[str, str]], prompt_tokens: int, max_tokens: int,
+                      record: Optional[CallRecord]) -> List[Tuple[str, str]]:
     """
-    # Proveedor específico: solo OpenAI
+    Ordena los candidatos con la política de ruteo configurada (`ai_router.py`):
+    latencia y errores recientes, tamaño del prompt y circuitos abiertos al final.
+    """
+    request = RouteRequest(
+        stage=record.stage if record is not None else "general",
+        prompt_tokens=prompt_tokens,
+        max_tokens=max_tokens,
+    )
+    ordered = route(candidates, request)
+    if record is not None and ordered:
+        record.routed_to = "/".join(ordered[0])
+    return ordered
+
+
+def get_routing_log(limit: Optional[int] = None) -> List[dict]:
+    """Últimas decisiones de ruteo (política, etapa, orden elegido y motivo)."""
+    return get_routing_decisions(limit)
+
+
+def get_health_snapshot() -> dict:
+    """Foto del estado de salud de los proveedores (para el sidebar y los logs)."""
+    return get_provider_health()
+
+
+def _failure_message(provider: str) -> str:
+    """Mensaje de error amigable cuando ningún proveedor pudo generar contenido."""
     if provider == "openai":
-        openai_model = model if model else DEFAULT_OPENAI_MODEL
-        print(f"🔄 Generando con OpenAI ({openai_model})...")
-        result = _generate_with_openai(prompt, openai_model)
-        
-        if result:
-            print("✅ Contenido generado exitosamente con OpenAI")
-            return result
-        
         return (
             "⚠️ No se pudo generar contenido con OpenAI.\n\n"
             "Por favor verifica:\n"
@@ -196,17 +725,8 @@ def generate_cv_output(prompt: str, model: Optional[str] = None, provider: str =
             "- No se excedieron los límites de uso\n\n"
             "Prueba cambiar a 'Gemini' o 'Auto' en el selector del sidebar."
         )
-    
-    # Proveedor específico: solo Gemini
+
     if provider == "gemini":
-        gemini_model = model if model else DEFAULT_GEMINI_MODEL
-        print(f"🔄 Generando con Gemini ({gemini_model})...")
-        result = _generate_with_gemini(prompt, gemini_model)
-        
-        if result:
-            print("✅ Contenido generado exitosamente con Gemini")
-            return result
-        
         return (
             "⚠️ No se pudo generar contenido con Gemini.\n\n"
             "Por favor verifica:\n"
@@ -216,27 +736,14 @@ def generate_cv_output(prompt: str, model: Optional[str] = None, provider: str =
             "- No se excedieron los límites de uso\n\n"
             "Prueba cambiar a 'OpenAI' o 'Auto' en el selector del sidebar."
         )
-    
-    # Modo auto: fallback automático
-    # Intentar con OpenAI primero
-    openai_model = model or DEFAULT_OPENAI_MODEL
-    print(f"🔄 Intentando generar con OpenAI ({openai_model})...")
-    result = _generate_with_openai(prompt, openai_model)
-    
-    if result:
-        print("✅ Contenido generado exitosamente con OpenAI")
-        return result
-    
-    # Fallback a Gemini
-    gemini_model = DEFAULT_GEMINI_MODEL
-    print(f"🔄 OpenAI no disponible, intentando con Gemini ({gemini_model})...")
-    result = _generate_with_gemini(prompt, gemini_model)
-    
-    if result:
-        print("✅ Contenido generado exitosamente con Gemini")
-        return result
-    
-    # Si ambos fallan
+
+    if provider == "local":
+        return (
+            "⚠️ No se pudo generar contenido con el proveedor local.\n\n"
+            "Con AI_LOCAL_MODE=strict solo se responden prompts con cassette grabado "
+            "en AI_LOCAL_CASSETTE_DIR."
+        )
+
     return (
         "⚠️ No se pudo generar contenido con ninguna API de IA.\n\n"
         "El sistema intentó usar:\n"
@@ -248,3 +755,650 @@ def generate_cv_output(prompt: str, model: Optional[str] = None, provider: str =
         "- Hay conexión a internet\n"
         "- No se excedieron los límites de uso\n"
     )
+
+
+def _hedging_enabled() -> bool:
+    return os.getenv("AI_HEDGE_ENABLED", "0") == "1"
+
+
+def _hedge_delay(provider: str, model: str) -> float:
+    """
+    Segundos a esperar al proveedor primario antes de lanzar el secundario.
+
+    Es el cuantil AI_HEDGE_QUANTILE de las latencias observadas del primario
+    (así solo se duplica el ~(1-q) de peticiones más lentas). Mientras no haya
+    suficientes muestras se usa AI_HEDGE_DEFAULT_DELAY.
+    """
+    window = get_latency_window(provider, model)
+    min_delay = float(os.getenv("AI_HEDGE_MIN_DELAY", "2"))
+
+    if window.count() < int(os.getenv("AI_HEDGE_MIN_SAMPLES", "10")):
+        return max(min_delay, float(os.getenv("AI_HEDGE_DEFAULT_DELAY", "20")))
+
+    quantile = window.quantile(float(os.getenv("AI_HEDGE_QUANTILE", "0.9")))
+    return max(min_delay, quantile or 0.0)
+
+
+def get_hedge_stats() -> dict:
+    """Devuelve contadores de hedging: peticiones, hedges lanzados y quién ganó."""
+    stats = dict(_hedge_stats)
+    stats["hedge_rate"] = round(stats["hedged"] / stats["requests"], 3) if stats["requests"] else 0.0
+    return stats
+
+
+def get_call_metrics(limit: Optional[int] = None) -> List[dict]:
+    """Últimos registros de llamadas (etapa, proveedor, tokens, latencias...)."""
+    return get_recent_calls(limit)
+
+
+def get_prefix_cache_stats(limit: Optional[int] = None) -> List[dict]:
+    """
+    Aprovechamiento de la caché de prefijos de los proveedores, por etapa y
+    huella del prefijo estático del prompt (ver `prompts.prefix_fingerprint`).
+    """
+    return summarize_prefix_cache(get_recent_calls(limit))
+
+
+def get_prometheus_metrics() -> str:
+    """
+    Métricas en formato de texto de Prometheus: llamadas agregadas más el estado
+    actual de la caché, el hedging, los circuit breakers y los limitadores de tasa.
+    """
+    sections = [render_call_metrics()]
+
+    cache_stats = get_cache_stats()
+    if cache_stats:
+        sections.append(render_gauges(
+            "ai_cache_events", "Eventos de la caché de respuestas desde el arranque",
+            {(("event", name),): cache_stats[name]
+             for name in ("hits_memory", "hits_disk", "misses", "sets", "evictions", "expirations")},
+        ))
+        sections.append(render_gauges(
+            "ai_cache_entries", "Entradas en la caché en memoria",
+            {(): cache_stats["entries_memory"]},
+        ))
+
+    sections.append(render_gauges(
+        "ai_single_flight_events", "Peticiones líderes, coalescidas y en curso del single-flight",
+        {(("event", name),): value for name, value in get_single_flight_stats().items()},
+    ))
+
+    sections.append(render_gauges(
+        "ai_hedge_events", "Peticiones en modo auto con hedging y quién ganó",
+        {(("event", name),): value for name, value in _hedge_stats.items()},
+    ))
+
+    states = {"closed": 0, "half_open": 1, "open": 2}
+    health = get_provider_health()
+    if health:
+        sections.append(render_gauges(
+            "ai_breaker_state", "Estado del circuit breaker (0 cerrado, 1 semiabierto, 2 abierto)",
+            {(("target", name),): states.get(snapshot["state"], 0) for name, snapshot in health.items()},
+        ))
+
+    limits = get_rate_limit_status()
+    if limits:
+        sections.append(render_gauges(
+            "ai_rate_limit_queue_depth", "Peticiones esperando cupo del limitador de tasa",
+            {(("provider", name),): status["queue_depth"] for name, status in limits.items()},
+        ))
+
+    return "".join(sections)
+
+
+def start_metrics_exporter() -> bool:
+    """
+    Inicia el endpoint /metrics de Prometheus si AI_METRICS_PORT está configurado.
+    Retorna True si quedó escuchando.
+    """
+    port = os.getenv("AI_METRICS_PORT", "").strip()
+    if not port:
+        return False
+    try:
+        serve_prometheus(int(port), get_prometheus_metrics)
+        return True
+    except (OSError, ValueError) as e:
+        print(f"⚠️ No se pudo iniciar el exporter de métricas: {type(e).__name__}: {str(e)}")
+        return False
+
+
+async def _agenerate_hedged(prompt: str, candidates: List[Tuple[str, str]], max_tokens: int) -> Optional[str]:
+    """
+    Modo auto con hedging: lanza el primario y, si no respondió dentro del
+    retardo de hedge, lanza también el secundario en paralelo. Se devuelve la
+    primera respuesta válida y se cancela la otra petición.
+    """
+    (primary_provider, primary_model), (secondary_provider, secondary_model) = candidates[:2]
+    primary_label = _PROVIDER_LABELS[primary_provider]
+    secondary_label = _PROVIDER_LABELS[secondary_provider]
+
+    _hedge_stats["requests"] += 1
+    delay = _hedge_delay(primary_provider, primary_model)
+
+    print(f"🔄 Generando con {primary_label} ({primary_model}), hedge a los {delay:.1f}s...")
+    primary = asyncio.ensure_future(
+        _agenerate_cached(primary_provider, prompt, primary_model, max_tokens, lookup=False)
+    )
+    tasks = {primary: primary_label}
+
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+
+        if done:
+            # El primario terminó antes del retardo: no hace falta hedge
+            result = primary.result()
+            if result:
+                _hedge_stats["primary_wins"] += 1
+                print(f"✅ Contenido generado exitosamente con {primary_label}")
+                return result
+            print(f"⚠️ {primary_label} no disponible, probando {secondary_label} ({secondary_model})...")
+            result = await _agenerate_cached(secondary_provider, prompt, secondary_model, max_tokens,
+                                             lookup=False)
+            if result:
+                print(f"✅ Contenido generado exitosamente con {secondary_label}")
+            return result
+
+        _hedge_stats["hedged"] += 1
+        print(f"⏱️ {primary_label} supera {delay:.1f}s, lanzando hedge con {secondary_label} ({secondary_model})...")
+        secondary = asyncio.ensure_future(
+            _agenerate_cached(secondary_provider, prompt, secondary_model, max_tokens, lookup=False)
+        )
+        tasks[secondary] = secondary_label
+
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                result = task.result()
+                if result:
+                    _hedge_stats["primary_wins" if task is primary else "hedge_wins"] += 1
+                    print(f"✅ Contenido generado exitosamente con {tasks[task]} (hedge)")
+                    return result
+
+        return None
+
+    finally:
+        # Cancelar la petición perdedora (o ambas si el llamador fue cancelado)
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+def _apply_forced_provider(provider: str, model: Optional[str]) -> Tuple[str, Optional[str]]:
+    """
+    Aplica AI_FORCE_PROVIDER (ej. "local" en pruebas de carga sin red),
+    que reemplaza al proveedor elegido en todas las llamadas.
+    """
+    forced = os.getenv("AI_FORCE_PROVIDER", "").strip().lower()
+    if forced and forced != provider:
+        return forced, None
+    return provider, model
+
+
+def _deadline_message(seconds: float) -> str:
+    """Mensaje amigable cuando una etapa agota su plazo."""
+    return (
+        f"⚠️ La generación superó el tiempo máximo de {seconds:.0f} segundos.\n\n"
+        "Los proveedores de IA están respondiendo con lentitud en este momento. "
+        "Por favor intenta nuevamente en unos minutos o prueba cambiar de "
+        "proveedor en el selector del sidebar."
+    )
+
+
+async def _agenerate_candidates(prompt: str, model: Optional[str], provider: str, max_tokens: int) -> str:
+    """Recorre los proveedores candidatos (con caché, hedging y fallback)."""
+    candidates = _resolve_candidates(provider, model)
+
+    # Si alguno de los proveedores ya respondió este mismo prompt,
+    # devolver esa respuesta sin tocar la red
+    for candidate_provider, candidate_model in candidates:
+        result = _get_cached(candidate_provider, prompt, candidate_model, max_tokens)
+        if result:
+            _mark_cache_hit(candidate_provider, candidate_model)
+            return result
+
+    record = _current_call.get()
+    candidates, prompt_tokens = _fit_candidates(candidates, prompt, max_tokens, record)
+    candidates = _route_candidates(candidates, prompt_tokens, max_tokens, record)
+
+    if provider == "auto" and len(candidates) > 1 and _hedging_enabled():
+        result = await _agenerate_hedged(prompt, candidates, max_tokens)
+        return result or _failure_message(provider)
+
+    for candidate_provider, candidate_model in candidates:
+        label = _PROVIDER_LABELS[candidate_provider]
+        print(f"🔄 Generando con {label} ({candidate_model})...")
+        result = await _agenerate_cached(candidate_provider, prompt, candidate_model, max_tokens, lookup=False)
+
+        if result:
+            print(f"✅ Contenido generado exitosamente con {label}")
+            return result
+
+        if provider == "auto":
+            print(f"⚠️ {label} no disponible, probando siguiente proveedor...")
+
+    return _failure_message(provider)
+
+
+async def _agenerate(prompt: str, model: Optional[str], provider: str, stage: str,
+                     max_tokens: Optional[int], response_schema: Optional[Dict] = None) -> Tuple[str, str]:
+    """
+    Núcleo de `agenerate_cv_output`; siempre se ejecuta en el loop compartido.
+    Acota toda la etapa (reintentos y fallback incluidos) a su plazo.
+
+    Retorna (texto, estado), con estado "ok", "cache", "error", "timeout" o
+    "too_large" (el prompt no entra, ver `ai_tokens.py`);
+    si no es "ok"/"cache" el texto es el mensaje de error amigable.
+    """
+    provider, model = _apply_forced_provider(provider, model)
+    max_tokens = max_tokens or compute_output_budget(stage, prompt)
+    record = CallRecord(stage=stage, requested_provider=provider, prompt_chars=len(prompt),
+                        prefix_fingerprint=prefix_fingerprint(prompt), output_budget=max_tokens)
+    record_token = _current_call.set(record)
+    schema_token = _response_schema.set(response_schema)
+    started = time.monotonic()
+    result = ""
+
+    deadline = stage_deadline(stage)
+    token = set_deadline(deadline)
+    try:
+        result = await asyncio.wait_for(
+            _agenerate_candidates(prompt, model, provider, max_tokens), timeout=deadline
+        )
+        return result, record.status
+    except asyncio.TimeoutError:
+        print(f"⏱️ Etapa '{stage}': plazo de {deadline:.0f}s agotado")
+        record.status = "timeout"
+        return _deadline_message(deadline), record.status
+    except PromptTooLargeError as e:
+        record.status = "too_large"
+        return str(e), record.status
+    except asyncio.CancelledError:
+        record.status = "cancelled"
+        raise
+    finally:
+        reset_deadline(token)
+        _response_schema.reset(schema_token)
+        _current_call.reset(record_token)
+        _finish_record(record, model, started, len(result))
+
+
+def _single_flight_enabled() -> bool:
+    return os.getenv("AI_SINGLE_FLIGHT_ENABLED", "1") == "1"
+
+
+def _flight_key(kind: str, prompt: str, model: Optional[str], provider: str, stage: str,
+                max_tokens: Optional[int], response_schema: Optional[Dict] = None) -> str:
+    """Huella de una petición: dos llamadas con la misma huella son intercambiables."""
+    params = dict(GENERATION_PARAMS, stage=stage, max_tokens=max_tokens)
+    if response_schema is not None:
+        params["response_schema"] = response_schema
+    return make_cache_key(f"{kind}:{provider}", model or "", SYSTEM_PROMPT, prompt, params)
+
+
+async def _agenerate_shared(prompt: str, model: Optional[str], provider: str, stage: str,
+                            max_tokens: Optional[int],
+                            response_schema: Optional[Dict] = None) -> Tuple[str, str]:
+    """`_agenerate` compartiendo la llamada con peticiones idénticas en curso."""
+    if not _single_flight_enabled():
+        return await _agenerate(prompt, model, provider, stage, max_tokens, response_schema)
+    key = _flight_key("generate", prompt, model, provider, stage, max_tokens, response_schema)
+    return await _single_flight.run(
+        key, lambda: _agenerate(prompt, model, provider, stage, max_tokens, response_schema)
+    )
+
+
+def _astream_shared(prompt: str, model: Optional[str], provider: str, stage: str,
+                    max_tokens: Optional[int]) -> AsyncIterator[str]:
+    """`_astream` compartiendo los fragmentos con streamings idénticos en curso."""
+    if not _single_flight_enabled():
+        return _astream(prompt, model, provider, stage, max_tokens)
+    key = _flight_key("stream", prompt, model, provider, stage, max_tokens)
+    return _single_flight.stream(key, lambda: _astream(prompt, model, provider, stage, max_tokens))
+
+
+def get_single_flight_stats() -> dict:
+    """Peticiones que llegaron al proveedor (leaders), reutilizadas (followers) y en curso."""
+    stats = dict(_single_flight.stats)
+    stats["in_flight"] = _single_flight.in_flight()
+    return stats
+
+
+async def agenerate_cv_output(prompt: str, model: Optional[str] = None, provider: str = "auto",
+                              stage: str = "general", max_tokens: Optional[int] = None,
+                              response_schema: Optional[Dict] = None) -> str:
+    """
+    Versión asíncrona de `generate_cv_output` (mismos parámetros y retorno).
+
+    Puede esperarse desde cualquier event loop: la llamada al proveedor siempre
+    se ejecuta en el loop compartido del servicio.
+    """
+    text, _ = await _on_shared_loop(
+        _agenerate_shared(prompt, model, provider, stage, max_tokens, response_schema)
+    )
+    return text
+
+
+def generate_cv_output(prompt: str, model: Optional[str] = None, provider: str = "auto",
+                       stage: str = "general", max_tokens: Optional[int] = None,
+                       response_schema: Optional[Dict] = None) -> str:
+    """
+    Genera texto del CV usando IA con fallback automático o proveedor específico.
+
+    Parámetros:
+        prompt: Instrucciones completas que describen la tarea a la IA.
+        model: Nombre del modelo a utilizar (opcional).
+        provider: "auto" (fallback), "openai", "gemini" o "local" (offline, ver ai_local.py)
+        stage: Etapa del pipeline ("master", "linkedin", "target", "ats"...),
+            determina el plazo máximo de la llamada y su presupuesto de salida.
+        max_tokens: Tope de tokens de salida (opcional). Por defecto se calcula
+            según la etapa y el tamaño del documento de referencia (ai_budgets).
+        response_schema: Esquema JSON de la respuesta (opcional). Si se pasa, la
+            salida es un JSON que lo cumple: function calling en OpenAI y
+            `response_schema` en Gemini. Usar solo claves que acepten ambos
+            (type, enum, description, nullable, properties, required, items).
+
+    Retorna:
+        Texto generado por el modelo o un mensaje de error amigable.
+    """
+    text, _ = _run_sync(_agenerate_shared(prompt, model, provider, stage, max_tokens, response_schema))
+    return text
+
+
+async def _astream(prompt: str, model: Optional[str], provider: str, stage: str,
+                   max_tokens: Optional[int]) -> AsyncIterator[str]:
+    """Núcleo de `agenerate_cv_output_stream`; siempre se ejecuta en el loop compartido."""
+    provider, model = _apply_forced_provider(provider, model)
+    max_tokens = max_tokens or compute_output_budget(stage, prompt)
+    record = CallRecord(stage=stage, requested_provider=provider, streaming=True,
+                        prompt_chars=len(prompt), prefix_fingerprint=prefix_fingerprint(prompt),
+                        output_budget=max_tokens)
+    call_started = time.monotonic()
+    emitted_chars = 0
+
+    try:
+        candidates = _resolve_candidates(provider, model)
+
+        for candidate_provider, candidate_model in candidates:
+            cached = _get_cached(candidate_provider, prompt, candidate_model, max_tokens)
+            if cached:
+                record.status = "cache"
+                record.provider, record.model = candidate_provider, candidate_model
+                record.ttft_seconds = round(time.monotonic() - call_started, 4)
+                emitted_chars = len(cached)
+                yield cached
+                return
+
+        # El plazo se controla localmente: cada fragmento se pide desde una tarea
+        # distinta, así que no puede heredarse por contexto como en _agenerate
+        loop = asyncio.get_running_loop()
+        deadline = stage_deadline(stage)
+        deadline_at = loop.time() + deadline
+
+        try:
+            candidates, prompt_tokens = _fit_candidates(candidates, prompt, max_tokens, record)
+        except PromptTooLargeError as e:
+            record.status = "too_large"
+            yield str(e)
+            return
+
+        for candidate_provider, candidate_model in _route_candidates(candidates, prompt_tokens, max_tokens, record):
+            label = _PROVIDER_LABELS[candidate_provider]
+            breaker = get_circuit_breaker(candidate_provider, candidate_model)
+            if not breaker.allow_request():
+                print(f"🚫 {label} ({candidate_model}): circuito abierto, se omite la llamada")
+                continue
+
+            print(f"🔄 Generando en streaming con {label} ({candidate_model})...")
+            record.provider, record.model = candidate_provider, candidate_model
+
+            parts: List[str] = []
+            usage: Dict = {}
+            started = time.monotonic()
+            attempt = 0
+            failed = False
+            while True:
+                stream = _STREAMERS[candidate_provider](prompt, candidate_model, max_tokens, usage)
+                try:
+                    # La espera en cola no cuenta como latencia del proveedor
+                    started += await asyncio.wait_for(
+                        _acquire_rate_limit(candidate_provider, prompt, max_tokens),
+                        timeout=max(0.0, deadline_at - loop.time()),
+                    )
+                    while True:
+                        remaining = deadline_at - loop.time()
+                        if remaining <= 0:
+                            raise asyncio.TimeoutError("Plazo de la etapa agotado")
+                        try:
+                            chunk = await asyncio.wait_for(_anext(stream), timeout=remaining)
+                        except StopAsyncIteration:
+                            break
+                        if record.ttft_seconds is None:
+                            record.ttft_seconds = round(time.monotonic() - call_started, 4)
+                        parts.append(chunk)
+                        emitted_chars += len(chunk)
+                        yield chunk
+                    break
+                except (asyncio.CancelledError, GeneratorExit):
+                    breaker.release()
+                    raise
+                except Exception as e:
+                    # Solo se reintenta si todavía no se emitió ningún fragmento
+                    delay = None if parts else retry_delay(e, attempt)
+                    if delay is not None and delay < deadline_at - loop.time():
+                        attempt += 1
+                        record.retries += 1
+                        print(f"🔁 {label}: {type(e).__name__}, reintento {attempt} en {delay:.1f}s")
+                        await asyncio.sleep(delay)
+                        continue
+
+                    breaker.record_failure(time.monotonic() - started)
+                    error_msg = f"{type(e).__name__}: {str(e)}"
+                    print(f"❌ {label} error: {error_msg}")
+                    failed = True
+                    break
+                finally:
+                    await stream.aclose()
+
+            if failed:
+                if parts:
+                    # Ya se mostró parte de la respuesta: no se puede cambiar de modelo
+                    yield "\n\n⚠️ La generación se interrumpió. Intenta nuevamente."
+                    return
+                if deadline_at - loop.time() <= 0:
+                    print(f"⏱️ Etapa '{stage}': plazo de {deadline:.0f}s agotado")
+                    record.status = "timeout"
+                    yield _deadline_message(deadline)
+                    return
+                continue
+
+            latency = time.monotonic() - started
+            if not parts:
+                breaker.record_failure(latency)
+                continue
+
+            breaker.record_success(latency)
+            record_latency(candidate_provider, candidate_model, latency)
+            record_throughput(candidate_provider, candidate_model, usage.get("completion_tokens"), latency)
+            _store_cached(candidate_provider, prompt, candidate_model, max_tokens, "".join(parts))
+            record.status = "ok"
+            record.add_usage(usage)
+            record.truncated = bool(usage.get("truncated"))
+            print(f"✅ Contenido generado exitosamente con {label}")
+            return
+
+        yield _failure_message(provider)
+
+    except (asyncio.CancelledError, GeneratorExit):
+        record.status = "cancelled"
+        raise
+    finally:
+        _finish_record(record, model, call_started, emitted_chars)
+
+
+async def agenerate_cv_output_stream(prompt: str, model: Optional[str] = None,
+                                     provider: str = "auto", stage: str = "general",
+                                     max_tokens: Optional[int] = None) -> AsyncIterator[str]:
+    """
+    Versión asíncrona de `generate_cv_output_stream` (mismos parámetros).
+    Cada fragmento se obtiene en el loop compartido del servicio.
+    """
+    agen = _astream_shared(prompt, model, provider, stage, max_tokens)
+    try:
+        while True:
+            try:
+                chunk = await _on_shared_loop(_anext(agen))
+            except StopAsyncIteration:
+                break
+            yield chunk
+    finally:
+        await _on_shared_loop(_aclose(agen))
+
+
+def generate_cv_output_stream(prompt: str, model: Optional[str] = None,
+                              provider: str = "auto", stage: str = "general",
+                              max_tokens: Optional[int] = None) -> Iterator[str]:
+    """
+    Variante en streaming de `generate_cv_output`.
+
+    Produce fragmentos de texto a medida que el proveedor los envía, de modo que
+    la UI pueda mostrar la respuesta progresivamente. Mismos parámetros y misma
+    lógica de fallback: en modo auto se pasa a Gemini solo si OpenAI falla antes
+    de emitir el primer fragmento (no se mezclan respuestas de dos modelos).
+    Los errores transitorios se reintentan solo antes del primer fragmento.
+
+    Si la respuesta está en caché se emite completa en un único fragmento.
+    Si ningún proveedor responde se emite el mismo mensaje de error amigable.
+    """
+    agen = _astream_shared(prompt, model, provider, stage, max_tokens)
+    try:
+        while True:
+            try:
+                chunk = _run_sync(_anext(agen))
+            except StopAsyncIteration:
+                break
+            yield chunk
+    finally:
+        _run_sync(_aclose(agen))
+
+
+def _batch_concurrency(concurrency: Optional[int]) -> int:
+    """Generaciones simultáneas de un lote (AI_BATCH_CONCURRENCY por defecto)."""
+    return max(1, concurrency or int(os.getenv("AI_BATCH_CONCURRENCY", "4")))
+
+
+async def _abatch(prompts: List[str], model: Optional[str], provider: str, stage: str,
+                  max_tokens: Optional[int], concurrency: int,
+                  response_schema: Optional[Dict] = None) -> AsyncIterator[Dict]:
+    """
+    Núcleo de la API por lotes; siempre se ejecuta en el loop compartido.
+
+    `concurrency` tareas toman prompts de una cola y cada resultado se emite
+    en cuanto termina. Un ítem que falla no interrumpe al resto del lote.
+    """
+    pending: asyncio.Queue = asyncio.Queue()
+    for index, prompt in enumerate(prompts):
+        pending.put_nowait((index, prompt))
+    finished: asyncio.Queue = asyncio.Queue()
+
+    async def worker() -> None:
+        while True:
+            try:
+                index, prompt = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                output, status = await _agenerate_shared(prompt, model, provider, stage, max_tokens,
+                                                         response_schema)
+            except Exception as e:
+                output, status = "", "error"
+                error = f"{type(e).__name__}: {str(e)}"
+            else:
+                error = None if status in ("ok", "cache") else output
+            finished.put_nowait({"index": index, "output": output, "status": status,
+                                 "ok": error is None, "error": error})
+
+    print(f"📦 Lote de {len(prompts)} generaciones (etapa '{stage}', concurrencia {concurrency})")
+    workers = [asyncio.ensure_future(worker()) for _ in range(min(concurrency, len(prompts)))]
+    failures = 0
+    try:
+        for _ in range(len(prompts)):
+            item = await finished.get()
+            failures += not item["ok"]
+            yield item
+        print(f"📦 Lote completado: {len(prompts) - failures} OK, {failures} con error")
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+
+async def _acollect_batch(prompts: List[str], model: Optional[str], provider: str, stage: str,
+                          max_tokens: Optional[int], concurrency: Optional[int],
+                          ordered: bool, response_schema: Optional[Dict] = None) -> List[Dict]:
+    items = [item async for item in _abatch(prompts, model, provider, stage, max_tokens,
+                                            _batch_concurrency(concurrency), response_schema)]
+    if ordered:
+        items.sort(key=lambda item: item["index"])
+    return items
+
+
+async def agenerate_cv_outputs(prompts: List[str], model: Optional[str] = None,
+                               provider: str = "auto", stage: str = "general",
+                               max_tokens: Optional[int] = None, concurrency: Optional[int] = None,
+                               ordered: bool = True,
+                               response_schema: Optional[Dict] = None) -> List[Dict]:
+    """Versión asíncrona de `generate_cv_outputs` (mismos parámetros y retorno)."""
+    return await _on_shared_loop(
+        _acollect_batch(prompts, model, provider, stage, max_tokens, concurrency, ordered, response_schema)
+    )
+
+
+def generate_cv_outputs(prompts: List[str], model: Optional[str] = None,
+                        provider: str = "auto", stage: str = "general",
+                        max_tokens: Optional[int] = None, concurrency: Optional[int] = None,
+                        ordered: bool = True, response_schema: Optional[Dict] = None) -> List[Dict]:
+    """
+    Genera varios prompts con concurrencia acotada (ej. un CV Maestro contra
+    decenas de ofertas, o re-analizar un lote de CVs).
+
+    Cada prompt pasa por la misma lógica que `generate_cv_output` (caché,
+    límite de tasa, reintentos, fallback y plazo de la etapa).
+
+    Parámetros:
+        prompts: Lista de prompts a generar.
+        model, provider, stage, max_tokens, response_schema: Igual que en
+            `generate_cv_output`; sin `max_tokens` el presupuesto se calcula
+            para cada prompt.
+        concurrency: Generaciones simultáneas (por defecto AI_BATCH_CONCURRENCY).
+        ordered: True para retornar en el orden de `prompts`; False para el
+            orden en que fueron terminando.
+
+    Retorna:
+        Un dict por prompt con: index (posición en `prompts`), output (texto
+        generado), ok, status ("ok", "cache", "error", "timeout") y error
+        (mensaje si el ítem falló, None si no).
+    """
+    return _run_sync(_acollect_batch(prompts, model, provider, stage, max_tokens, concurrency, ordered,
+                                     response_schema))
+
+
+def iter_cv_outputs(prompts: List[str], model: Optional[str] = None,
+                    provider: str = "auto", stage: str = "general",
+                    max_tokens: Optional[int] = None,
+                    concurrency: Optional[int] = None) -> Iterator[Dict]:
+    """
+    Variante de `generate_cv_outputs` que produce cada resultado en cuanto
+    termina (útil para mostrar el progreso de un lote en la UI).
+    Abandonar la iteración cancela los ítems pendientes.
+    """
+    agen = _abatch(prompts, model, provider, stage, max_tokens, _batch_concurrency(concurrency))
+    try:
+        while True:
+            try:
+                item = _run_sync(_anext(agen))
+            except StopAsyncIteration:
+                break
+            yield item
+    finally:
+        _run_sync(_aclose(agen))
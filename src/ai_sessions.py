@@ -0,0 +1,197 @@
+# src/ai_sessions.py
+
+"""
+Gestor de sesiones de larga duración para los proveedores de IA.
+
+Cada generación reutiliza los mismos clientes en lugar de construirlos de nuevo:
+- OpenAI: un único cliente asíncrono con pool HTTP keep-alive (httpx) por API key.
+- Gemini: `genai.configure` se ejecuta solo cuando cambia la API key y cada
+  modelo se construye una vez, con safety settings y configuración de
+  generación ya resueltos.
+
+Los clientes solo se reconstruyen si la API key del entorno cambia, de modo que
+rotar una key en `.env`/secrets sigue funcionando sin reiniciar la app.
+
+`awarm_up()` permite abrir las conexiones (TLS incluido) al iniciar la app para
+que la primera generación no pague ese costo.
+
+Los clientes asíncronos quedan ligados al event loop compartido del servicio
+de IA (ver `ai_service._get_event_loop`), por lo que solo deben usarse desde él.
+
+Los SDKs (openai, google-generativeai, ~1 s de importación entre ambos) se
+importan recién al construir el primer cliente, o antes en segundo plano con
+`preload_sdks()`, para no demorar el arranque de la app.
+
+Configuración por variables de entorno:
+- AI_HTTP_MAX_CONNECTIONS: conexiones simultáneas por pool (por defecto 20)
+- AI_HTTP_MAX_KEEPALIVE: conexiones ociosas que se mantienen abiertas (por defecto 10)
+- AI_HTTP_KEEPALIVE_EXPIRY: segundos que vive una conexión ociosa (por defecto 120)
+"""
+
+import importlib
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, Optional
+
+from .ai_retry import connect_timeout, read_timeout
+
+if TYPE_CHECKING:
+    import httpx
+    from openai import AsyncOpenAI
+    import google.generativeai as genai
+
+
+# Configuración de seguridad más permisiva para Gemini (se construye una sola vez)
+GEMINI_SAFETY_SETTINGS = [
+    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
+]
+
+
+def _http_limits() -> "httpx.Limits":
+    """Límites del pool HTTP compartido."""
+    import httpx
+
+    return httpx.Limits(
+        max_connections=int(os.getenv("AI_HTTP_MAX_CONNECTIONS", "20")),
+        max_keepalive_connections=int(os.getenv("AI_HTTP_MAX_KEEPALIVE", "10")),
+        keepalive_expiry=float(os.getenv("AI_HTTP_KEEPALIVE_EXPIRY", "120")),
+    )
+
+
+class ProviderSessionManager:
+    """Mantiene clientes reutilizables por proveedor y modelo."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+        self._openai_client: Optional["AsyncOpenAI"] = None
+        self._openai_http: Optional["httpx.AsyncClient"] = None
+        self._openai_key: Optional[str] = None
+
+        self._gemini_key: Optional[str] = None
+        self._gemini_models: Dict[str, "genai.GenerativeModel"] = {}
+
+    def get_openai_client(self) -> Optional["AsyncOpenAI"]:
+        """
+        Devuelve el cliente asíncrono de OpenAI compartido.
+        Retorna None si no hay OPENAI_API_KEY configurada.
+        """
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            return None
+
+        with self._lock:
+            if self._openai_client is None or api_key != self._openai_key:
+                import httpx
+                from openai import AsyncOpenAI
+
+                # El pool anterior se libera al recolectarse; cerrarlo aquí
+                # cortaría peticiones que aún estén en curso con la key vieja
+                self._openai_http = httpx.AsyncClient(limits=_http_limits())
+                # Los reintentos los gestiona ai_retry (respetando el plazo de cada etapa)
+                self._openai_client = AsyncOpenAI(
+                    api_key=api_key,
+                    http_client=self._openai_http,
+                    timeout=httpx.Timeout(read_timeout(), connect=connect_timeout()),
+                    max_retries=0,
+                )
+                self._openai_key = api_key
+                print("🔌 OpenAI: cliente (re)construido")
+
+            return self._openai_client
+
+    def get_gemini_model(self, model: str) -> Optional["genai.GenerativeModel"]:
+        """
+        Devuelve la instancia de GenerativeModel para `model`.
+        Retorna None si no hay GEMINI_API_KEY configurada.
+        """
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            return None
+
+        import google.generativeai as genai
+
+        with self._lock:
+            if api_key != self._gemini_key:
+                genai.configure(api_key=api_key)
+                self._gemini_key = api_key
+                self._gemini_models.clear()
+                print("🔌 Gemini: cliente (re)configurado")
+
+            model_instance = self._gemini_models.get(model)
+            if model_instance is None:
+                model_instance = genai.GenerativeModel(
+                    model,
+                    safety_settings=GEMINI_SAFETY_SETTINGS,
+                )
+                self._gemini_models[model] = model_instance
+
+            return model_instance
+
+    async def awarm_up(self, openai_model: Optional[str] = None,
+                       gemini_model: Optional[str] = None) -> Dict[str, bool]:
+        """
+        Construye los clientes y abre las conexiones con llamadas que no
+        consumen tokens (consulta de metadatos del modelo).
+
+        Retorna un dict proveedor -> True si quedó listo.
+        """
+        status = {"openai": False, "gemini": False}
+
+        if openai_model:
+            try:
+                client = self.get_openai_client()
+                if client is not None:
+                    await client.models.retrieve(openai_model)
+                    status["openai"] = True
+            except Exception as e:
+                print(f"⚠️ Warm-up OpenAI falló: {type(e).__name__}: {str(e)}")
+
+        if gemini_model:
+            try:
+                model_instance = self.get_gemini_model(gemini_model)
+                if model_instance is not None:
+                    await model_instance.count_tokens_async("ping")
+                    status["gemini"] = True
+            except Exception as e:
+                print(f"⚠️ Warm-up Gemini falló: {type(e).__name__}: {str(e)}")
+
+        return status
+
+
+def preload_sdks() -> Dict[str, bool]:
+    """
+    Importa los SDKs de los proveedores con API key configurada, para que la
+    primera generación no pague la importación. Pensado para un hilo en
+    segundo plano: así tampoco bloquea el event loop compartido del servicio.
+
+    Retorna un dict proveedor -> True si el SDK quedó importado.
+    """
+    status = {}
+    sdks = {"openai": ("OPENAI_API_KEY", "openai"),
+            "gemini": ("GEMINI_API_KEY", "google.generativeai")}
+    for provider, (env_var, module) in sdks.items():
+        if not os.getenv(env_var):
+            continue
+        started = time.monotonic()
+        try:
+            importlib.import_module(module)
+            status[provider] = True
+            print(f"📦 SDK {module} importado en {time.monotonic() - started:.2f}s")
+        except ImportError as e:
+            status[provider] = False
+            print(f"⚠️ No se pudo importar {module}: {str(e)}")
+    return status
+
+
+# Instancia global compartida por todas las sesiones del proceso
+_session_manager = ProviderSessionManager()
+
+
+def get_session_manager() -> ProviderSessionManager:
+    """Devuelve el gestor de sesiones global."""
+    return _session_manager
@@ -0,0 +1,147 @@
+# src/ai_single_flight.py
+
+"""
+Coalescencia "single-flight" de peticiones idénticas en curso.
+
+Si dos sesiones (o un doble clic seguido de `st.rerun`) piden exactamente la
+misma generación al mismo tiempo, solo la primera llega al proveedor: las
+demás esperan la misma petición en curso y reciben su resultado.
+
+- `SingleFlight.run()`: para corrutinas (generación completa). Todos los
+  participantes reciben el mismo resultado, o la misma excepción si la
+  petición líder falla, sin quedar esperando.
+- `SingleFlight.stream()`: para generaciones en streaming. Los fragmentos se
+  reparten a todos los suscriptores; quien se suma tarde recibe primero los
+  fragmentos ya emitidos.
+
+La petición compartida se cancela solo cuando la abandonan todos sus
+participantes, de modo que cancelar una sesión no corta a las demás.
+
+Debe usarse desde un único event loop (el loop compartido de `ai_service`).
+"""
+
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class _Flight:
+    """Petición compartida en curso (corrutina)."""
+
+    def __init__(self, task: "asyncio.Future"):
+        self.task = task
+        self.waiters = 0
+
+
+class _StreamFlight:
+    """Petición compartida en curso (streaming), con los fragmentos recibidos."""
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional["asyncio.Future"] = None
+        self.changed = asyncio.Event()
+
+    def notify(self) -> None:
+        """Despierta a los suscriptores que esperan un fragmento nuevo."""
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+
+def _retrieve_exception(task: "asyncio.Future") -> None:
+    """Marca la excepción como leída para evitar avisos si nadie la esperaba ya."""
+    if not task.cancelled():
+        task.exception()
+
+
+class SingleFlight:
+    """Registro de peticiones en curso, indexadas por huella del prompt."""
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self._streams: Dict[str, _StreamFlight] = {}
+        self.stats = {"leaders": 0, "followers": 0}
+
+    def _forget(self, registry: Dict, key: str, flight) -> None:
+        if registry.get(key) is flight:
+            del registry[key]
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        """
+        Ejecuta `factory()` una sola vez por `key` entre los llamadores concurrentes.
+        Retorna su resultado (o propaga su excepción) a todos ellos.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(factory()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(_retrieve_exception)
+            flight.task.add_done_callback(lambda _, flight=flight: self._forget(self._flights, key, flight))
+            self.stats["leaders"] += 1
+        else:
+            self.stats["followers"] += 1
+            print("🔗 Petición idéntica en curso: se reutiliza su resultado")
+
+        flight.waiters += 1
+        try:
+            # shield: cancelar a un participante no cancela la petición compartida
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+
+    async def _produce(self, flight: _StreamFlight, factory: Callable[[], AsyncIterator[str]]) -> None:
+        agen = factory()
+        try:
+            async for chunk in agen:
+                flight.chunks.append(chunk)
+                flight.notify()
+        except Exception as e:
+            flight.error = e
+        finally:
+            flight.finished = True
+            flight.notify()
+            await agen.aclose()
+
+    async def stream(self, key: str, factory: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """
+        Itera `factory()` una sola vez por `key` y reparte sus fragmentos a
+        todos los suscriptores concurrentes.
+        """
+        flight = self._streams.get(key)
+        if flight is None:
+            flight = _StreamFlight()
+            self._streams[key] = flight
+            flight.task = asyncio.ensure_future(self._produce(flight, factory))
+            flight.task.add_done_callback(_retrieve_exception)
+            flight.task.add_done_callback(lambda _, flight=flight: self._forget(self._streams, key, flight))
+            self.stats["leaders"] += 1
+        else:
+            self.stats["followers"] += 1
+            print("🔗 Streaming idéntico en curso: se comparten sus fragmentos")
+
+        flight.subscribers += 1
+        index = 0
+        try:
+            while True:
+                if index < len(flight.chunks):
+                    index += 1
+                    yield flight.chunks[index - 1]
+                    continue
+                if flight.finished:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                await flight.changed.wait()
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.task.done():
+                flight.task.cancel()
+
+    def in_flight(self) -> int:
+        """Peticiones compartidas actualmente en curso."""
+        return len(self._flights) + len(self._streams)
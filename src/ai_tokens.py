@@ -0,0 +1,176 @@
+# src/ai_tokens.py
+
+"""
+Conteo local de tokens y control del tamaño de los prompts.
+
+Medir el prompt antes de enviarlo permite rechazar (o rutear a un modelo con
+más contexto) las entradas demasiado grandes, como varios programas de
+estudio largos concatenados, sin esperar a que el proveedor falle después de
+un viaje completo por la red.
+
+- `count_tokens()`: con `tiktoken` instalado usa el tokenizador del modelo
+  (para Gemini y el proveedor local, `o200k_base` como aproximación); si no
+  está instalado o no puede cargar su vocabulario, usa una heurística
+  conservadora (palabras en piezas de ~5 caracteres más un token por signo).
+  Los conteos se cachean por hash del texto.
+- `check_prompt_size()`: lanza `PromptTooLargeError` si el prompt supera
+  AI_MAX_PROMPT_TOKENS o la ventana de contexto del modelo.
+
+Configuración por variables de entorno:
+- AI_MAX_PROMPT_TOKENS: tope de tokens de entrada por llamada (por defecto 100000; 0 = solo la ventana de contexto)
+- AI_TOKENIZER: "auto" (tiktoken si está instalado, por defecto) o "heuristic"
+- AI_TOKEN_COUNT_CACHE_SIZE: conteos recordados (por defecto 2048)
+"""
+
+import hashlib
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from .ai_router import model_context_tokens
+
+HEURISTIC = "heuristic"
+DEFAULT_ENCODING = "o200k_base"
+
+# Caracteres por token dentro de una palabra (heurística, sin tokenizador)
+CHARS_PER_WORD_TOKEN = 5
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+class PromptTooLargeError(ValueError):
+    """El prompt no entra en el tope configurado ni en el contexto de ningún modelo candidato."""
+
+    def __init__(self, prompt_tokens: int, limit: int, stage: str = "general"):
+        self.prompt_tokens = prompt_tokens
+        self.limit = limit
+        self.stage = stage
+        super().__init__(
+            f"📏 El contenido es demasiado extenso (~{prompt_tokens:,} tokens; máximo {limit:,} por llamada).\n\n"
+            "Sube menos documentos o versiones más breves (por ejemplo, solo el programa de "
+            "las materias relevantes) e intenta nuevamente."
+        )
+
+
+def heuristic_token_count(text: str) -> int:
+    """Tokens aproximados sin tokenizador (tiende a sobreestimar, nunca a subestimar mucho)."""
+    return sum(
+        math.ceil(len(piece) / CHARS_PER_WORD_TOKEN) if piece[0].isalnum() or piece[0] == "_" else 1
+        for piece in _TOKEN_PATTERN.findall(text)
+    )
+
+
+# Encodings de tiktoken por modelo ("" = resto de modelos); None = usar la heurística
+_encodings: Dict[str, object] = {}
+_encodings_lock = threading.Lock()
+
+_OPENAI_MODEL_PREFIXES = ("gpt-", "o1", "o3", "o4")
+
+
+def _load_encoding(model: str):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        if model:
+            try:
+                return tiktoken.encoding_for_model(model)
+            except KeyError:
+                pass
+        return tiktoken.get_encoding(DEFAULT_ENCODING)
+    except Exception as e:
+        # Ej. sin red para descargar el vocabulario la primera vez
+        print(f"⚠️ Tokenizador de {model or DEFAULT_ENCODING} no disponible "
+              f"({type(e).__name__}), se usa la heurística")
+        return None
+
+
+def _get_encoding(model: Optional[str]):
+    """Encoding de tiktoken para el modelo (se carga una vez), o None para la heurística."""
+    if os.getenv("AI_TOKENIZER", "auto").strip().lower() == HEURISTIC:
+        return None
+    key = model if model and model.startswith(_OPENAI_MODEL_PREFIXES) else ""
+    with _encodings_lock:
+        if key not in _encodings:
+            _encodings[key] = _load_encoding(key)
+        return _encodings[key]
+
+
+# Conteos por (tokenizador, hash del texto), con expulsión LRU
+_counts: "OrderedDict[tuple[str, str], int]" = OrderedDict()
+_counts_lock = threading.Lock()
+_count_stats = {"hits": 0, "misses": 0}
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """Tokens de `text` para `model` (tokenizador real si está disponible, si no heurística)."""
+    if not text:
+        return 0
+    encoding = _get_encoding(model)
+    tokenizer = encoding.name if encoding is not None else HEURISTIC
+    key = (tokenizer, hashlib.sha1(text.encode("utf-8")).hexdigest())
+
+    with _counts_lock:
+        cached = _counts.get(key)
+        if cached is not None:
+            _counts.move_to_end(key)
+            _count_stats["hits"] += 1
+            return cached
+        _count_stats["misses"] += 1
+
+    if encoding is not None:
+        tokens = len(encoding.encode(text, disallowed_special=()))
+    else:
+        tokens = heuristic_token_count(text)
+
+    with _counts_lock:
+        _counts[key] = tokens
+        max_size = int(os.getenv("AI_TOKEN_COUNT_CACHE_SIZE", "2048"))
+        while len(_counts) > max_size:
+            _counts.popitem(last=False)
+    return tokens
+
+
+def get_token_count_stats() -> Dict:
+    """Aciertos/fallos de la caché de conteos y tokenizadores en uso."""
+    with _counts_lock:
+        stats = dict(_count_stats, size=len(_counts))
+    with _encodings_lock:
+        stats["tokenizers"] = {
+            model or "default": encoding.name if encoding is not None else HEURISTIC
+            for model, encoding in _encodings.items()
+        }
+    return stats
+
+
+def max_prompt_tokens() -> int:
+    """Tope de tokens de entrada por llamada (0 = sin tope propio)."""
+    return int(os.getenv("AI_MAX_PROMPT_TOKENS", "100000"))
+
+
+def fits_context(prompt_tokens: int, model: str, max_output_tokens: int = 0) -> bool:
+    """Si el prompt más la salida pedida entran en la ventana de contexto de `model`."""
+    return prompt_tokens + max_output_tokens <= model_context_tokens(model)
+
+
+def check_prompt_size(prompt: str, stage: str = "general", model: Optional[str] = None,
+                      max_output_tokens: int = 0) -> int:
+    """
+    Mide el prompt y retorna sus tokens.
+    Lanza `PromptTooLargeError` si supera AI_MAX_PROMPT_TOKENS o, si se indica
+    `model`, su ventana de contexto (contando la salida pedida).
+    """
+    tokens = count_tokens(prompt, model)
+    limit = max_prompt_tokens()
+    if limit and tokens > limit:
+        print(f"📏 Etapa '{stage}': prompt de ~{tokens} tokens supera AI_MAX_PROMPT_TOKENS={limit}")
+        raise PromptTooLargeError(tokens, limit, stage)
+    if model and not fits_context(tokens, model, max_output_tokens):
+        context = model_context_tokens(model)
+        print(f"📏 Etapa '{stage}': prompt de ~{tokens} tokens no entra en el contexto de {model} ({context})")
+        raise PromptTooLargeError(tokens, context - max_output_tokens, stage)
+    return tokens
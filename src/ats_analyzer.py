@@ -7,78 +7,225 @@ Analiza un CV generado y proporciona:
 - Score de compatibilidad ATS (0-100)
 - Palabras clave encontradas vs esperadas
 - Recomendaciones específicas de mejora
+
+Salida estructurada (por defecto):
+    La IA responde un JSON que cumple `ATS_ANALYSIS_SCHEMA` (function calling
+    en OpenAI, `response_schema` en Gemini) en lugar de markdown parseado con
+    expresiones regulares. Un validador rápido revisa cada campo y, si alguno
+    es inválido o falta, se hace un único reintento de reparación que pide
+    solo esos campos. Si la respuesta no es JSON se usa el parser de markdown.
+
+Re-análisis tras editar el CV:
+    `reanalyze_ats_compatibility()` compara el CV editado con la versión del
+    análisis anterior (`ats_scorer.changed_sections`) y envía a la IA solo las
+    secciones modificadas junto con el análisis anterior, en lugar del CV
+    completo. Las palabras clave del resultado se recalculan localmente sobre
+    todo el CV.
+
+Configuración por variables de entorno:
+- AI_ATS_STRUCTURED: 1 para salida estructurada (por defecto), 0 para markdown
 """
 
+import json
+import os
 import re
-from typing import Dict, List, Tuple
-from .ai_service import generate_cv_output
-
-
-def analyze_ats_compatibility(cv_content: str, job_description: str = "") -> Dict:
+from typing import Dict, List, Optional, Tuple
+from .ai_service import generate_cv_output, generate_cv_outputs
+from .ats_scorer import changed_sections, detect_entry_level_position, match_job_keywords, split_sections
+from .keyword_matcher import match_dictionary_keywords
+from .prompts import assemble_prompt, document_block
+
+ATS_LEVELS = ["Excelente", "Bueno", "Aceptable", "Necesita Mejoras", "Crítico"]
+
+_STRING_LIST = {"type": "array", "items": {"type": "string"}}
+
+# Solo claves que aceptan tanto OpenAI (function calling) como Gemini (response_schema)
+ATS_ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "score": {"type": "integer", "description": "Score ATS entre 0 y 100"},
+        "level": {"type": "string", "enum": ATS_LEVELS},
+        "keywords_found": dict(_STRING_LIST, description="Palabras clave presentes en el CV"),
+        "keywords_missing": dict(_STRING_LIST, description="Palabras clave faltantes, con sugerencia"),
+        "strengths": dict(_STRING_LIST, description="Fortalezas"),
+        "weaknesses": dict(_STRING_LIST, description="Debilidades"),
+        "recommendations": dict(_STRING_LIST, description="Recomendaciones específicas y accionables"),
+        "details": {
+            "type": "array",
+            "description": "Puntaje y comentario breve por criterio",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "criterion": {"type": "string"},
+                    "score": {"type": "integer"},
+                    "max_score": {"type": "integer"},
+                    "comment": {"type": "string"},
+                },
+                "required": ["criterion", "score", "max_score", "comment"],
+            },
+        },
+    },
+    "required": ["score", "level", "keywords_found", "keywords_missing", "strengths",
+                 "weaknesses", "recommendations", "details"],
+}
+
+
+def _structured_enabled(structured: Optional[bool]) -> bool:
+    if structured is None:
+        return os.getenv("AI_ATS_STRUCTURED", "1") == "1"
+    return structured
+
+
+def analyze_ats_compatibility(cv_content: str, job_description: str = "",
+                              provider: str = "auto", model: Optional[str] = None,
+                              structured: Optional[bool] = None) -> Dict:
     """
     Analiza la compatibilidad ATS de un CV.
     
     Args:
         cv_content: Contenido del CV a analizar
         job_description: Descripción del puesto (opcional, mejora el análisis)
+        provider: Proveedor de IA ("auto", "openai", "gemini" o "local")
+        model: Modelo a utilizar (opcional)
+        structured: Salida JSON estructurada (por defecto AI_ATS_STRUCTURED)
     
     Returns:
         Dict con: score, keywords_found, keywords_missing, recommendations, details
     """
+    structured = _structured_enabled(structured)
     
     # Construir prompt de análisis ATS
-    prompt = _build_ats_analysis_prompt(cv_content, job_description)
-    
-    # Llamar a la IA para análisis
-    analysis_text = generate_cv_output(prompt)
-    
-    # Parsear respuesta
-    result = _parse_ats_analysis(analysis_text)
-    
-    return result
+    prompt = _build_ats_analysis_prompt(cv_content, job_description, structured)
+    return _run_ats_prompt(prompt, provider, model, structured)
 
 
-def _detect_entry_level_position(job_description: str) -> bool:
-    """Detecta si es un puesto entry-level/sin experiencia requerida."""
-    if not job_description:
-        return False
+def _run_ats_prompt(prompt: str, provider: str, model: Optional[str], structured: bool) -> Dict:
+    """Envía un prompt de análisis ATS y parsea la respuesta (con reparación si hace falta)."""
+    if not structured:
+        analysis_text = generate_cv_output(prompt, model=model, provider=provider, stage="ats")
+        return _parse_ats_analysis(analysis_text)
     
-    job_lower = job_description.lower()
+    analysis_text = generate_cv_output(prompt, model=model, provider=provider, stage="ats",
+                                       response_schema=ATS_ANALYSIS_SCHEMA)
+    data, failed = _load_ats_json(analysis_text)
+    if data is None:
+        return _parse_ats_analysis(analysis_text)
     
-    entry_level_keywords = [
-        # Español
-        "pasante", "pasantía", "trainee", "practicante", "sin experiencia",
-        "entry level", "nivel inicial", "recién graduado", "primer empleo",
-        "estudiante", "aprendiz", "junior", "jr", "graduate program",
-        "sin experiencia previa", "no requiere experiencia", "0 años",
-        "0-1 años", "recien egresado", "egresado",
-        
-        # Inglés (común en tech)
-        "intern", "internship", "entry-level", "no experience required",
-        "recent graduate", "new grad", "apprentice", "trainee program",
-        "0 years", "0-1 years", "fresh graduate"
-    ]
+    if failed:
+        repair_prompt = _build_ats_repair_prompt(prompt, failed)
+        repair_text = generate_cv_output(repair_prompt, model=model, provider=provider, stage="ats",
+                                         response_schema=_ats_repair_schema(failed))
+        data = _merge_ats_repair(data, failed, repair_text)
     
-    return any(keyword in job_lower for keyword in entry_level_keywords)
+    return _ats_result_from_json(data, analysis_text)
 
 
-def _build_ats_analysis_prompt(cv_content: str, job_description: str) -> str:
-    """Construye el prompt para análisis ATS."""
-    
-    # Detectar si es puesto entry-level
-    is_entry_level = _detect_entry_level_position(job_description)
-    
-    job_section = ""
+def reanalyze_ats_compatibility(cv_content: str, previous_cv: str, previous_analysis: Dict,
+                                job_description: str = "", provider: str = "auto",
+                                model: Optional[str] = None,
+                                structured: Optional[bool] = None) -> Dict:
+    """
+    Vuelve a analizar un CV editado enviando a la IA solo las secciones que cambiaron.
+
+    Args:
+        cv_content: CV editado
+        previous_cv: Versión del CV que produjo `previous_analysis`
+        previous_analysis: Resultado anterior de `analyze_ats_compatibility`
+        job_description: Descripción del puesto (opcional)
+        provider: Proveedor de IA ("auto", "openai", "gemini" o "local")
+        model: Modelo a utilizar (opcional)
+        structured: Salida JSON estructurada (por defecto AI_ATS_STRUCTURED)
+
+    Returns:
+        Dict con el formato de `analyze_ats_compatibility`. Sin cambios retorna
+        el análisis anterior; si el anterior no vino de la IA o cambiaron todas
+        las secciones, analiza el CV completo.
+    """
+    changed, removed = changed_sections(previous_cv, cv_content)
+    if not changed and not removed:
+        return previous_analysis
+
+    total = len(split_sections(cv_content))
+    if (previous_analysis.get("source") == "local" or previous_analysis.get("error")
+            or not previous_analysis.get("raw_analysis") or len(changed) >= total):
+        return analyze_ats_compatibility(cv_content, job_description, provider=provider,
+                                         model=model, structured=structured)
+
+    structured = _structured_enabled(structured)
+    print(f"✂️ Re-análisis ATS: {len(changed)} de {total} secciones modificadas, "
+          f"{len(removed)} eliminadas")
+    prompt = _build_ats_reanalysis_prompt(cv_content, job_description, previous_analysis,
+                                          changed, removed, structured)
+    result = _run_ats_prompt(prompt, provider, model, structured)
+
+    # La IA no vio el CV completo: las palabras clave se resuelven localmente sobre todo el texto,
+    # con la misma extracción que el score local (diccionario y términos con forma técnica)
     if job_description.strip():
-        job_section = f"""
---- DESCRIPCIÓN DEL PUESTO ---
-{job_description}
---- FIN DESCRIPCIÓN ---
-"""
-    
-    # Ajustar criterios según tipo de puesto
-    if is_entry_level:
-        criteria_weights = """
+        found, missing = match_job_keywords(job_description, cv_content)
+        result["keywords_found"] = found
+        result["keywords_missing"] = [
+            f"{kw} (sugerencia: agregar en experiencia/proyectos con ejemplo concreto)" for kw in missing
+        ]
+    return result
+
+
+def analyze_ats_compatibility_batch(items: List[Tuple[str, str]], provider: str = "auto",
+                                    model: Optional[str] = None,
+                                    concurrency: Optional[int] = None,
+                                    structured: Optional[bool] = None) -> List[Dict]:
+    """
+    Analiza varios pares (CV, descripción del puesto) con concurrencia acotada.
+
+    Args:
+        items: Lista de tuplas (cv_content, job_description)
+        provider: Proveedor de IA ("auto", "openai", "gemini" o "local")
+        model: Modelo a utilizar (opcional)
+        concurrency: Análisis simultáneos (por defecto AI_BATCH_CONCURRENCY)
+        structured: Salida JSON estructurada (por defecto AI_ATS_STRUCTURED)
+
+    Returns:
+        Lista en el mismo orden que `items`, con el mismo formato que
+        `analyze_ats_compatibility`. Si un análisis falla, su dict incluye
+        "error" con el motivo y score 0.
+    """
+    structured = _structured_enabled(structured)
+    prompts = [_build_ats_analysis_prompt(cv, jd, structured) for cv, jd in items]
+    schema = ATS_ANALYSIS_SCHEMA if structured else None
+    outputs = generate_cv_outputs(prompts, model=model, provider=provider, stage="ats",
+                                  concurrency=concurrency, response_schema=schema)
+
+    parsed = [_load_ats_json(output["output"]) if structured and output["ok"] else (None, [])
+              for output in outputs]
+
+    # Reparaciones (solo los campos inválidos): un lote por conjunto de campos a pedir
+    groups: Dict[Tuple[str, ...], List[int]] = {}
+    for index, (data, failed) in enumerate(parsed):
+        if data is not None and failed:
+            groups.setdefault(tuple(failed), []).append(index)
+    for failed, indexes in groups.items():
+        repairs = generate_cv_outputs(
+            [_build_ats_repair_prompt(prompts[i], list(failed)) for i in indexes],
+            model=model, provider=provider, stage="ats", concurrency=concurrency,
+            response_schema=_ats_repair_schema(list(failed)),
+        )
+        for index, repair in zip(indexes, repairs):
+            parsed[index] = (_merge_ats_repair(parsed[index][0], list(failed), repair["output"]), [])
+
+    results = []
+    for output, (data, _) in zip(outputs, parsed):
+        if data is not None:
+            result = _ats_result_from_json(data, output["output"])
+        else:
+            result = _parse_ats_analysis(output["output"])
+        if not output["ok"]:
+            result["error"] = output["error"]
+        results.append(result)
+    return results
+
+
+# Pesos por tipo de puesto: van al final del prompt, junto a los documentos,
+# para que el resto de las instrucciones sea un prefijo idéntico (cacheable)
+_ENTRY_LEVEL_CRITERIA = """
 **CRITERIOS PARA PUESTO ENTRY-LEVEL/SIN EXPERIENCIA (pesos ajustados):**
 
 **1. EDUCACIÓN Y FORMACIÓN (35 puntos)**
@@ -101,9 +248,9 @@ def _build_ats_analysis_prompt(cv_content: str, job_description: str) -> str:
 
 NOTA: Para puestos entry-level, NO se penaliza la falta de experiencia laboral.
 Se valora potencial, formación y proyectos académicos/personales.
-"""
-    else:
-        criteria_weights = """
+""".strip()
+
+_STANDARD_CRITERIA = """
 **CRITERIOS PARA PUESTO CON EXPERIENCIA REQUERIDA (pesos estándar):**
 
 **1. EXPERIENCIA PROFESIONAL (40 puntos)**
@@ -122,20 +269,15 @@ Se valora potencial, formación y proyectos académicos/personales.
 **4. EDUCACIÓN Y FORMACIÓN (10 puntos)**
 - ¿La educación es relevante y está actualizada?
 - ¿Incluye certificaciones pertinentes?
-"""
-    
-    prompt = f"""
-Actúa como un experto en sistemas ATS (Applicant Tracking Systems) y reclutamiento.
-
-Tu tarea es analizar el siguiente CV y evaluar su compatibilidad con sistemas ATS.
-
-{job_section}
+""".strip()
 
---- INICIO DEL CV ---
-{cv_content}
---- FIN DEL CV ---
+# Rúbrica común a los dos formatos de respuesta (markdown y JSON)
+_ATS_RUBRIC = """
+Actúa como un experto en sistemas ATS (Applicant Tracking Systems) y reclutamiento.
 
-DETECCIÓN AUTOMÁTICA: {'Este es un PUESTO ENTRY-LEVEL/SIN EXPERIENCIA REQUERIDA' if is_entry_level else 'Este es un PUESTO CON EXPERIENCIA REQUERIDA'}
+Tu tarea es analizar el CV incluido al final y evaluar su compatibilidad con sistemas ATS.
+Al final también se incluyen los criterios según el tipo de puesto (detectado
+automáticamente) y, si se proporcionó, la descripción del puesto.
 
 VALIDACIÓN PREVIA OBLIGATORIA:
 Antes de evaluar, verifica si el CV contiene información sustancial.
@@ -146,9 +288,7 @@ Si el CV SOLO tiene datos de contacto (nombre, email) SIN NINGUNA sección con c
 - Incluye en DEBILIDADES: "CV prácticamente vacío - falta experiencia, educación y proyectos"
 - Incluye en RECOMENDACIONES: "Completar todas las secciones con información detallada antes de postular"
 
-{criteria_weights}
-
-Debes evaluar los criterios correspondientes y proporcionar un análisis detallado:
+Debes evaluar los criterios correspondientes al tipo de puesto y proporcionar un análisis detallado:
 
 **1. FORMATO Y ESTRUCTURA (25 puntos)**
 - ¿Tiene secciones claramente identificadas? (Experiencia, Educación, Habilidades)
@@ -157,21 +297,18 @@ Debes evaluar los criterios correspondientes y proporcionar un análisis detalla
 - ¿Evita tablas, columnas múltiples, gráficos o imágenes?
 
 **2. PALABRAS CLAVE (40 puntos)**
-{"- ¿Contiene palabras clave relevantes de la descripción del puesto?" if job_description else "- ¿Contiene palabras clave técnicas y profesionales relevantes?"}
+- ¿Contiene palabras clave relevantes de la descripción del puesto? (sin descripción: palabras clave técnicas y profesionales relevantes)
 - ¿Las palabras clave aparecen en contexto apropiado?
 - ¿Hay suficiente densidad de términos técnicos sin keyword stuffing?
-{"- ¿Coincide con los requisitos técnicos del puesto?" if job_description else ""}
+- Si se incluye descripción del puesto: ¿coincide con sus requisitos técnicos?
 
 **IMPORTANTE PARA PALABRAS CLAVE:**
 - Si el CV tiene contenido insuficiente, no evalúes palabras clave detalladamente
 - Para puestos ENTRY-LEVEL: acepta palabras clave en educación, proyectos y habilidades con igual peso
 - Para puestos CON EXPERIENCIA: prioriza palabras clave en experiencia laboral
 - Para CVs con contenido adecuado:
-  - Considera TODAS las variaciones y acrónimos comunes de términos técnicos
-  - Ejemplos de equivalencias: palabra completa = minúsculas = acrónimo = traducción
-  - Busca la palabra en TODO el CV (experiencia, proyectos, habilidades, educación)
-  - Si encuentras el acrónimo de una palabra, considera que la palabra completa SÍ está presente
-  - Si una palabra aparece en CUALQUIER sección del CV, NO la marques como faltante
+  - Si al final se incluyen las PALABRAS CLAVE DETECTADAS, úsalas como base: ya consideran acrónimos, minúsculas, tildes y traducciones
+  - Agrega solo requisitos que esas listas no cubran, buscándolos en TODO el CV (acrónimo o traducción = palabra presente)
   - Solo marca como faltante si ni la palabra completa NI su acrónimo aparecen en el CV
 
 **3. CONTENIDO Y CLARIDAD (20 puntos)**
@@ -185,7 +322,9 @@ Debes evaluar los criterios correspondientes y proporcionar un análisis detalla
 - ¿Evita abreviaturas no estándar?
 - ¿Incluye tanto acrónimos como términos completos cuando corresponde?
 - ¿Las habilidades están listadas claramente?
+""".strip()
 
+_ATS_MARKDOWN_FORMAT = """
 FORMATO DE RESPUESTA OBLIGATORIO:
 
 **SCORE_ATS:** [número entre 0-100]
@@ -227,17 +366,217 @@ NOTAS IMPORTANTES:
 - Optimización ATS: [X/15] - breve comentario
 
 Sé específico, objetivo y proporciona recomendaciones accionables.
-"""
+""".strip()
+
+_ATS_JSON_FORMAT = """
+FORMATO DE RESPUESTA OBLIGATORIO (JSON):
+
+Responde únicamente con un objeto JSON con estos campos:
+- score: SCORE_ATS, número entero entre 0 y 100
+- level: NIVEL, uno de "Excelente", "Bueno", "Aceptable", "Necesita Mejoras" o "Crítico"
+- keywords_found: PALABRAS_CLAVE_ENCONTRADAS, lista de palabras
+- keywords_missing: PALABRAS_CLAVE_FALTANTES, lista con el formato "palabra (sugerencia: agregar en experiencia/proyectos con ejemplo concreto)"
+- strengths: FORTALEZAS, lista
+- weaknesses: DEBILIDADES, lista
+- recommendations: RECOMENDACIONES específicas y accionables, lista sin numerar
+- details: DETALLES_POR_CRITERIO, un objeto por criterio evaluado con criterion (nombre del criterio), score (puntos obtenidos), max_score (puntos del criterio) y comment (breve comentario)
+
+NOTAS IMPORTANTES PARA keywords_missing:
+1. Solo incluye palabras que NO aparecen en el CV (ni como palabra completa ni como acrónimo)
+2. Si la palabra está en habilidades pero NO en experiencia/proyectos, NO la marques como faltante
+3. En su lugar, menciona en recommendations que sería mejor incluir ejemplos prácticos de uso
+4. Si encuentras el acrónimo de una palabra clave en cualquier parte del CV, NO la marques como faltante
+
+Sé específico, objetivo y proporciona recomendaciones accionables.
+""".strip()
+
+_ATS_INSTRUCTIONS = f"{_ATS_RUBRIC}\n\n{_ATS_MARKDOWN_FORMAT}"
+_ATS_JSON_INSTRUCTIONS = f"{_ATS_RUBRIC}\n\n{_ATS_JSON_FORMAT}"
+
+
+def _ats_context_documents(cv_content: str, job_description: str) -> List[str]:
+    """Bloques previos al CV: criterios según el tipo de puesto, descripción y palabras clave detectadas."""
+    
+    # Detectar si es puesto entry-level
+    is_entry_level = detect_entry_level_position(job_description)
     
-    return prompt.strip()
+    # Ajustar criterios según tipo de puesto
+    if is_entry_level:
+        criteria = "DETECCIÓN AUTOMÁTICA: Este es un PUESTO ENTRY-LEVEL/SIN EXPERIENCIA REQUERIDA\n\n" + _ENTRY_LEVEL_CRITERIA
+    else:
+        criteria = "DETECCIÓN AUTOMÁTICA: Este es un PUESTO CON EXPERIENCIA REQUERIDA\n\n" + _STANDARD_CRITERIA
+    
+    documents = [document_block("DE LOS CRITERIOS SEGÚN EL TIPO DE PUESTO", criteria)]
+    if job_description.strip():
+        documents.append(f"--- DESCRIPCIÓN DEL PUESTO ---\n{job_description.strip()}\n--- FIN DESCRIPCIÓN ---")
+        # Coincidencias ya resueltas localmente: solo términos del diccionario (acrónimos y traducciones)
+        found, missing = match_dictionary_keywords(job_description, cv_content)
+        documents.append(document_block(
+            "DE LAS PALABRAS CLAVE DETECTADAS",
+            f"Encontradas en el CV: {', '.join(found) or 'ninguna'}\n"
+            f"Faltantes en el CV: {', '.join(missing) or 'ninguna'}",
+        ))
+    return documents
+
+
+def _build_ats_analysis_prompt(cv_content: str, job_description: str, structured: bool = False) -> str:
+    """
+    Construye el prompt para análisis ATS (instrucciones fijas primero, documentos al final).
+    Con `structured` se pide la respuesta en JSON en lugar de markdown.
+    """
+    documents = _ats_context_documents(cv_content, job_description)
+    documents.append(document_block("DEL CV", cv_content))
+    
+    instructions = _ATS_JSON_INSTRUCTIONS if structured else _ATS_INSTRUCTIONS
+    return assemble_prompt(instructions, *documents)
 
 
-def _parse_ats_analysis(analysis_text: str) -> Dict:
+def _format_previous_analysis(analysis: Dict) -> str:
+    """Resumen del análisis anterior para el prompt de re-análisis."""
+    lines = [f"Score: {analysis.get('score', 0)}/100 ({analysis.get('level', 'N/A')})"]
+    for criterion, detail in analysis.get("details", {}).items():
+        lines.append(f"- {criterion}: {detail}")
+    for label, key in (("Fortalezas", "strengths"), ("Debilidades", "weaknesses"),
+                       ("Recomendaciones", "recommendations")):
+        if analysis.get(key):
+            lines.append(f"{label}:")
+            lines.extend(f"- {item}" for item in analysis[key])
+    return "\n".join(lines)
+
+
+def _build_ats_reanalysis_prompt(cv_content: str, job_description: str, previous_analysis: Dict,
+                                 changed, removed, structured: bool = False) -> str:
     """
-    Parsea el texto de análisis de la IA y extrae información estructurada.
+    Prompt de re-análisis: mismas instrucciones que el análisis completo, pero
+    en lugar del CV van el análisis anterior y solo las secciones modificadas.
     """
+    changed_titles = {section.title for section in changed}
+    unchanged = [section.title for section in split_sections(cv_content) if section.title not in changed_titles]
+    modified = "\n\n".join(section.text for section in changed) or "(ninguna)"
+    if removed:
+        modified += "\n\nSecciones eliminadas: " + ", ".join(section.title for section in removed)
+
+    documents = _ats_context_documents(cv_content, job_description)
+    documents.append(document_block("DEL ANÁLISIS ANTERIOR", _format_previous_analysis(previous_analysis)))
+    documents.append(document_block("DE LAS SECCIONES SIN CAMBIOS", ", ".join(unchanged) or "(ninguna)"))
+    documents.append(document_block("DE LAS SECCIONES MODIFICADAS", modified))
+    documents.append(document_block("DE LA RE-EVALUACIÓN", _ATS_REANALYSIS_NOTE))
     
-    result = {
+    instructions = _ATS_JSON_INSTRUCTIONS if structured else _ATS_INSTRUCTIONS
+    return assemble_prompt(instructions, *documents)
+
+
+_ATS_REANALYSIS_NOTE = """
+El candidato editó su CV después del análisis anterior. Solo cambiaron las
+secciones del bloque SECCIONES MODIFICADAS (texto completo nuevo) y las
+listadas como eliminadas; las secciones sin cambios son las mismas que
+produjeron el análisis anterior. Recalcula los criterios afectados por los
+cambios, conserva la evaluación del resto y responde con el análisis completo
+actualizado en el formato indicado.
+""".strip()
+
+
+def _build_ats_repair_prompt(prompt: str, failed: List[str]) -> str:
+    """Prompt de reparación: el original más una nota que pide solo los campos inválidos."""
+    note = (
+        f"Tu respuesta anterior tenía campos inválidos o faltantes: {', '.join(failed)}.\n"
+        "Responde únicamente esos campos, corregidos según el formato indicado."
+    )
+    return assemble_prompt(prompt, document_block("DE LA CORRECCIÓN", note))
+
+
+def _ats_repair_schema(failed: List[str]) -> Dict:
+    """Esquema restringido a los campos que hay que reparar."""
+    return {
+        "type": "object",
+        "properties": {field: ATS_ANALYSIS_SCHEMA["properties"][field] for field in failed},
+        "required": list(failed),
+    }
+
+
+def _is_int(value) -> bool:
+    if isinstance(value, bool):
+        return False
+    return isinstance(value, int) or (isinstance(value, float) and value.is_integer())
+
+
+def _is_string_list(value) -> bool:
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+
+def _valid_detail(detail) -> bool:
+    return (
+        isinstance(detail, dict)
+        and isinstance(detail.get("criterion"), str) and detail["criterion"].strip() != ""
+        and _is_int(detail.get("score")) and _is_int(detail.get("max_score"))
+        and 0 <= detail["score"] <= detail["max_score"]
+        and isinstance(detail.get("comment"), str)
+    )
+
+
+# Validador de cada campo de ATS_ANALYSIS_SCHEMA (sin dependencias, una pasada)
+_ATS_FIELD_VALIDATORS = {
+    "score": lambda value: _is_int(value) and 0 <= value <= 100,
+    "level": lambda value: value in ATS_LEVELS,
+    "keywords_found": _is_string_list,
+    "keywords_missing": _is_string_list,
+    "strengths": _is_string_list,
+    "weaknesses": _is_string_list,
+    "recommendations": _is_string_list,
+    "details": lambda value: isinstance(value, list) and len(value) > 0 and all(map(_valid_detail, value)),
+}
+
+
+def _validate_ats_fields(data: Dict, fields: Optional[List[str]] = None) -> List[str]:
+    """Campos (de `fields`, por defecto todos) que faltan o no cumplen el esquema."""
+    return [
+        field for field in (fields or list(_ATS_FIELD_VALIDATORS))
+        if field not in data or not _ATS_FIELD_VALIDATORS[field](data[field])
+    ]
+
+
+def _parse_json_object(text: str) -> Optional[Dict]:
+    """Objeto JSON de la respuesta (tolera texto o bloques de código alrededor), o None."""
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end < start:
+        return None
+    try:
+        data = json.loads(text[start:end + 1])
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _load_ats_json(text: str) -> Tuple[Optional[Dict], List[str]]:
+    """
+    Carga y valida la respuesta estructurada.
+    Retorna (datos, campos inválidos), o (None, []) si la respuesta no es JSON.
+    """
+    data = _parse_json_object(text)
+    if data is None:
+        print("⚠️ Análisis ATS: la respuesta no es JSON, se usa el parser de markdown")
+        return None, []
+    failed = _validate_ats_fields(data)
+    if failed:
+        print(f"⚠️ Análisis ATS: campos inválidos ({', '.join(failed)}), se piden de nuevo")
+    return data, failed
+
+
+def _merge_ats_repair(data: Dict, failed: List[str], repair_text: str) -> Dict:
+    """Reemplaza en `data` los campos reparados que ahora son válidos."""
+    merged = dict(data)
+    repaired = _parse_json_object(repair_text) or {}
+    still_failed = _validate_ats_fields(repaired, failed)
+    for field in failed:
+        if field not in still_failed:
+            merged[field] = repaired[field]
+    if still_failed:
+        print(f"⚠️ Análisis ATS: siguen inválidos tras la reparación ({', '.join(still_failed)})")
+    return merged
+
+
+def _empty_ats_result(analysis_text: str) -> Dict:
+    return {
         "score": 0,
         "level": "Desconocido",
         "keywords_found": [],
@@ -248,6 +587,38 @@ def _parse_ats_analysis(analysis_text: str) -> Dict:
         "details": {},
         "raw_analysis": analysis_text
     }
+
+
+def _ats_result_from_json(data: Dict, analysis_text: str) -> Dict:
+    """
+    Convierte la respuesta estructurada al mismo formato que `_parse_ats_analysis`.
+    Los campos que siguen inválidos quedan con su valor por defecto.
+    """
+    result = _empty_ats_result(analysis_text)
+    invalid = _validate_ats_fields(data)
+    
+    if "score" not in invalid:
+        result["score"] = int(data["score"])
+    if "level" not in invalid:
+        result["level"] = data["level"]
+    for field in ("keywords_found", "keywords_missing", "strengths", "weaknesses", "recommendations"):
+        if field not in invalid:
+            result[field] = [item.strip() for item in data[field] if item.strip()]
+    if "details" not in invalid:
+        result["details"] = {
+            detail["criterion"].strip(): f"[{int(detail['score'])}/{int(detail['max_score'])}] - {detail['comment'].strip()}"
+            for detail in data["details"]
+        }
+    
+    return result
+
+
+def _parse_ats_analysis(analysis_text: str) -> Dict:
+    """
+    Parsea el texto de análisis de la IA y extrae información estructurada.
+    """
+    
+    result = _empty_ats_result(analysis_text)
     
     # Extraer score
     score_match = re.search(r'\*\*SCORE_ATS:\*\*\s*(\d+)', analysis_text)
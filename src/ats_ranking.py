@@ -0,0 +1,151 @@
+# src/ats_ranking.py
+
+"""
+Ranking de un CV contra muchas descripciones de puesto, sin llamadas a la IA.
+
+`rank_job_descriptions()` extrae las palabras clave de cada descripción con
+`ats_scorer.keyword_counts` (términos del diccionario Aho-Corasick y otros con
+forma técnica, sin las palabras comunes de la redacción), arma una matriz
+dispersa (SciPy CSR) de N descripciones × V términos con pesos BM25 y puntúa
+el CV contra todas con un único producto matriz-vector: el vector del CV
+marca qué términos del vocabulario contiene.
+
+El score de cada descripción (0-100) es la fracción del peso BM25 de sus
+palabras clave que aparece en el CV: los términos raros en el lote (más
+específicos del puesto) pesan más que los que piden todas las ofertas.
+
+NumPy y SciPy se importan en el primer uso, no al importar el módulo.
+
+Configuración por variables de entorno:
+- AI_ATS_RANKING_KEYWORDS: palabras clave por descripción (por defecto 40)
+- AI_ATS_BM25_K1: saturación de la frecuencia de un término (por defecto 1.2)
+- AI_ATS_BM25_B: normalización por longitud de la descripción (por defecto 0.75)
+"""
+
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from .ats_scorer import keyword_counts, keyword_keys
+from .keyword_matcher import fold
+
+
+@dataclass
+class JobMatch:
+    """Una fila del ranking: qué tan bien cubre el CV una descripción del puesto."""
+    index: int
+    title: str
+    score: int
+    matched: List[str] = field(default_factory=list)
+    missing: List[str] = field(default_factory=list)
+
+    def as_dict(self) -> Dict:
+        return {
+            "index": self.index,
+            "title": self.title,
+            "score": self.score,
+            "matched": self.matched,
+            "missing": self.missing,
+        }
+
+
+def _job_title(job_description: str) -> str:
+    """Primera línea no vacía de la descripción (sin negritas), como título de la fila."""
+    for line in job_description.splitlines():
+        line = line.strip().strip("*#").strip()
+        if line:
+            return line[:80]
+    return ""
+
+
+def build_term_matrix(job_descriptions: List[str], max_keywords: Optional[int] = None):
+    """
+    Matriz dispersa BM25 (N descripciones × V términos).
+    Retorna (matriz CSR, claves de los términos, forma a mostrar de cada término).
+    """
+    import numpy as np
+    from scipy.sparse import csr_matrix
+
+    max_keywords = max_keywords or int(os.getenv("AI_ATS_RANKING_KEYWORDS", "40"))
+    k1 = float(os.getenv("AI_ATS_BM25_K1", "1.2"))
+    b = float(os.getenv("AI_ATS_BM25_B", "0.75"))
+
+    vocabulary: Dict[str, int] = {}
+    display: List[str] = []
+    rows, cols, tfs = [], [], []
+    for row, job_description in enumerate(job_descriptions):
+        for keyword, count in keyword_counts(job_description)[:max_keywords]:
+            key = fold(keyword)
+            column = vocabulary.get(key)
+            if column is None:
+                column = vocabulary[key] = len(display)
+                display.append(keyword)
+            rows.append(row)
+            cols.append(column)
+            tfs.append(count)
+
+    shape = (len(job_descriptions), len(display))
+    tf = csr_matrix((np.asarray(tfs, dtype=np.float64), (rows, cols)), shape=shape)
+    tf.sum_duplicates()
+
+    # BM25: idf por término y frecuencia saturada, normalizada por la longitud de cada descripción
+    df = np.bincount(tf.indices, minlength=shape[1])
+    idf = np.log1p((shape[0] - df + 0.5) / (df + 0.5))
+    lengths = np.asarray(tf.sum(axis=1)).ravel()
+    avg_length = lengths.mean() if shape[0] and lengths.mean() else 1.0
+    row_of_entry = np.repeat(np.arange(shape[0]), np.diff(tf.indptr))
+    norm = k1 * (1 - b + b * lengths[row_of_entry] / avg_length)
+    weights = tf.copy()
+    weights.data = idf[tf.indices] * tf.data * (k1 + 1) / (tf.data + norm)
+    return weights, list(vocabulary), display
+
+
+def rank_job_descriptions(cv_content: str, job_descriptions: List[str],
+                          top_k: Optional[int] = None) -> List[Dict]:
+    """
+    Ordena las descripciones de puesto según cuánto del peso de sus palabras
+    clave cubre el CV.
+
+    Args:
+        cv_content: Contenido del CV (por ejemplo, el CV Maestro)
+        job_descriptions: Descripciones de puesto a comparar
+        top_k: Cantidad de filas a retornar (por defecto todas)
+
+    Returns:
+        Lista de dicts ordenada por score descendente, con: index (posición en
+        `job_descriptions`), title, score (0-100), matched y missing (palabras
+        clave de la descripción, de mayor a menor peso).
+    """
+    import numpy as np
+
+    if not job_descriptions:
+        return []
+
+    weights, keys, display = build_term_matrix(job_descriptions)
+    cv_keys = keyword_keys(cv_content)
+    present = np.fromiter((key in cv_keys for key in keys), dtype=np.float64, count=len(keys))
+
+    # Un producto matriz-vector puntúa el CV contra todas las descripciones
+    covered = weights @ present
+    totals = np.asarray(weights.sum(axis=1)).ravel()
+    scores = np.divide(covered, totals, out=np.zeros_like(covered), where=totals > 0) * 100
+
+    order = np.argsort(-scores, kind="stable")
+    if top_k is not None:
+        order = order[:top_k]
+
+    results = []
+    for row in order:
+        start, end = weights.indptr[row], weights.indptr[row + 1]
+        columns = weights.indices[start:end][np.argsort(-weights.data[start:end], kind="stable")]
+        results.append(JobMatch(
+            index=int(row),
+            title=_job_title(job_descriptions[row]),
+            score=int(round(scores[row])),
+            matched=[display[c] for c in columns if present[c]],
+            missing=[display[c] for c in columns if not present[c]],
+        ).as_dict())
+
+    print(f"📊 Ranking ATS local: {len(job_descriptions)} descripciones, {len(keys)} términos, "
+          f"{weights.nnz} entradas en la matriz")
+    return results
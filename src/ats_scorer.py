@@ -0,0 +1,713 @@
+# src/ats_scorer.py
+
+"""
+Score ATS local y determinista (sin llamadas a la IA).
+
+La mayor parte de la rúbrica de `ats_analyzer._build_ats_analysis_prompt` es
+mecánica: presencia de secciones, cobertura de palabras clave de la
+descripción del puesto, verbos de acción, formato de fechas, datos de contacto
+y longitud. `score_ats_locally()` calcula esos puntos por criterio en
+milisegundos, con los mismos pesos que el prompt:
+
+- Puesto con experiencia: Formato y Estructura 25, Palabras Clave 40,
+  Contenido y Claridad 20, Optimización ATS 15
+- Puesto entry-level (`detect_entry_level_position`): Educación y Formación 35,
+  Proyectos y Habilidades 30, Palabras Clave 25, Formato y Estructura 10
+
+Retorna un dict con el mismo formato que `analyze_ats_compatibility` (más
+`source: "local"`), así la interfaz muestra el score al instante y la IA solo
+se llama a demanda para las recomendaciones narrativas.
+
+Re-análisis incremental: el CV se divide en secciones por sus encabezados
+(**Sección**) con `split_sections()`. Las señales y las palabras clave
+encontradas de cada sección se cachean por hash de su contenido y luego se
+suman; al volver a analizar un CV editado solo se recalculan las secciones que
+cambiaron (`changed_sections()` las lista para el prompt reducido de la IA).
+
+Configuración por variables de entorno:
+- AI_ATS_LOCAL_FIRST: 1 para mostrar primero el score local (por defecto) y
+  pedir el análisis de la IA a demanda; 0 para analizar siempre con la IA
+- AI_ATS_SECTION_CACHE_SIZE: secciones cacheadas (LRU, por defecto 512)
+"""
+
+import hashlib
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+from .keyword_matcher import fold, get_automaton
+
+STANDARD_WEIGHTS = {
+    "Formato y Estructura": 25,
+    "Palabras Clave": 40,
+    "Contenido y Claridad": 20,
+    "Optimización ATS": 15,
+}
+ENTRY_LEVEL_WEIGHTS = {
+    "Educación y Formación": 35,
+    "Proyectos y Habilidades": 30,
+    "Palabras Clave": 25,
+    "Formato y Estructura": 10,
+}
+
+# Score fijo de la rúbrica para un CV con solo datos de contacto
+EMPTY_CV_SCORE = 15
+# Palabras clave tomadas de la descripción del puesto
+MAX_JOB_KEYWORDS = 25
+# Sin descripción del puesto: términos técnicos distintos para la cobertura completa
+TECHNICAL_TERMS_TARGET = 12
+# Longitud apropiada (1-2 páginas), en palabras
+MIN_WORDS = 300
+MAX_WORDS = 1100
+
+# Encabezados de sección reconocidos (en minúsculas y sin tildes)
+SECTION_ALIASES = {
+    "resumen": ("extracto", "resumen", "perfil", "acerca de", "summary", "profile", "about"),
+    "experiencia": ("experiencia", "trayectoria", "historial laboral", "experience", "employment",
+                    "work history"),
+    "proyectos": ("proyectos", "projects", "portfolio", "portafolio"),
+    "educacion": ("educacion", "formacion", "estudios", "education", "academic"),
+    "certificaciones": ("certificaciones", "cursos", "certifications", "courses", "licencias"),
+    "habilidades": ("aptitudes", "habilidades", "competencias", "conocimientos", "skills",
+                    "tecnologias", "herramientas"),
+    "idiomas": ("idiomas", "languages"),
+}
+CORE_SECTIONS = ("experiencia", "educacion", "habilidades")
+SECTION_LABELS = {
+    "resumen": "Extracto/Resumen", "experiencia": "Experiencia", "proyectos": "Proyectos",
+    "educacion": "Educación", "certificaciones": "Certificaciones", "habilidades": "Habilidades",
+    "idiomas": "Idiomas",
+}
+
+# Raíces de verbos de acción (sin tildes): "desarrollé", "desarrollar", "developed"...
+ACTION_VERB_STEMS = (
+    "administr", "analic", "analiz", "aument", "automatic", "automatiz", "capacit", "colabor",
+    "configur", "constru", "coordin", "cree", "crea", "dirig", "disen", "document", "elabor",
+    "ejecut", "establec", "evalu", "gestion", "implement", "impuls", "increment", "integr",
+    "investig", "lider", "logr", "manten", "mantuv", "mejor", "migr", "monitor", "negoci",
+    "optimic", "optimiz", "organic", "organiz", "planific", "program", "redisen", "reduj", "reduc",
+    "resolv", "supervis", "desarroll", "despleg", "desplegu", "entren", "fund", "lanc", "lanz",
+    "analy", "automat", "built", "build", "coordinat", "creat", "deliver", "deploy", "design",
+    "develop", "improv", "increas", "launch", "led", "lead", "maintain", "manag", "mentor",
+    "migrat", "optimi", "train",
+)
+
+# Palabras que no son palabras clave aunque aparezcan en mayúsculas (encabezados
+# como "REQUISITOS" o "ABOUT US") o con forma técnica ("y/o", "full-time")
+_STOPWORDS = {
+    # Español
+    "a", "al", "ante", "bajo", "con", "contra", "de", "del", "desde", "durante", "el", "en", "entre",
+    "es", "esta", "este", "estas", "estos", "hacia", "hasta", "la", "las", "lo", "los", "mas", "mediante",
+    "muy", "ni", "no", "nos", "o", "para", "pero", "por", "que", "se", "segun", "ser", "sera", "si",
+    "sin", "sobre", "su", "sus", "te", "tu", "tus", "u", "un", "una", "uno", "unos", "unas", "y", "ya",
+    "yo", "y/o", "como", "cuando", "donde", "tener", "nuestro", "nuestra", "nuestros", "nuestras",
+    "nosotros", "otros", "otras", "p.ej",
+    # Inglés
+    "an", "and", "and/or", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is",
+    "of", "on", "or", "our", "so", "that", "the", "their", "this", "to", "us", "we", "will", "with",
+    "you", "your", "about", "also", "must", "plus", "e.g", "i.e", "etc",
+    "full-time", "part-time", "on-site", "hands-on", "fast-paced", "long-term", "cross-functional",
+    # Vocabulario de avisos de empleo
+    "anos", "experiencia", "puesto", "trabajo", "empresa", "equipo", "buscamos", "requisitos",
+    "conocimiento", "conocimientos", "manejo", "nivel", "deseable", "excluyente", "valorable",
+    "ofrecemos", "somos", "sumate", "unete", "persona", "personas", "perfil", "rol", "area", "tareas",
+    "responsabilidades", "funciones", "beneficios", "modalidad", "ubicacion", "descripcion",
+    "years", "team", "work", "experience", "knowledge", "skills", "strong", "ability", "nice", "join",
+    "role", "requirements", "responsibilities", "qualifications", "benefits", "location", "description",
+    "offer", "remote", "remoto", "hibrido", "hibrida", "presencial",
+    "pasantia", "estudiante", "estudiantes", "junior", "senior", "semi", "sr", "ssr", "jr",
+    "developer", "desarrollador", "desarrolladora", "engineer", "ingeniero", "ingeniera",
+    "analyst", "analista",
+}
+
+_HEADING = re.compile(r"^(?P<mark>#{1,4}\s*|\*\*)?(?P<title>[^*#:]{2,60}?)(?:\*\*)?(?P<colon>:)?$")
+_BULLET = re.compile(r"^(?:[•\-*·▪●◦]|\d+[.)])\s+")
+_TOKEN = re.compile(r"[A-Za-zÀ-ÿ0-9][A-Za-zÀ-ÿ0-9+#.\-/]*[A-Za-zÀ-ÿ0-9+#]|[A-Za-zÀ-ÿ]")
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+_PHONE = re.compile(r"\+?\d[\d\s().-]{7,}\d")
+_YEAR = re.compile(r"\b(?:19|20)\d{2}\b")
+_STANDARD_DATE = re.compile(
+    r"\b(?:(?:0?[1-9]|1[0-2])/(?:19|20)\d{2}|"
+    r"(?:ene|feb|mar|abr|may|jun|jul|ago|sep|sept|oct|nov|dic|jan|apr|aug|dec)[a-z]*\.?\s+(?:de\s+)?(?:19|20)\d{2}|"
+    r"(?:19|20)\d{2})\b"
+)
+_NONSTANDARD_DATE = re.compile(r"(?<![\d/])(?:0?[1-9]|1[0-2])/\d{2}(?![\d/])|'\d{2}\b")
+_COMPLEX_LINE = re.compile(r"\|.*\||\t|[┃│┌┐└┘├┤]")
+_COURSE = re.compile(r"\b(?:curso|certific|diplomatura|bootcamp|course|certificate|posgrado|maestria)")
+
+
+def ats_local_first() -> bool:
+    return os.getenv("AI_ATS_LOCAL_FIRST", "1") == "1"
+
+
+def detect_entry_level_position(job_description: str) -> bool:
+    """Detecta si es un puesto entry-level/sin experiencia requerida."""
+    if not job_description:
+        return False
+
+    job_lower = job_description.lower()
+
+    entry_level_keywords = [
+        # Español
+        "pasante", "pasantía", "trainee", "practicante", "sin experiencia",
+        "entry level", "nivel inicial", "recién graduado", "primer empleo",
+        "estudiante", "aprendiz", "junior", "jr", "graduate program",
+        "sin experiencia previa", "no requiere experiencia", "0 años",
+        "0-1 años", "recien egresado", "egresado",
+
+        # Inglés (común en tech)
+        "intern", "internship", "entry-level", "no experience required",
+        "recent graduate", "new grad", "apprentice", "trainee program",
+        "0 years", "0-1 years", "fresh graduate"
+    ]
+
+    return any(keyword in job_lower for keyword in entry_level_keywords)
+
+
+def _section_key(line: str) -> Optional[str]:
+    """Sección que abre la línea, si es un encabezado reconocido."""
+    match = _HEADING.match(line.strip())
+    if not match or _BULLET.match(line.strip()):
+        return None
+    raw_title = match.group("title").strip()
+    title = fold(raw_title)
+    if len(title.split()) > 5:
+        return None
+    # En texto plano (PDF) solo cuentan los títulos en mayúsculas, con ":" o exactos
+    plain = not match.group("mark") and not match.group("colon") and not raw_title.isupper()
+    for key, aliases in SECTION_ALIASES.items():
+        if (title in aliases) if plain else title.startswith(aliases):
+            return key
+    return None
+
+
+@dataclass(frozen=True)
+class CvSection:
+    """Bloque del CV tal como aparece en el texto: línea de encabezado y contenido."""
+    key: str
+    text: str
+
+    @property
+    def lines(self) -> List[str]:
+        """Líneas no vacías del contenido, sin el encabezado."""
+        lines = [line.strip() for line in self.text.splitlines() if line.strip()]
+        return lines if self.key == "contacto" else lines[1:]
+
+    @property
+    def title(self) -> str:
+        if self.key == "contacto":
+            return "Encabezado y contacto"
+        return self.text.strip().splitlines()[0].strip().strip("*#:").strip()
+
+    @property
+    def digest(self) -> str:
+        return hashlib.sha256(f"{self.key}\0{self.text.strip()}".encode("utf-8")).hexdigest()
+
+
+def split_sections(cv_content: str) -> List[CvSection]:
+    """
+    Bloques del CV en orden, cortando en cada encabezado reconocido. Lo previo
+    al primer encabezado es el bloque "contacto"; los encabezados de cada
+    puesto (**Empresa — Puesto**) quedan dentro de su sección.
+    """
+    sections: List[CvSection] = []
+    key, lines = "contacto", []
+    for line in cv_content.splitlines():
+        section_key = _section_key(line) if line.strip() else None
+        if section_key:
+            if key != "contacto" or "\n".join(lines).strip():
+                sections.append(CvSection(key, "\n".join(lines).strip()))
+            key, lines = section_key, []
+        lines.append(line)
+    if key != "contacto" or "\n".join(lines).strip():
+        sections.append(CvSection(key, "\n".join(lines).strip()))
+    return sections
+
+
+def parse_sections(cv_content: str) -> Dict[str, List[str]]:
+    """Líneas no vacías del CV por sección (las secciones repetidas se unen)."""
+    sections: Dict[str, List[str]] = {"contacto": []}
+    for section in split_sections(cv_content):
+        sections.setdefault(section.key, []).extend(section.lines)
+    return sections
+
+
+def changed_sections(previous_cv: str, cv_content: str) -> Tuple[List[CvSection], List[CvSection]]:
+    """
+    (modificadas o nuevas, eliminadas) entre dos versiones del CV. Las secciones
+    se emparejan por tipo y orden de aparición (la segunda "experiencia" con la
+    segunda "experiencia") y se comparan por hash de su contenido.
+    """
+    def by_occurrence(sections: List[CvSection]) -> Dict[Tuple[str, int], CvSection]:
+        seen: Counter = Counter()
+        paired = {}
+        for section in sections:
+            paired[(section.key, seen[section.key])] = section
+            seen[section.key] += 1
+        return paired
+
+    before = by_occurrence(split_sections(previous_cv))
+    after = by_occurrence(split_sections(cv_content))
+    changed = [section for slot, section in after.items()
+               if slot not in before or before[slot].digest != section.digest]
+    removed = [section for slot, section in before.items() if slot not in after]
+    return changed, removed
+
+
+def _bullets(lines: List[str]) -> List[str]:
+    return [_BULLET.sub("", line) for line in lines if _BULLET.match(line)]
+
+
+def _is_technical(token: str) -> bool:
+    """Términos con forma técnica: siglas, versiones, C#, Node.js, scikit-learn..."""
+    return (
+        any(char.isdigit() or char in "+#./-" for char in token[1:])
+        or (len(token) >= 2 and token.isupper())
+        or any(char.isupper() for char in token[1:])
+    )
+
+
+def _is_hyphenated_word(token: str) -> bool:
+    """Palabras comunes unidas por guiones o barras ("medio-tiempo", "self-motivated")."""
+    return token.islower() and token.replace("-", "").replace("/", "").isalpha()
+
+
+def _keyword_counts(text: str) -> Tuple[List[Tuple[str, int]], int]:
+    """
+    (palabras clave con sus apariciones, cuántas de ellas son términos del diccionario).
+    Fuera del diccionario solo cuentan los términos con forma técnica (siglas,
+    versiones, C#, scikit-learn...): las palabras comunes de la redacción del
+    aviso ("búsqueda", "mensuales", "available") no son requisitos.
+    """
+    terms, covered = get_automaton().scan(text)
+    # Los tokens se comparan sin puntos de borde: ".NET" es "net"
+    covered = {word.strip(".-/") for word in covered}
+    counts: Counter = Counter()
+    first_form: Dict[str, str] = {}
+    for token in _TOKEN.findall(text):
+        token = token.strip(".-/")
+        folded = fold(token)
+        if folded in _STOPWORDS or folded in covered or len(folded) < 2 or folded.isdigit():
+            continue
+        if not _is_technical(token) or _is_hyphenated_word(token):
+            continue
+        counts[folded] += 1
+        first_form.setdefault(folded, token)
+    ranked = sorted(counts, key=lambda term: -counts[term])
+    return list(terms.items()) + [(first_form[term], counts[term]) for term in ranked], len(terms)
+
+
+def keyword_counts(text: str) -> List[Tuple[str, int]]:
+    """
+    Palabras clave de un texto con sus apariciones: primero los términos del
+    diccionario (`keyword_matcher`, con acrónimos y traducciones unificados),
+    luego otros términos con forma técnica, de más a menos frecuentes.
+    """
+    return _keyword_counts(text)[0]
+
+
+def keyword_keys(text: str) -> Set[str]:
+    """Claves (sin tildes ni mayúsculas) de los términos del diccionario y las palabras de un texto."""
+    terms, _ = get_automaton().scan(text)
+    return {fold(term) for term in terms} | {fold(token.strip(".-/")) for token in _TOKEN.findall(text)}
+
+
+def extract_keywords(job_description: str, limit: int = MAX_JOB_KEYWORDS) -> List[str]:
+    """Palabras clave de la descripción del puesto (todos los términos del diccionario y hasta `limit` en total)."""
+    ranked, dictionary_terms = _keyword_counts(job_description)
+    return [keyword for keyword, _ in ranked[:max(limit, dictionary_terms)]]
+
+
+def match_keywords(keywords: List[str], cv_content: str) -> Tuple[List[str], List[str]]:
+    """
+    (encontradas, faltantes) buscando cada palabra clave en todo el CV, sin
+    tildes ni mayúsculas. Los términos del diccionario también coinciden por
+    acrónimo o traducción ("ML" = "Machine Learning" = "aprendizaje automático").
+    """
+    automaton = get_automaton()
+    cv_dictionary_terms = automaton.find_terms(cv_content)
+    cv_terms = {fold(token.strip(".-/")) for token in _TOKEN.findall(cv_content)}
+    cv_folded = fold(cv_content)
+    found, missing = [], []
+    for keyword in keywords:
+        dictionary_terms = automaton.find_terms(keyword)
+        folded = fold(keyword)
+        if dictionary_terms:
+            present = all(term in cv_dictionary_terms for term in dictionary_terms)
+        else:
+            present = folded in cv_terms if " " not in folded else folded in cv_folded
+        (found if present else missing).append(keyword)
+    return found, missing
+
+
+def match_job_keywords(job_description: str, cv_content: str) -> Tuple[List[str], List[str]]:
+    """(encontradas, faltantes) de las palabras clave del puesto en el CV."""
+    return match_keywords(extract_keywords(job_description), cv_content)
+
+
+@dataclass
+class CriterionScore:
+    """Puntos de un criterio de la rúbrica."""
+    name: str
+    points: int
+    max_points: int
+    comment: str
+
+    @property
+    def ratio(self) -> float:
+        return self.points / self.max_points if self.max_points else 0.0
+
+
+def _ratio_points(max_points: int, *parts: Tuple[float, int]) -> int:
+    """Suma de (fracción cumplida, peso) escalada a `max_points`."""
+    total_weight = sum(weight for _, weight in parts)
+    earned = sum(max(0.0, min(1.0, value)) * weight for value, weight in parts)
+    return round(max_points * earned / total_weight) if total_weight else 0
+
+
+@dataclass(frozen=True)
+class SectionSignals:
+    """Señales mecánicas de una sección; `_merge_signals` las suma para todo el CV."""
+    key: str
+    has_content: bool
+    words: int
+    bullets: int
+    quantified: int
+    action_verbs: int
+    standard_dates: int
+    odd_dates: int
+    email: bool
+    phone: bool
+    complex: bool
+    skills: int
+    years: Tuple[int, ...]
+    course: bool
+    dictionary_terms: Tuple[str, ...]
+    technical: Tuple[str, ...]
+    covered: FrozenSet[str]
+    keyword_hits: FrozenSet[str]
+
+
+# Caché LRU de señales por sección: clave = hash del contenido + palabras clave del puesto
+_section_cache: "OrderedDict[str, SectionSignals]" = OrderedDict()
+_section_cache_lock = threading.Lock()
+_section_stats = {"hits": 0, "misses": 0}
+
+
+def _compute_section_signals(section: CvSection, keywords: Optional[List[str]]) -> SectionSignals:
+    lines = section.lines
+    bullets = _bullets(lines)
+    terms, covered = get_automaton().scan(section.text)
+    education = section.key in ("educacion", "certificaciones")
+    return SectionSignals(
+        key=section.key,
+        has_content=bool(lines),
+        words=len(re.findall(r"\w+", section.text)),
+        bullets=len(bullets),
+        quantified=sum(1 for b in bullets if re.search(r"\d", b)),
+        action_verbs=sum(1 for b in bullets if fold(b).startswith(ACTION_VERB_STEMS)),
+        standard_dates=len(_STANDARD_DATE.findall(fold(section.text))),
+        odd_dates=len(_NONSTANDARD_DATE.findall(section.text)),
+        email=bool(_EMAIL.search(section.text)),
+        phone=bool(_PHONE.search(section.text)),
+        complex=any(_COMPLEX_LINE.search(line) for line in section.text.splitlines()),
+        skills=len([item for line in lines for item in re.split(r"[,;|•·]", _BULLET.sub("", line))
+                    if item.strip()]) if section.key == "habilidades" else 0,
+        years=tuple(int(year) for year in _YEAR.findall(" ".join(lines))) if education else (),
+        course=bool(education and _COURSE.search(fold(" ".join(lines)))),
+        dictionary_terms=tuple(terms),
+        technical=tuple(token for token in _TOKEN.findall(section.text) if _is_technical(token)),
+        covered=frozenset(covered),
+        keyword_hits=frozenset(match_keywords(keywords, section.text)[0]) if keywords else frozenset(),
+    )
+
+
+def section_signals(section: CvSection, keywords: Optional[List[str]] = None) -> SectionSignals:
+    """Señales de una sección, recalculadas solo si cambió su contenido o las palabras clave."""
+    key = hashlib.sha256(
+        (section.digest + "\0" + "\n".join(keywords or [])).encode("utf-8")
+    ).hexdigest()
+    with _section_cache_lock:
+        cached = _section_cache.get(key)
+        if cached is not None:
+            _section_cache.move_to_end(key)
+            _section_stats["hits"] += 1
+            return cached
+        _section_stats["misses"] += 1
+
+    signals = _compute_section_signals(section, keywords)
+    with _section_cache_lock:
+        _section_cache[key] = signals
+        max_size = int(os.getenv("AI_ATS_SECTION_CACHE_SIZE", "512"))
+        while len(_section_cache) > max_size:
+            _section_cache.popitem(last=False)
+    return signals
+
+
+def get_section_cache_stats() -> Dict:
+    """Aciertos/fallos de la caché de señales por sección."""
+    with _section_cache_lock:
+        return dict(_section_stats, size=len(_section_cache))
+
+
+def clear_section_cache() -> None:
+    with _section_cache_lock:
+        _section_cache.clear()
+        _section_stats.update(hits=0, misses=0)
+
+
+def _merge_signals(sections: List[SectionSignals], keywords: Optional[List[str]]) -> Dict:
+    """Señales mecánicas de la rúbrica para todo el CV, cada una como fracción entre 0 y 1."""
+    present = {s.key for s in sections if s.key != "contacto" and s.has_content}
+    achievements = [s for s in sections if s.key in ("experiencia", "proyectos")]
+    if not sum(s.bullets for s in achievements):
+        achievements = sections
+    bullets = sum(s.bullets for s in achievements)
+    words = sum(s.words for s in sections)
+
+    if keywords is not None:
+        hits = set().union(*(s.keyword_hits for s in sections))
+        found = [keyword for keyword in keywords if keyword in hits]
+        missing = [keyword for keyword in keywords if keyword not in hits]
+        coverage = len(found) / (len(found) + len(missing)) if found or missing else 0.0
+    else:
+        covered = set().union(*(s.covered for s in sections))
+        found = list(dict.fromkeys(
+            [term for s in sections for term in s.dictionary_terms]
+            + [token for s in sections for token in s.technical if fold(token) not in covered]
+        ))
+        missing = []
+        coverage = len(found) / TECHNICAL_TERMS_TARGET
+
+    standard_dates = sum(s.standard_dates for s in sections)
+    odd_dates = sum(s.odd_dates for s in sections)
+    if standard_dates and not odd_dates:
+        dates = 1.0
+    elif standard_dates:
+        dates = 0.5
+    else:
+        dates = 0.0
+
+    if words < MIN_WORDS:
+        length = words / MIN_WORDS
+    else:
+        length = max(0.3, 1 - max(0, words - MAX_WORDS) / MAX_WORDS)
+
+    years = [year for s in sections for year in s.years]
+    education = any(s.has_content for s in sections if s.key in ("educacion", "certificaciones"))
+    if years and max(years) >= date.today().year - 6:
+        recency = 1.0
+    elif years:
+        recency = 0.5
+    else:
+        recency = 0.3 if education else 0.0
+
+    return {
+        "sections": present,
+        "complex": any(s.complex for s in sections),
+        "keywords_found": found,
+        "keywords_missing": missing,
+        "coverage": min(1.0, coverage),
+        "bullets": bullets,
+        "quantified": (sum(s.quantified for s in achievements) / bullets / 0.3) if bullets else 0.0,
+        "action_verbs": (sum(s.action_verbs for s in achievements) / bullets / 0.6) if bullets else 0.0,
+        "dates": dates,
+        "email": any(s.email for s in sections),
+        "phone": any(s.phone for s in sections),
+        "words": words,
+        "length": length,
+        "skills": sum(s.skills for s in sections) / 8,
+        "courses": 1.0 if "certificaciones" in present or any(s.course for s in sections) else 0.0,
+        "recency": recency,
+    }
+
+
+def _cv_signals(cv_content: str, job_description: str) -> Dict:
+    """Señales de la rúbrica: por sección (cacheadas por contenido) y luego sumadas."""
+    # Sin palabras clave reconocibles en el aviso se evalúan los términos técnicos del CV
+    keywords = extract_keywords(job_description) or None
+    return _merge_signals([section_signals(section, keywords) for section in split_sections(cv_content)],
+                          keywords)
+
+
+def _section_list(keys) -> str:
+    return ", ".join(SECTION_LABELS[key] for key in SECTION_LABELS if key in keys) or "ninguna"
+
+
+def _criterion(weights: Dict[str, int], name: str, parts: List[Tuple[float, int]], comment: str) -> CriterionScore:
+    return CriterionScore(name, _ratio_points(weights[name], *parts), weights[name], comment)
+
+
+def _keywords_comment(s: Dict) -> str:
+    return f"{len(s['keywords_found'])} encontradas, {len(s['keywords_missing'])} faltantes"
+
+
+def _standard_criteria(s: Dict) -> List[CriterionScore]:
+    w = STANDARD_WEIGHTS
+    missing_core = [key for key in CORE_SECTIONS if key not in s["sections"]]
+    contact = (s["email"] + s["phone"]) / 2
+    return [
+        _criterion(
+            w, "Formato y Estructura",
+            [(1 - len(missing_core) / 3, 15), ("resumen" in s["sections"], 5), (not s["complex"], 5)],
+            f"Secciones: {_section_list(s['sections'])}"
+            + (f"; faltan: {_section_list(missing_core)}" if missing_core else "")
+            + ("; contiene tablas o columnas" if s["complex"] else ""),
+        ),
+        _criterion(w, "Palabras Clave", [(s["coverage"], 1)], _keywords_comment(s)),
+        _criterion(
+            w, "Contenido y Claridad",
+            [(s["quantified"], 6), (s["dates"], 5), (contact, 4), (s["length"], 5)],
+            f"{s['words']} palabras; fechas {'estándar' if s['dates'] == 1 else 'a revisar'}; "
+            f"contacto {'completo' if contact == 1 else 'incompleto'}",
+        ),
+        _criterion(
+            w, "Optimización ATS", [(s["action_verbs"], 9), (s["skills"], 6)],
+            f"{s['bullets']} viñetas de logros; habilidades {'listadas' if s['skills'] >= 1 else 'escasas'}",
+        ),
+    ]
+
+
+def _entry_level_criteria(s: Dict) -> List[CriterionScore]:
+    w = ENTRY_LEVEL_WEIGHTS
+    projects = 1.0 if "proyectos" in s["sections"] else 0.5 if "experiencia" in s["sections"] else 0.0
+    core = sum(key in s["sections"] for key in CORE_SECTIONS) / 3
+    contact = (s["email"] + s["phone"]) / 2
+    return [
+        _criterion(
+            w, "Educación y Formación",
+            [("educacion" in s["sections"], 15), (s["courses"], 10), (s["recency"], 10)],
+            f"Educación {'presente' if 'educacion' in s['sections'] else 'ausente'}; "
+            f"cursos/certificaciones {'sí' if s['courses'] else 'no'}",
+        ),
+        _criterion(
+            w, "Proyectos y Habilidades", [(projects, 10), (s["skills"], 10), (s["action_verbs"], 10)],
+            f"Proyectos {'presentes' if 'proyectos' in s['sections'] else 'ausentes'}; "
+            f"habilidades {'listadas' if s['skills'] >= 1 else 'escasas'}",
+        ),
+        _criterion(w, "Palabras Clave", [(s["coverage"], 1)], _keywords_comment(s)),
+        _criterion(
+            w, "Formato y Estructura", [(core, 6), (not s["complex"], 2), (contact, 2)],
+            f"Secciones: {_section_list(s['sections'])}",
+        ),
+    ]
+
+
+def score_level(score: int) -> str:
+    """Nivel de la rúbrica (ATS_LEVELS) para un score."""
+    if score >= 85:
+        return "Excelente"
+    if score >= 70:
+        return "Bueno"
+    if score >= 55:
+        return "Aceptable"
+    if score >= 35:
+        return "Necesita Mejoras"
+    return "Crítico"
+
+
+def _feedback(s: Dict, entry_level: bool) -> Tuple[List[str], List[str], List[str]]:
+    """Fortalezas, debilidades y recomendaciones mecánicas a partir de las señales."""
+    strengths, weaknesses, recommendations = [], [], []
+    missing_core = [key for key in CORE_SECTIONS if key not in s["sections"]]
+
+    if not missing_core:
+        strengths.append("Incluye las secciones estándar que reconocen los ATS")
+    else:
+        weaknesses.append(f"Faltan secciones estándar: {_section_list(missing_core)}")
+        recommendations.append(f"Agregar las secciones {_section_list(missing_core)} con encabezados estándar")
+    if s["complex"]:
+        weaknesses.append("Contiene tablas o columnas que dificultan el parseo")
+        recommendations.append("Reemplazar tablas y columnas por texto plano con viñetas")
+
+    if s["coverage"] >= 0.7:
+        strengths.append("Buena cobertura de las palabras clave del puesto")
+    elif s["keywords_missing"]:
+        weaknesses.append(f"Cobertura baja de palabras clave ({len(s['keywords_missing'])} faltantes)")
+        recommendations.append("Incorporar las palabras clave faltantes con ejemplos concretos de uso: "
+                               + ", ".join(s["keywords_missing"][:5]))
+
+    if not entry_level:
+        if s["quantified"] >= 1:
+            strengths.append("Logros cuantificados con métricas")
+        elif s["bullets"]:
+            weaknesses.append("Pocos logros cuantificados")
+            recommendations.append("Agregar métricas reales (%, cantidades, plazos) a los logros principales")
+    if s["action_verbs"] >= 1:
+        strengths.append("Las viñetas comienzan con verbos de acción")
+    elif s["bullets"]:
+        recommendations.append("Comenzar cada viñeta con un verbo de acción (desarrollé, implementé, lideré...)")
+
+    if s["dates"] < 1:
+        weaknesses.append("Fechas ausentes o en formato no estándar")
+        recommendations.append("Usar un formato de fechas consistente (MM/YYYY - MM/YYYY)")
+    if not (s["email"] and s["phone"]):
+        weaknesses.append("Datos de contacto incompletos")
+        recommendations.append("Incluir email y teléfono en el encabezado del CV")
+    if s["words"] < MIN_WORDS:
+        weaknesses.append(f"CV breve ({s['words']} palabras)")
+    elif s["words"] > 2 * MAX_WORDS:
+        weaknesses.append(f"CV extenso ({s['words']} palabras, más de 2 páginas)")
+        recommendations.append("Reducir el CV a 1-2 páginas priorizando lo relevante para el puesto")
+    if entry_level and "proyectos" not in s["sections"]:
+        recommendations.append("Agregar una sección de Proyectos con trabajos académicos o personales")
+    return strengths, weaknesses, recommendations
+
+
+def score_ats_locally(cv_content: str, job_description: str = "") -> Dict:
+    """
+    Calcula el score ATS de un CV sin llamar a la IA.
+
+    Args:
+        cv_content: Contenido del CV a analizar
+        job_description: Descripción del puesto (opcional, define las palabras
+            clave y el tipo de puesto)
+
+    Returns:
+        Dict con el formato de `analyze_ats_compatibility` (score, level,
+        keywords_found, keywords_missing, strengths, weaknesses,
+        recommendations, details) más source="local" y entry_level.
+    """
+    entry_level = detect_entry_level_position(job_description)
+    s = _cv_signals(cv_content, job_description)
+    result = {
+        "score": 0,
+        "level": "",
+        "keywords_found": s["keywords_found"],
+        "keywords_missing": [f"{kw} (sugerencia: agregar en experiencia/proyectos con ejemplo concreto)"
+                             for kw in s["keywords_missing"]],
+        "strengths": [],
+        "weaknesses": [],
+        "recommendations": [],
+        "details": {},
+        "raw_analysis": "",
+        "source": "local",
+        "entry_level": entry_level,
+    }
+
+    # Misma validación previa que el prompt: solo datos de contacto
+    if not s["sections"]:
+        result.update(
+            score=EMPTY_CV_SCORE,
+            level="Crítico",
+            weaknesses=["CV prácticamente vacío - falta experiencia, educación y proyectos"],
+            recommendations=["Completar todas las secciones con información detallada antes de postular"],
+        )
+        return result
+
+    criteria = _entry_level_criteria(s) if entry_level else _standard_criteria(s)
+    score = sum(criterion.points for criterion in criteria)
+    strengths, weaknesses, recommendations = _feedback(s, entry_level)
+    result.update(
+        score=score,
+        level=score_level(score),
+        strengths=strengths,
+        weaknesses=weaknesses,
+        recommendations=recommendations,
+        details={c.name: f"[{c.points}/{c.max_points}] - {c.comment}" for c in criteria},
+    )
+    return result
@@ -1,6 +1,9 @@
-import pdfplumber
 from typing import List, Tuple, Optional
-from .pdf_validator import validate_pdf, PDFValidationResult
+from .pdf_validator import load_pdf_libraries, validate_pdf, PDFValidationResult
+
+# Separador entre páginas en el texto extraído (lo usa text_compaction para
+# detectar encabezados y pies de página repetidos)
+PAGE_BREAK = "\f"
 
 
 def extract_text_from_pdf(file, validate: bool = True) -> Tuple[Optional[str], Optional[PDFValidationResult]]:
@@ -25,6 +28,7 @@ def extract_text_from_pdf(file, validate: bool = True) -> Tuple[Optional[str], O
         validation_result = None
     
     try:
+        pdfplumber, _, _ = load_pdf_libraries()
         file.seek(0)
         with pdfplumber.open(file) as pdf:
             pages_text = []
@@ -32,7 +36,7 @@ def extract_text_from_pdf(file, validate: bool = True) -> Tuple[Optional[str], O
                 text = page.extract_text() or ""
                 pages_text.append(text)
             
-            extracted_text = "\n".join(pages_text)
+            extracted_text = f"\n{PAGE_BREAK}\n".join(pages_text)
             return extracted_text, validation_result
 
     except Exception as e:
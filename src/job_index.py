@@ -0,0 +1,436 @@
+# src/job_index.py
+
+"""
+Índice invertido persistente de descripciones de puesto.
+
+Cada descripción que se usa para generar un CV Target se agrega al índice
+(`add_job_description()`): sus palabras clave (`ats_scorer.keyword_counts`)
+se guardan como listas de postings (término → documentos con su frecuencia)
+junto con las estadísticas por término que necesita BM25: document frequency,
+frecuencia máxima y longitud mínima de documento. Agregar o quitar una
+descripción actualiza solo las filas de sus términos, sin reconstruir nada.
+
+`search()` devuelve las k descripciones que mejor encajan con un CV sin
+recorrer todo el corpus: solo se leen las listas de los términos del CV y se
+evalúan con max-score (document-at-a-time). Cada término tiene una cota
+superior de su aporte BM25; cuando la suma de las cotas de los términos menos
+valiosos no alcanza al k-ésimo mejor score, esas listas dejan de dirigir la
+búsqueda: se dejan de leer de disco y solo se consultan (por clave primaria)
+para completar el score de documentos que aún pueden entrar en el top-k. Las
+listas esenciales se leen por bloques a medida que avanza el recorrido.
+
+Las palabras clave son las de `keyword_counts` (diccionario y términos con
+forma técnica). Un índice guardado con otra versión de la extracción
+(INDEX_VERSION) se reindexa desde el texto de sus descripciones al abrirlo.
+
+Las cotas son conservadoras: al quitar un documento no se recalculan la
+frecuencia máxima ni la longitud mínima, que siguen siendo cotas válidas.
+
+El índice vive en SQLite. Si el archivo no se puede abrir, se usa una base en
+memoria durante el proceso.
+
+Configuración por variables de entorno:
+- AI_JOB_INDEX_ENABLED: "0" desactiva el índice (por defecto activado)
+- AI_JOB_INDEX_PATH: ruta del archivo SQLite (por defecto .cache/job_index.sqlite)
+- AI_ATS_RANKING_KEYWORDS: palabras clave indexadas por descripción (por defecto 40)
+- AI_ATS_BM25_K1 / AI_ATS_BM25_B: parámetros de BM25 (por defecto 1.2 y 0.75)
+"""
+
+import hashlib
+import heapq
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .ats_ranking import _job_title
+from .ats_scorer import keyword_counts, keyword_keys
+from .keyword_matcher import fold
+
+DEFAULT_INDEX_PATH = os.path.join(".cache", "job_index.sqlite")
+# Términos por consulta IN (...): por debajo del límite de variables de SQLite
+SQL_VARIABLES_PER_QUERY = 500
+# Postings leídos por bloque al recorrer una lista
+POSTINGS_BLOCK = 32
+# Versión de la extracción de palabras clave: un índice guardado con otra se reindexa al abrirlo
+INDEX_VERSION = 2
+
+
+class JobIndex:
+    """Índice invertido de descripciones de puesto guardado en SQLite."""
+
+    def __init__(self, db_path: str = DEFAULT_INDEX_PATH, max_keywords: Optional[int] = None):
+        self.db_path = db_path
+        self.max_keywords = max_keywords or int(os.getenv("AI_ATS_RANKING_KEYWORDS", "40"))
+        self.k1 = float(os.getenv("AI_ATS_BM25_K1", "1.2"))
+        self.b = float(os.getenv("AI_ATS_BM25_B", "0.75"))
+        self._lock = threading.Lock()
+        self._last_search: Dict = {}
+        self._conn = self._open_db(db_path)
+
+    def _open_db(self, db_path: str) -> sqlite3.Connection:
+        """Abre (o crea) la base SQLite. Si falla, el índice vive solo en memoria."""
+        try:
+            directory = os.path.dirname(db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._create_tables(conn)
+            self._reindex_if_outdated(conn)
+            return conn
+        except (sqlite3.Error, OSError) as e:
+            print(f"⚠️ Índice de puestos: no se pudo abrir {db_path} ({e}). Se usará solo memoria.")
+            conn = sqlite3.connect(":memory:", check_same_thread=False)
+            self._create_tables(conn)
+            return conn
+
+    @staticmethod
+    def _create_tables(conn: sqlite3.Connection) -> None:
+        conn.executescript(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " id INTEGER PRIMARY KEY,"
+            " hash TEXT UNIQUE NOT NULL,"
+            " title TEXT NOT NULL,"
+            " text TEXT NOT NULL,"
+            " length INTEGER NOT NULL,"
+            " added_at REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS terms ("
+            " term TEXT PRIMARY KEY,"
+            " display TEXT NOT NULL,"
+            " df INTEGER NOT NULL,"
+            " max_tf INTEGER NOT NULL,"
+            " min_length INTEGER NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS postings ("
+            " term TEXT NOT NULL,"
+            " doc_id INTEGER NOT NULL,"
+            " tf INTEGER NOT NULL,"
+            " length INTEGER NOT NULL,"
+            " PRIMARY KEY (term, doc_id)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS idx_postings_doc ON postings (doc_id);"
+            "CREATE TABLE IF NOT EXISTS corpus ("
+            " id INTEGER PRIMARY KEY CHECK (id = 1),"
+            " documents INTEGER NOT NULL,"
+            " total_length INTEGER NOT NULL);"
+            # Una sola fila con los totales, para no recorrer la tabla de documentos en cada búsqueda
+            "INSERT OR IGNORE INTO corpus (id, documents, total_length)"
+            " SELECT 1, COUNT(*), COALESCE(SUM(length), 0) FROM documents;"
+        )
+        conn.commit()
+
+    def _reindex_if_outdated(self, conn: sqlite3.Connection) -> None:
+        """Vuelve a extraer las palabras clave de cada descripción si el índice es de otra versión."""
+        if conn.execute("PRAGMA user_version").fetchone()[0] == INDEX_VERSION:
+            return
+        documents = conn.execute("SELECT id, text FROM documents").fetchall()
+        with conn:
+            conn.execute("DELETE FROM postings")
+            conn.execute("DELETE FROM terms")
+            total_length = 0
+            for doc_id, text in documents:
+                terms = self._terms_of(text)
+                length = sum(count for _, count in terms.values())
+                conn.execute("UPDATE documents SET length = ? WHERE id = ?", (length, doc_id))
+                self._insert_terms(conn, doc_id, terms, length)
+                total_length += length
+            conn.execute("UPDATE corpus SET documents = ?, total_length = ? WHERE id = 1",
+                         (len(documents), total_length))
+        conn.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+        if documents:
+            print(f"🗂️ Índice de puestos: {len(documents)} descripciones reindexadas (versión {INDEX_VERSION})")
+
+    @staticmethod
+    def _insert_terms(conn: sqlite3.Connection, doc_id: int, terms: Dict[str, Tuple[str, int]],
+                      length: int) -> None:
+        """Postings de un documento y estadísticas de sus términos."""
+        conn.executemany(
+            "INSERT INTO postings (term, doc_id, tf, length) VALUES (?, ?, ?, ?)",
+            [(key, doc_id, count, length) for key, (_, count) in terms.items()],
+        )
+        conn.executemany(
+            "INSERT INTO terms (term, display, df, max_tf, min_length) VALUES (?, ?, 1, ?, ?) "
+            "ON CONFLICT (term) DO UPDATE SET df = df + 1,"
+            " max_tf = MAX(max_tf, excluded.max_tf),"
+            " min_length = MIN(min_length, excluded.min_length)",
+            [(key, display, count, length) for key, (display, count) in terms.items()],
+        )
+
+    def _terms_of(self, job_description: str) -> Dict[str, Tuple[str, int]]:
+        """Palabras clave de una descripción: clave normalizada → (forma a mostrar, frecuencia)."""
+        terms: Dict[str, Tuple[str, int]] = {}
+        for keyword, count in keyword_counts(job_description)[:self.max_keywords]:
+            key = fold(keyword)
+            display, previous = terms.get(key, (keyword, 0))
+            terms[key] = (display, previous + count)
+        return terms
+
+    def add(self, job_description: str, title: Optional[str] = None) -> Optional[int]:
+        """
+        Agrega una descripción al índice y retorna su id.
+        Una descripción ya indexada (mismo texto) no se duplica: retorna el id existente.
+        """
+        text = (job_description or "").strip()
+        if not text:
+            return None
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        terms = self._terms_of(text)
+        length = sum(count for _, count in terms.values())
+
+        with self._lock:
+            row = self._conn.execute("SELECT id FROM documents WHERE hash = ?", (digest,)).fetchone()
+            if row is not None:
+                return row[0]
+            try:
+                with self._conn:
+                    doc_id = self._conn.execute(
+                        "INSERT INTO documents (hash, title, text, length, added_at) VALUES (?, ?, ?, ?, ?)",
+                        (digest, title or _job_title(text), text, length, time.time()),
+                    ).lastrowid
+                    self._insert_terms(self._conn, doc_id, terms, length)
+                    self._conn.execute("UPDATE corpus SET documents = documents + 1,"
+                                       " total_length = total_length + ? WHERE id = 1", (length,))
+            except sqlite3.Error as e:
+                print(f"⚠️ Índice de puestos: error escribiendo ({e})")
+                return None
+        return doc_id
+
+    def remove(self, doc_id: int) -> bool:
+        """Quita una descripción del índice. Retorna False si no existía."""
+        with self._lock:
+            try:
+                with self._conn:
+                    row = self._conn.execute("SELECT length FROM documents WHERE id = ?", (doc_id,)).fetchone()
+                    if row is None:
+                        return False
+                    self._conn.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
+                    self._conn.execute("UPDATE corpus SET documents = documents - 1,"
+                                       " total_length = total_length - ? WHERE id = 1", (row[0],))
+                    terms = [row[0] for row in self._conn.execute(
+                        "SELECT term FROM postings WHERE doc_id = ?", (doc_id,))]
+                    self._conn.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+                    self._conn.executemany("UPDATE terms SET df = df - 1 WHERE term = ?",
+                                           [(term,) for term in terms])
+                    self._conn.executemany("DELETE FROM terms WHERE term = ? AND df <= 0",
+                                           [(term,) for term in terms])
+            except sqlite3.Error as e:
+                print(f"⚠️ Índice de puestos: error borrando ({e})")
+                return False
+        return True
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT documents FROM corpus WHERE id = 1").fetchone()[0]
+
+    def document_frequency(self, term: str) -> int:
+        """Cantidad de descripciones indexadas que contienen el término."""
+        with self._lock:
+            row = self._conn.execute("SELECT df FROM terms WHERE term = ?", (fold(term),)).fetchone()
+        return row[0] if row else 0
+
+    def _weight(self, idf: float, tf: int, length: int, avg_length: float) -> float:
+        norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+        return idf * tf * (self.k1 + 1) / (tf + norm)
+
+    def _term_stats(self, keys: List[str]) -> List[Tuple[str, int, int, int]]:
+        """(term, df, max_tf, min_length) de los términos indexados, consultados por bloques."""
+        stats = []
+        for start in range(0, len(keys), SQL_VARIABLES_PER_QUERY):
+            chunk = keys[start:start + SQL_VARIABLES_PER_QUERY]
+            placeholders = ",".join("?" * len(chunk))
+            stats.extend(self._conn.execute(
+                f"SELECT term, df, max_tf, min_length FROM terms WHERE term IN ({placeholders})", chunk
+            ).fetchall())
+        return stats
+
+    def _probe(self, term: str, doc_id: int) -> Optional[Tuple[int, int]]:
+        """(tf, longitud) del posting de un documento en una lista que ya no dirige la búsqueda."""
+        return self._conn.execute(
+            "SELECT tf, length FROM postings WHERE term = ? AND doc_id = ?", (term, doc_id)).fetchone()
+
+    def search(self, cv_content: str, k: int = 5, early_termination: bool = True) -> List[Dict]:
+        """
+        Las k descripciones indexadas que mejor encajan con el CV (BM25).
+
+        Solo se leen de disco las estadísticas de los términos del CV y, a
+        medida que avanza la búsqueda, sus listas de postings: una lista que
+        deja de ser esencial no se sigue leyendo y solo se consulta por
+        documento (búsqueda por clave primaria).
+
+        Args:
+            cv_content: Contenido del CV
+            k: Cantidad de resultados
+            early_termination: False puntúa todos los documentos candidatos
+                (misma respuesta, útil para comparar)
+
+        Returns:
+            Lista de dicts ordenada por score descendente, con: id, title,
+            score (BM25), matched y missing (palabras clave de la descripción,
+            de mayor a menor frecuencia).
+        """
+        with self._lock:
+            n_docs, total_length = self._conn.execute(
+                "SELECT documents, total_length FROM corpus WHERE id = 1").fetchone()
+            avg_length = total_length / n_docs if n_docs and total_length else 1.0
+
+            lists: List[_PostingList] = []
+            for term, df, max_tf, min_length in self._term_stats(sorted(keyword_keys(cv_content))):
+                idf = math.log1p((n_docs - df + 0.5) / (df + 0.5))
+                upper_bound = self._weight(idf, max_tf, min_length, avg_length)
+                lists.append(_PostingList(self._conn, term, idf, upper_bound, df))
+            # Max-score: listas ordenadas de menor a mayor cota superior
+            lists.sort(key=lambda posting_list: (posting_list.upper_bound, posting_list.term))
+            prefix = list(_accumulate([posting_list.upper_bound for posting_list in lists]))
+
+            top: List[Tuple[float, int]] = []  # heap de (score, -doc_id)
+            threshold = 0.0
+            essential = 0  # listas [0, essential) solo se consultan, no dirigen la búsqueda
+            evaluated = probes = 0
+
+            while essential < len(lists):
+                candidate = min((posting_list.doc_id for posting_list in lists[essential:]
+                                 if posting_list.doc_id is not None), default=None)
+                if candidate is None:
+                    break
+                evaluated += 1
+
+                score = 0.0
+                for posting_list in lists[essential:]:
+                    if posting_list.doc_id == candidate:
+                        score += self._weight(posting_list.idf, posting_list.tf, posting_list.length, avg_length)
+                        posting_list.advance()
+
+                for i in range(essential - 1, -1, -1):
+                    if early_termination and len(top) == k and score + prefix[i] <= threshold:
+                        break
+                    probes += 1
+                    posting = self._probe(lists[i].term, candidate)
+                    if posting is not None:
+                        score += self._weight(lists[i].idf, posting[0], posting[1], avg_length)
+
+                if len(top) < k:
+                    heapq.heappush(top, (score, -candidate))
+                elif (score, -candidate) > top[0]:
+                    heapq.heapreplace(top, (score, -candidate))
+                if len(top) == k:
+                    threshold = top[0][0]
+                    while early_termination and essential < len(lists) and prefix[essential] <= threshold:
+                        lists[essential].close()
+                        essential += 1
+
+            for posting_list in lists:
+                posting_list.close()
+            ranked = sorted(top, reverse=True)
+            query_terms = {posting_list.term for posting_list in lists}
+            results = [self._describe(-neg_id, score, query_terms) for score, neg_id in ranked if score > 0]
+            self._last_search = {
+                "query_terms": len(lists),
+                "postings": sum(posting_list.df for posting_list in lists),
+                "postings_read": sum(posting_list.read for posting_list in lists),
+                "evaluated_docs": evaluated,
+                "probes": probes,
+                "documents": n_docs,
+            }
+
+        print(f"🗂️ Índice de puestos: {n_docs} descripciones, {len(lists)} términos del CV, "
+              f"{evaluated} documentos evaluados, {self._last_search['postings_read']} de "
+              f"{self._last_search['postings']} postings leídos")
+        return results
+
+    def _describe(self, doc_id: int, score: float, query_terms) -> Dict:
+        """Fila de resultado con las palabras clave encontradas y faltantes de la descripción."""
+        title = self._conn.execute("SELECT title FROM documents WHERE id = ?", (doc_id,)).fetchone()[0]
+        terms = self._conn.execute(
+            "SELECT p.term, t.display FROM postings p JOIN terms t ON t.term = p.term "
+            "WHERE p.doc_id = ? ORDER BY p.tf DESC, p.term", (doc_id,)).fetchall()
+        return {
+            "id": doc_id,
+            "title": title,
+            "score": round(score, 3),
+            "matched": [display for term, display in terms if term in query_terms],
+            "missing": [display for term, display in terms if term not in query_terms],
+        }
+
+    def search_stats(self) -> Dict:
+        """Contadores de la última búsqueda (documentos evaluados frente a postings leídos)."""
+        with self._lock:
+            return dict(self._last_search)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class _PostingList:
+    """Lista de postings de un término, leída de SQLite por bloques a medida que se recorre."""
+
+    def __init__(self, conn: sqlite3.Connection, term: str, idf: float, upper_bound: float, df: int):
+        self.term = term
+        self.idf = idf
+        self.upper_bound = upper_bound
+        self.df = df
+        self.read = 0
+        self._cursor = conn.execute(
+            "SELECT doc_id, tf, length FROM postings WHERE term = ? ORDER BY doc_id", (term,))
+        self._block: List[Tuple[int, int, int]] = []
+        self._position = 0
+        self.doc_id: Optional[int] = None
+        self.tf = self.length = 0
+        self.advance()
+
+    def advance(self) -> None:
+        """Pasa al siguiente posting (doc_id queda en None al terminar la lista)."""
+        if self._position >= len(self._block):
+            self._block = self._cursor.fetchmany(POSTINGS_BLOCK) if self._cursor is not None else []
+            self._position = 0
+            self.read += len(self._block)
+            if not self._block:
+                self.doc_id = None
+                return
+        self.doc_id, self.tf, self.length = self._block[self._position]
+        self._position += 1
+
+    def close(self) -> None:
+        if self._cursor is not None:
+            self._cursor.close()
+            self._cursor = None
+
+
+def _accumulate(values: List[float]):
+    total = 0.0
+    for value in values:
+        total += value
+        yield total
+
+
+# Instancia global compartida por todas las sesiones del proceso
+_job_index: Optional[JobIndex] = None
+_job_index_lock = threading.Lock()
+
+
+def get_job_index() -> Optional[JobIndex]:
+    """
+    Devuelve el índice global configurado desde variables de entorno.
+    Retorna None si está desactivado (AI_JOB_INDEX_ENABLED=0).
+    """
+    global _job_index
+
+    if os.getenv("AI_JOB_INDEX_ENABLED", "1") == "0":
+        return None
+
+    with _job_index_lock:
+        if _job_index is None:
+            _job_index = JobIndex(os.getenv("AI_JOB_INDEX_PATH") or DEFAULT_INDEX_PATH)
+    return _job_index
+
+
+def add_job_description(job_description: str) -> Optional[int]:
+    """Agrega una descripción al índice global (si está activado)."""
+    index = get_job_index()
+    return index.add(job_description) if index is not None else None
+
+
+def recommend_job_descriptions(cv_content: str, k: int = 5) -> List[Dict]:
+    """Las k descripciones del índice global que mejor encajan con el CV."""
+    index = get_job_index()
+    return index.search(cv_content, k) if index is not None else []
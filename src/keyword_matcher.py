@@ -0,0 +1,326 @@
+# src/keyword_matcher.py
+
+"""
+Búsqueda de palabras clave técnicas con un autómata Aho-Corasick.
+
+Un diccionario versionado agrupa cada término técnico con sus acrónimos,
+variantes de escritura y equivalentes en español/inglés ("Machine Learning"
+= "ML" = "aprendizaje automático"). Todas las variantes se compilan en un
+único autómata sobre el texto en minúsculas y sin tildes, así una sola
+pasada lineal sobre la descripción del puesto (o el CV) devuelve los términos
+canónicos presentes, sin importar la forma en que aparezcan.
+
+El autómata compilado se cachea por versión y huella (hash del contenido del
+archivo adicional) del diccionario: solo se reconstruye si cambia el
+diccionario incorporado o el archivo, aunque no se actualice su "version".
+Si el archivo no existe o no es un JSON válido se usa el incorporado.
+
+Configuración por variables de entorno:
+- AI_ATS_KEYWORD_DICTIONARY: ruta a un JSON {"version": "...", "terms": {"Término": ["variante", ...]}}
+  que se suma al diccionario incorporado (opcional)
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import unicodedata
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+DICTIONARY_VERSION = "2026.10.1"
+
+# Término canónico -> acrónimos, variantes y traducciones (el canónico se incluye solo).
+# Las variantes no son palabras comunes sueltas ("rest", "cloud", "node"): solo
+# cuentan junto a su calificador ("rest api", "node.js", "spring boot").
+BUILTIN_TERMS: Dict[str, Tuple[str, ...]] = {
+    # Lenguajes
+    "Python": ("python3",),
+    "JavaScript": ("js", "ecmascript", "es6"),
+    "TypeScript": ("ts",),
+    "Java": (),
+    "C#": ("csharp", "c sharp", ".net c#"),
+    "C++": ("cpp",),
+    "Golang": ("go lang",),
+    "Rust": (),
+    "PHP": (),
+    "Ruby": (),
+    "Kotlin": (),
+    "Swift": (),
+    "Scala": (),
+    "SQL": ("lenguaje sql",),
+    "HTML": ("html5",),
+    "CSS": ("css3",),
+    "Bash": ("shell scripting", "scripting en bash"),
+    "VBA": ("visual basic for applications",),
+    # Frameworks y librerías
+    "React": ("react.js", "reactjs"),
+    "Angular": ("angularjs", "angular.js"),
+    "Vue.js": ("vue", "vuejs"),
+    "Node.js": ("nodejs", "node js"),
+    "Express": ("express.js", "expressjs"),
+    "Django": (),
+    "Flask": (),
+    "FastAPI": ("fast api",),
+    "Spring Boot": ("springboot", "spring framework"),
+    ".NET": ("dotnet", "asp.net", ".net core"),
+    "Pandas": (),
+    "NumPy": (),
+    "scikit-learn": ("sklearn", "scikit learn"),
+    "TensorFlow": (),
+    "PyTorch": (),
+    "Streamlit": (),
+    # Datos
+    "PostgreSQL": ("postgres", "psql"),
+    "MySQL": (),
+    "SQL Server": ("mssql", "ms sql server"),
+    "Oracle": ("oracle database", "pl/sql", "plsql"),
+    "MongoDB": ("mongo",),
+    "Redis": (),
+    "Elasticsearch": ("elastic search", "elk"),
+    "Bases de datos": ("base de datos", "databases", "database", "bbdd"),
+    "Power BI": ("powerbi",),
+    "Tableau": (),
+    "Excel": ("microsoft excel", "ms excel", "excel avanzado"),
+    "ETL": ("extract transform load",),
+    "Data Warehouse": ("almacen de datos", "datawarehouse"),
+    "Big Data": (),
+    "Spark": ("apache spark", "pyspark"),
+    "Airflow": ("apache airflow",),
+    # Nube e infraestructura
+    "AWS": ("amazon web services",),
+    "Azure": ("microsoft azure",),
+    "GCP": ("google cloud", "google cloud platform"),
+    "Docker": ("contenedores docker", "docker containers"),
+    "Kubernetes": ("k8s",),
+    "Terraform": (),
+    "Linux": ("gnu/linux", "ubuntu", "debian", "centos"),
+    "CI/CD": ("integracion continua", "continuous integration", "despliegue continuo",
+              "continuous delivery", "continuous deployment"),
+    "DevOps": (),
+    "Git": ("github", "gitlab", "bitbucket", "control de versiones", "version control"),
+    "Jenkins": (),
+    "Microservicios": ("microservices", "microservice", "microservicio"),
+    "Cloud Computing": ("computacion en la nube", "servicios en la nube", "cloud services"),
+    # Conceptos y prácticas
+    "API REST": ("restful", "rest api", "api rest", "apis rest", "rest apis", "api restful"),
+    "GraphQL": (),
+    "Programación orientada a objetos": ("poo", "oop", "object oriented programming",
+                                         "object-oriented programming"),
+    "Machine Learning": ("ml", "aprendizaje automatico"),
+    "Inteligencia Artificial": ("ia", "ai", "artificial intelligence"),
+    "Deep Learning": ("aprendizaje profundo",),
+    "NLP": ("procesamiento de lenguaje natural", "natural language processing", "pln"),
+    "LLM": ("llms", "large language models", "modelos de lenguaje"),
+    "Ciencia de datos": ("data science", "data scientist", "cientifico de datos", "cientifica de datos"),
+    "Análisis de datos": ("data analysis", "data analytics", "analisis de datos", "analista de datos",
+                          "data analyst"),
+    "Testing": ("pruebas de software", "software testing", "qa", "quality assurance", "control de calidad", "aseguramiento de calidad"),
+    "Pruebas unitarias": ("unit testing", "unit tests", "tests unitarios", "pytest", "junit"),
+    "TDD": ("test driven development", "desarrollo guiado por pruebas"),
+    "Seguridad informática": ("ciberseguridad", "cybersecurity", "seguridad de la informacion",
+                              "information security", "infosec"),
+    "Redes": ("networking", "tcp/ip", "redes de computadoras"),
+    "UX/UI": ("ux", "ui", "experiencia de usuario", "user experience", "interfaz de usuario",
+              "user interface"),
+    "Figma": (),
+    "SEO": ("search engine optimization", "posicionamiento web"),
+    "ERP": ("sap",),
+    "CRM": ("salesforce",),
+    # Metodologías y gestión
+    "Metodologías ágiles": ("agile", "agil", "agiles", "metodologias agiles", "metodologia agil"),
+    "Scrum": ("scrum master",),
+    "Kanban": (),
+    "Jira": (),
+    "Gestión de proyectos": ("project management", "gestion de proyectos", "pmp", "project manager"),
+    "ITIL": (),
+    "Lean": ("lean manufacturing", "six sigma"),
+    # Habilidades blandas
+    "Trabajo en equipo": ("teamwork", "team player", "trabajo colaborativo"),
+    "Liderazgo": ("leadership", "liderar equipos", "team lead"),
+    "Comunicación": ("communication", "comunicacion efectiva", "communication skills"),
+    "Resolución de problemas": ("problem solving", "resolucion de problemas"),
+    "Inglés": ("english", "idioma ingles"),
+}
+
+
+@dataclass(frozen=True)
+class KeywordDictionary:
+    """Diccionario de términos con versión y huella (la clave de la caché del autómata)."""
+    version: str
+    terms: Dict[str, Tuple[str, ...]]
+    fingerprint: str = ""
+
+
+def fold(text: str) -> str:
+    """Minúsculas y sin tildes, para comparar términos."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", fold(text))
+
+
+BUILTIN_DICTIONARY = KeywordDictionary(DICTIONARY_VERSION, BUILTIN_TERMS)
+
+# Diccionario adicional por (ruta, fecha de modificación)
+_custom: Dict[Tuple[str, float], KeywordDictionary] = {}
+_custom_lock = threading.Lock()
+
+
+def load_dictionary() -> KeywordDictionary:
+    """Diccionario incorporado, más el de AI_ATS_KEYWORD_DICTIONARY si está configurado."""
+    path = os.getenv("AI_ATS_KEYWORD_DICTIONARY", "").strip()
+    if not path:
+        return BUILTIN_DICTIONARY
+    try:
+        key = (path, os.path.getmtime(path))
+    except OSError:
+        print(f"⚠️ Diccionario de palabras clave no encontrado: {path}, se usa el incorporado")
+        return BUILTIN_DICTIONARY
+
+    with _custom_lock:
+        if key not in _custom:
+            try:
+                with open(path, "rb") as f:
+                    raw = f.read()
+                data = json.loads(raw.decode("utf-8"))
+                terms = dict(BUILTIN_TERMS)
+                terms.update({str(term): tuple(str(v) for v in variants)
+                              for term, variants in data.get("terms", {}).items()})
+                version = f"{DICTIONARY_VERSION}+{data.get('version', key[1])}"
+            except (OSError, ValueError, AttributeError, TypeError) as e:
+                print(f"⚠️ Diccionario de palabras clave inválido: {path} ({e}), se usa el incorporado")
+                return BUILTIN_DICTIONARY
+            _custom.clear()
+            _custom[key] = KeywordDictionary(version, terms, hashlib.sha256(raw).hexdigest()[:16])
+        return _custom[key]
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char in "_+#"
+
+
+class KeywordAutomaton:
+    """Autómata Aho-Corasick sobre todas las variantes (normalizadas) del diccionario."""
+
+    def __init__(self, dictionary: KeywordDictionary):
+        self.version = dictionary.version
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[str, int]]] = [[]]
+        for canonical, variants in dictionary.terms.items():
+            for variant in {_normalize(canonical), *(_normalize(v) for v in variants)}:
+                if variant:
+                    self._add(variant, canonical)
+        self._build_failure_links()
+
+    @property
+    def states(self) -> int:
+        return len(self._goto)
+
+    def _add(self, pattern: str, canonical: str) -> None:
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = next_state
+        if (canonical, len(pattern)) not in self._out[state]:
+            self._out[state].append((canonical, len(pattern)))
+
+    def _build_failure_links(self) -> None:
+        """Enlaces de fallo por BFS; cada estado hereda las salidas de su enlace."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[str, int, int]]:
+        """(término canónico, inicio, fin) de cada aparición como palabra completa, en una pasada."""
+        text = _normalize(text)
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for canonical, length in out[state]:
+                start = index - length + 1
+                before = text[start - 1] if start > 0 else " "
+                after = text[index + 1] if index + 1 < len(text) else " "
+                # "js" no debe coincidir dentro de "node.js", ni "java" dentro de "javascript"
+                if not (_is_word_char(before) or before == ".") and not _is_word_char(after):
+                    yield canonical, start, index + 1
+
+    def find_terms(self, text: str) -> Dict[str, int]:
+        """Términos canónicos presentes y sus apariciones, en orden de primera aparición."""
+        return self.scan(text)[0]
+
+    def scan(self, text: str) -> Tuple[Dict[str, int], Set[str]]:
+        """
+        Una pasada: (términos y apariciones, palabras normalizadas que forman
+        parte de alguna coincidencia). Las palabras sirven para no repetir como
+        palabra clave suelta lo que ya es parte de un término ("ágiles").
+        """
+        counts: Dict[str, int] = {}
+        covered: Set[str] = set()
+        normalized = _normalize(text)
+        for canonical, start, end in self.iter_matches(normalized):
+            counts[canonical] = counts.get(canonical, 0) + 1
+            covered.update(normalized[start:end].split())
+        return counts, covered
+
+
+# Autómatas compilados por (versión, huella) del diccionario
+_automata: Dict[Tuple[str, str], KeywordAutomaton] = {}
+_automata_lock = threading.Lock()
+
+
+def get_automaton(dictionary: Optional[KeywordDictionary] = None) -> KeywordAutomaton:
+    """Autómata del diccionario (por defecto `load_dictionary()`), compilado una vez por versión y contenido."""
+    dictionary = dictionary or load_dictionary()
+    key = (dictionary.version, dictionary.fingerprint)
+    with _automata_lock:
+        automaton = _automata.get(key)
+        if automaton is None:
+            automaton = KeywordAutomaton(dictionary)
+            # Un archivo editado sin cambiar su "version" reemplaza al autómata anterior
+            for stale in [k for k in _automata if k[0] == dictionary.version]:
+                del _automata[stale]
+            _automata[key] = automaton
+            print(f"🔤 Diccionario de palabras clave {dictionary.version} compilado "
+                  f"({len(dictionary.terms)} términos, {automaton.states} estados)")
+        return automaton
+
+
+def find_keywords(text: str) -> List[str]:
+    """Términos canónicos del diccionario presentes en `text`."""
+    return list(get_automaton().find_terms(text))
+
+
+def match_dictionary_keywords(job_description: str, cv_content: str) -> Tuple[List[str], List[str]]:
+    """
+    Términos del diccionario de la descripción del puesto: (presentes en el CV,
+    faltantes). Una pasada por cada texto.
+    """
+    automaton = get_automaton()
+    cv_terms = automaton.find_terms(cv_content)
+    found, missing = [], []
+    for term in automaton.find_terms(job_description):
+        (found if term in cv_terms else missing).append(term)
+    return found, missing
@@ -1,13 +1,26 @@
 # src/pdf_validator.py
 
-import pdfplumber
+import functools
 from typing import Tuple, Optional
-try:
-    from PyPDF2 import PdfReader
-    from PyPDF2.errors import PdfReadError
-except ImportError:
-    from pypdf import PdfReader
-    from pypdf.errors import PdfReadError
+
+
+@functools.lru_cache(maxsize=None)
+def load_pdf_libraries() -> Tuple:
+    """
+    Importa pdfplumber y PyPDF2/pypdf recién en el primer uso: suman ~150 ms
+    que el primer render de la app no necesita.
+
+    Returns:
+        Tuple (pdfplumber, PdfReader, PdfReadError)
+    """
+    import pdfplumber
+    try:
+        from PyPDF2 import PdfReader
+        from PyPDF2.errors import PdfReadError
+    except ImportError:
+        from pypdf import PdfReader
+        from pypdf.errors import PdfReadError
+    return pdfplumber, PdfReader, PdfReadError
 
 
 class PDFValidationResult:
@@ -32,6 +45,7 @@ def validate_pdf(file, max_size_mb: int = 10) -> PDFValidationResult:
     Returns:
         PDFValidationResult con el resultado de la validación
     """
+    pdfplumber, PdfReader, PdfReadError = load_pdf_libraries()
     
     # 1. Validación de tamaño
     file.seek(0, 2)  # Ir al final del archivo
@@ -1,6 +1,36 @@
 # src/prompts.py
+import hashlib
 from textwrap import dedent
 
+# Todos los prompts se arman igual: primero las instrucciones estáticas
+# (idénticas byte a byte en cada llamada) y al final los documentos variables,
+# cada uno entre marcadores `--- INICIO ... ---` / `--- FIN ... ---`.
+# OpenAI y Gemini cachean los prefijos repetidos: un prefijo estable se cobra
+# con descuento y reduce el tiempo al primer token (ver `cached_tokens` en las
+# métricas de ai_service).
+DOCUMENT_MARKER = "\n--- "
+
+
+def document_block(label: str, content: str) -> str:
+    """Bloque de documento delimitado, ej. `document_block("DEL CV BASE", texto)`."""
+    return f"--- INICIO {label} ---\n{content.strip()}\n--- FIN {label} ---"
+
+
+def assemble_prompt(instructions: str, *documents: str) -> str:
+    """Une las instrucciones estáticas con los bloques de documentos al final."""
+    return "\n\n".join((instructions,) + documents)
+
+
+def static_prefix(prompt: str) -> str:
+    """Parte estática del prompt: todo lo anterior al primer marcador de documento."""
+    index = prompt.find(DOCUMENT_MARKER)
+    return prompt if index < 0 else prompt[:index]
+
+
+def prefix_fingerprint(prompt: str) -> str:
+    """Huella corta del prefijo estático; igual huella = prefijo cacheable por el proveedor."""
+    return hashlib.sha256(static_prefix(prompt).encode("utf-8")).hexdigest()[:12]
+
 
 def build_prompt_master(cv_text: str, new_studies: str) -> str:
     """
@@ -15,7 +45,14 @@ def build_prompt_master(cv_text: str, new_studies: str) -> str:
     - Secciones claras con logros cuantificables al inicio.
     - Estructura optimizada para parsing automático.
     """
-    prompt = f"""
+    return assemble_prompt(
+        _MASTER_INSTRUCTIONS,
+        document_block("DEL CV BASE", cv_text),
+        document_block("DEL PROGRAMA DE ESTUDIOS", new_studies),
+    )
+
+
+_MASTER_INSTRUCTIONS = dedent("""
     Actúa como un experto redactor de CVs y orientador profesional de alto nivel,
     especializado en optimización ATS (Applicant Tracking Systems).
 
@@ -101,22 +138,14 @@ def build_prompt_master(cv_text: str, new_studies: str) -> str:
     - Usa palabras clave relevantes de manera natural (no keyword stuffing)
     - Prioriza verbos de acción: desarrollé, implementé, optimicé, lideré, etc.
 
-    A continuación se incluyen los documentos:
-
-    --- INICIO DEL CV BASE ---
-    {cv_text}
-    --- FIN DEL CV BASE ---
-
-    --- INICIO DEL PROGRAMA DE ESTUDIOS ---
-    {new_studies}
-    --- FIN DEL PROGRAMA DE ESTUDIOS ---
-
     Devuelve únicamente el texto completo del CV Maestro actualizado,
     optimizado para ATS y listo para copiar y pegar en una plantilla de CV.
     No añadas comentarios, explicaciones ni encabezados externos.
     El formato debe ser texto plano con secciones claramente diferenciadas.
-    """
-    return dedent(prompt).strip()
+
+    A continuación se incluyen los documentos (CV base y programa de estudios):
+    """).strip()
+
 
 def build_prompt_targeted(master_cv: str, job_description: str) -> str:
     """
@@ -166,19 +195,19 @@ def build_prompt_targeted(master_cv: str, job_description: str) -> str:
     - Sin comentarios adicionales, sin explicaciones y sin texto fuera del CV.
     """
 
-    prompt = f"""
+    return assemble_prompt(
+        _TARGETED_INSTRUCTIONS,
+        document_block("DEL CV MAESTRO", master_cv),
+        document_block("DE LA DESCRIPCIÓN DEL PUESTO", job_description),
+    )
+
+
+_TARGETED_INSTRUCTIONS = dedent("""
     Actúa como un experto en CVs y en sistemas ATS.
 
     Tu tarea es generar un **CV Target** orientado al puesto descrito,
     utilizando EXCLUSIVAMENTE la información contenida en el CV Maestro.
-
-    --- INICIO DEL CV MAESTRO ---
-    {master_cv}
-    --- FIN DEL CV MAESTRO ---
-
-    --- INICIO DE LA DESCRIPCIÓN DEL PUESTO ---
-    {job_description}
-    --- FIN DE LA DESCRIPCIÓN DEL PUESTO ---
+    Ambos documentos se incluyen al final.
 
     VALIDACIÓN PREVIA OBLIGATORIA:
     Antes de generar el CV Target, verifica que el CV Maestro contenga información
@@ -239,9 +268,10 @@ def build_prompt_targeted(master_cv: str, job_description: str) -> str:
     - Si el CV Maestro tiene datos insuficientes: devuelve exactamente "ERROR_DATOS_INSUFICIENTES"
     - Sin explicaciones, sin comentarios y sin notas para la persona usuaria.
     - El resultado debe ser apto para pegarse directamente en una plantilla de CV.
-    """
 
-    return dedent(prompt).strip()
+    A continuación se incluyen el CV Maestro y la descripción del puesto:
+    """).strip()
+
 
 def build_prompt_job_structuring(raw_job_description: str) -> str:
     """
@@ -251,10 +281,16 @@ def build_prompt_job_structuring(raw_job_description: str) -> str:
     - Limpiar y organizar una descripción de puesto.
     - Extraer secciones clave como Perfil, Responsabilidades y Requisitos.
     """
-    prompt = f"""
+    return assemble_prompt(
+        _JOB_STRUCTURING_INSTRUCTIONS,
+        document_block("DE LA DESCRIPCIÓN EN BRUTO", raw_job_description),
+    )
+
+
+_JOB_STRUCTURING_INSTRUCTIONS = dedent("""
     Actúa como un analista de datos experto en Recursos Humanos.
 
-    Tu tarea es tomar el siguiente texto de una descripción de puesto, que puede estar
+    Tu tarea es tomar el texto de una descripción de puesto, que puede estar
     desordenado o contener información irrelevante, y estructurarlo de forma clara y concisa.
 
     Debes extraer la información esencial y organizarla en las siguientes secciones:
@@ -274,16 +310,12 @@ def build_prompt_job_structuring(raw_job_description: str) -> str:
        frases genéricas o información que no describa el rol, el perfil o los requisitos.
     4. Si no encuentras información para una sección concreta, omite esa sección en el resultado final.
 
-    Aquí está el texto en bruto para procesar:
-
-    ---
-    {raw_job_description}
-    ---
-
     Devuelve únicamente el texto estructurado, sin comentarios, sin introducciones
     y sin explicaciones adicionales.
-    """
-    return dedent(prompt).strip()
+
+    Aquí está el texto en bruto para procesar:
+    """).strip()
+
 
 
 def build_prompt_linkedin_profile(master_cv: str) -> str:
@@ -303,11 +335,14 @@ def build_prompt_linkedin_profile(master_cv: str) -> str:
       o metodologías solo en formación o proyectos, se debe expresar como tal
       (formación/proyectos), no como tareas del rol actual si no está indicado.
     """
-    prompt = f"""
+    return assemble_prompt(_LINKEDIN_INSTRUCTIONS, document_block("DEL CV MAESTRO", master_cv))
+
+
+_LINKEDIN_INSTRUCTIONS = dedent("""
     Actúa como especialista en Marca Personal y LinkedIn, con foco en perfiles
     profesionales de distintos campos (tecnología, negocio, datos, etc.).
 
-    Tu tarea es leer el siguiente CV Maestro y, basándote EXCLUSIVAMENTE en su contenido,
+    Tu tarea es leer el CV Maestro (incluido al final) y, basándote EXCLUSIVAMENTE en su contenido,
     generar un PERFIL COMPLETO DE LINKEDIN que incluya:
 
     1) TITULAR (HEADLINE)
@@ -382,9 +417,38 @@ def build_prompt_linkedin_profile(master_cv: str) -> str:
     - ...
 
     Aquí tienes el CV Maestro completo para usar como única fuente de verdad:
+    """).strip()
+
+
+def build_prompt_study_condensation(chunk: str) -> str:
+    """
+    Construye el prompt para condensar un fragmento de un programa de estudios
+    (paso "map" del modo por fragmentos de `study_condenser.py`).
 
-    --- INICIO DEL CV MAESTRO ---
-    {master_cv}
-    --- FIN DEL CV MAESTRO ---
+    El resultado conserva todo lo que el CV Maestro puede usar (materias,
+    temas, herramientas, carga horaria, certificaciones) sin la prosa.
     """
-    return dedent(prompt).strip()
\ No newline at end of file
+    return assemble_prompt(
+        _STUDY_CONDENSATION_INSTRUCTIONS,
+        document_block("DEL FRAGMENTO DEL PROGRAMA", chunk),
+    )
+
+
+_STUDY_CONDENSATION_INSTRUCTIONS = dedent("""
+    Actúa como un asistente que resume programas de estudio para armar un CV.
+
+    Recibirás un fragmento de un programa de estudios, plan de carrera o curso.
+    Condénsalo en una lista breve bajo el título **Programa condensado** que conserve:
+    - Nombre de la formación, institución, fechas y carga horaria (si aparecen)
+    - Materias, módulos o unidades
+    - Temas, tecnologías, herramientas, lenguajes y metodologías mencionados
+    - Proyectos, prácticas y certificaciones
+
+    Reglas:
+    - No inventes ni deduzcas información que no esté en el fragmento.
+    - Omite objetivos genéricos, bibliografía, criterios de evaluación y texto administrativo.
+    - Usa listas con guiones (`- `) y frases cortas.
+    - Devuelve únicamente la lista, sin introducciones ni comentarios.
+
+    Aquí está el fragmento:
+    """).strip()
@@ -0,0 +1,256 @@
+# src/study_condenser.py
+
+"""
+Modo por fragmentos (map-reduce) para programas de estudio extensos.
+
+Cuando se suben varios programas largos como "nuevos estudios", todo el texto
+iba en una sola llamada de `build_prompt_master`, que puede superar el
+contexto del modelo o tardar demasiado. Si el texto supera un umbral de
+tokens, `condense_studies()`:
+
+1. Parte el texto en documentos (`[Documento: nombre]` o los marcadores
+   `--- INICIO_DOCUMENTO: ... ---` sin compactar) y cada documento en
+   fragmentos por cortes de página y párrafos, hasta AI_CONDENSE_CHUNK_TOKENS.
+2. Condensa los fragmentos en paralelo con `generate_cv_outputs` (lote con
+   concurrencia acotada, etapa "condense").
+3. Une los resúmenes en el orden original, bajo el encabezado de su documento,
+   para usarlos como `new_studies` del CV Maestro.
+
+Los resúmenes se cachean en memoria por hash del fragmento: volver a generar
+el CV Maestro, o subir de nuevo un programa ya visto, no repite llamadas. Si un
+fragmento falla se usa su texto original.
+
+Configuración por variables de entorno:
+- AI_CONDENSE_ENABLED: 1 para condensar los estudios extensos (por defecto), 0 para enviarlos completos
+- AI_CONDENSE_THRESHOLD_TOKENS: tokens a partir de los cuales se condensa (por defecto 12000)
+- AI_CONDENSE_CHUNK_TOKENS: tokens máximos por fragmento (por defecto 4000)
+- AI_CONDENSE_CONCURRENCY: fragmentos condensados a la vez (por defecto AI_BATCH_CONCURRENCY)
+- AI_CONDENSE_MAX_INPUT_TOKENS: tope de los estudios subidos cuando se pueden condensar (por defecto 400000)
+- AI_CONDENSE_CACHE_SIZE: resúmenes de fragmentos recordados (por defecto 256)
+"""
+
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from .ai_service import generate_cv_outputs
+from .ai_tokens import PromptTooLargeError, check_prompt_size, count_tokens
+from .extract_pdf import PAGE_BREAK
+from .prompts import build_prompt_study_condensation
+
+_DOCUMENT_MARKER = re.compile(
+    r"^(?:\[Documento: (?P<name>.+)\]|--- INICIO_DOCUMENTO: (?P<raw>.+?) ---)$", re.MULTILINE
+)
+_DOCUMENT_END = re.compile(r"^--- FIN_DOCUMENTO: .+? ---$", re.MULTILINE)
+_SUMMARY_TITLE = "**Programa condensado**"
+
+
+def condense_enabled() -> bool:
+    return os.getenv("AI_CONDENSE_ENABLED", "1") == "1"
+
+
+def condense_threshold_tokens() -> int:
+    return int(os.getenv("AI_CONDENSE_THRESHOLD_TOKENS", "12000"))
+
+
+def needs_condensing(text: str) -> bool:
+    """Si los estudios son lo bastante extensos para el modo por fragmentos."""
+    return condense_enabled() and count_tokens(text) > condense_threshold_tokens()
+
+
+def check_studies_size(text: str) -> int:
+    """
+    Mide los estudios subidos y retorna sus tokens.
+    Con el modo por fragmentos activo el tope es AI_CONDENSE_MAX_INPUT_TOKENS
+    (cada llamada recibe un solo fragmento); si no, AI_MAX_PROMPT_TOKENS.
+    Lanza `PromptTooLargeError` si lo supera.
+    """
+    if not condense_enabled():
+        return check_prompt_size(text, stage="upload")
+    tokens = count_tokens(text)
+    limit = int(os.getenv("AI_CONDENSE_MAX_INPUT_TOKENS", "400000"))
+    if limit and tokens > limit:
+        print(f"📏 Estudios de ~{tokens} tokens superan AI_CONDENSE_MAX_INPUT_TOKENS={limit}")
+        raise PromptTooLargeError(tokens, limit, "upload")
+    return tokens
+
+
+def split_documents(text: str) -> List[Tuple[str, str]]:
+    """
+    Parte el texto en (nombre, contenido) por documento.
+    El texto previo al primer marcador (o sin marcadores) va con nombre vacío.
+    """
+    text = _DOCUMENT_END.sub("", text)
+    matches = list(_DOCUMENT_MARKER.finditer(text))
+    documents = []
+    if not matches or text[:matches[0].start()].strip():
+        documents.append(("", text[:matches[0].start()] if matches else text))
+    for match, end in zip(matches, [m.start() for m in matches[1:]] + [len(text)]):
+        documents.append((match.group("name") or match.group("raw"), text[match.end():end]))
+    return [(name, body.strip()) for name, body in documents if body.strip()]
+
+
+def _split_oversized(text: str, max_tokens: int) -> List[str]:
+    """
+    Parte por la mitad (por palabras; sin espacios, por caracteres) un texto que
+    no entra en un fragmento, hasta que cada parte entre. Cubre las líneas muy
+    largas de los PDFs extraídos sin saltos de línea.
+    """
+    if len(text) <= 1 or count_tokens(text) <= max_tokens:
+        return [text]
+    words = text.split()
+    if len(words) > 1:
+        half = len(words) // 2
+        first, second = " ".join(words[:half]), " ".join(words[half:])
+    else:
+        half = len(text) // 2
+        first, second = text[:half], text[half:]
+    return _split_oversized(first, max_tokens) + _split_oversized(second, max_tokens)
+
+
+def _units(body: str, max_tokens: int) -> List[str]:
+    """
+    Páginas y párrafos de un documento; los que no entran en un fragmento, por
+    líneas, y las líneas que tampoco entran, por palabras.
+    """
+    units = []
+    for page in body.split(PAGE_BREAK):
+        for paragraph in re.split(r"\n\s*\n", page):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            if count_tokens(paragraph) <= max_tokens:
+                units.append(paragraph)
+                continue
+            for line in paragraph.split("\n"):
+                if line.strip():
+                    units.extend(_split_oversized(line.strip(), max_tokens))
+    return units
+
+
+def split_chunks(body: str, max_tokens: Optional[int] = None) -> List[str]:
+    """Agrupa páginas y párrafos consecutivos en fragmentos de hasta `max_tokens`."""
+    max_tokens = max_tokens or int(os.getenv("AI_CONDENSE_CHUNK_TOKENS", "4000"))
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for unit in _units(body, max_tokens):
+        tokens = count_tokens(unit)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        current.append(unit)
+        current_tokens += tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+# Resúmenes por hash del prompt del fragmento, con expulsión LRU
+_summaries: "OrderedDict[str, str]" = OrderedDict()
+_summaries_lock = threading.Lock()
+_summary_stats = {"hits": 0, "misses": 0}
+
+
+def _summary_key(prompt: str) -> str:
+    # El prompt incluye las instrucciones: si cambian, los resúmenes viejos no se reutilizan
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+def _cached_summary(key: str) -> Optional[str]:
+    with _summaries_lock:
+        summary = _summaries.get(key)
+        if summary is not None:
+            _summaries.move_to_end(key)
+            _summary_stats["hits"] += 1
+        else:
+            _summary_stats["misses"] += 1
+        return summary
+
+
+def _store_summary(key: str, summary: str) -> None:
+    with _summaries_lock:
+        _summaries[key] = summary
+        max_size = int(os.getenv("AI_CONDENSE_CACHE_SIZE", "256"))
+        while len(_summaries) > max_size:
+            _summaries.popitem(last=False)
+
+
+def get_condense_stats() -> Dict:
+    """Aciertos/fallos de la caché de resúmenes de fragmentos."""
+    with _summaries_lock:
+        return dict(_summary_stats, size=len(_summaries))
+
+
+def clear_condense_cache() -> None:
+    with _summaries_lock:
+        _summaries.clear()
+        _summary_stats.update(hits=0, misses=0)
+
+
+def _clean_summary(summary: str) -> str:
+    """Quita el título que pide el prompt (el encabezado del documento ya lo identifica)."""
+    summary = summary.strip()
+    if summary.startswith(_SUMMARY_TITLE):
+        summary = summary[len(_SUMMARY_TITLE):].strip()
+    return summary
+
+
+def condense_studies(text: str, model: Optional[str] = None, provider: str = "auto",
+                     concurrency: Optional[int] = None) -> str:
+    """
+    Condensa los estudios si superan AI_CONDENSE_THRESHOLD_TOKENS; si no, los
+    retorna sin cambios.
+
+    Parámetros:
+        text: Texto de los estudios (salida de `process_uploaded_pdfs`).
+        model, provider: Igual que en `generate_cv_output`.
+        concurrency: Fragmentos a la vez (por defecto AI_CONDENSE_CONCURRENCY
+            o, sin ella, AI_BATCH_CONCURRENCY).
+
+    Retorna:
+        El texto condensado, con un `[Documento: nombre]` por documento.
+    """
+    if not text or not needs_condensing(text):
+        return text
+
+    chunks: List[Tuple[int, str]] = []
+    documents = split_documents(text)
+    for index, (_, body) in enumerate(documents):
+        chunks.extend((index, chunk) for chunk in split_chunks(body))
+
+    prompts = [build_prompt_study_condensation(chunk) for _, chunk in chunks]
+    keys = [_summary_key(prompt) for prompt in prompts]
+    summaries: List[Optional[str]] = [_cached_summary(key) for key in keys]
+    pending = [i for i, summary in enumerate(summaries) if summary is None]
+
+    print(f"🗜️ Condensando estudios: {len(documents)} documento(s), {len(chunks)} fragmento(s), "
+          f"{len(chunks) - len(pending)} en caché")
+
+    if pending:
+        concurrency = concurrency or int(os.getenv("AI_CONDENSE_CONCURRENCY") or 0) or None
+        results = generate_cv_outputs([prompts[i] for i in pending], model=model, provider=provider,
+                                      stage="condense", concurrency=concurrency)
+        for i, result in zip(pending, results):
+            if result["ok"]:
+                summaries[i] = _clean_summary(result["output"])
+                _store_summary(keys[i], summaries[i])
+            else:
+                print(f"⚠️ Fragmento {i + 1} sin condensar ({result['status']}), se usa el original")
+                summaries[i] = chunks[i][1]
+
+    merged: List[List[str]] = [[] for _ in documents]
+    for (index, _), summary in zip(chunks, summaries):
+        merged[index].append(summary)
+
+    parts = []
+    for (name, _), document_summaries in zip(documents, merged):
+        header = [f"[Documento: {name}]"] if name else []
+        parts.append("\n".join(header + ["\n\n".join(document_summaries)]))
+    condensed = "\n\n".join(parts)
+
+    print(f"🗜️ Estudios condensados: ~{count_tokens(text)} → ~{count_tokens(condensed)} tokens")
+    return condensed
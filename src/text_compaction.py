@@ -0,0 +1,267 @@
+# src/text_compaction.py
+
+"""
+Compactación del texto extraído de los PDFs antes de incluirlo en un prompt.
+
+El texto de `extract_text_from_multiple_pdfs` trae ruido que cuesta tokens (y
+latencia) en cada etapa que lo incluye:
+- Espacios, tabulaciones y líneas en blanco repetidas
+- Encabezados y pies de página repetidos en cada página, y números de página
+- Los marcadores `--- INICIO_DOCUMENTO: ... ---` / `--- FIN_DOCUMENTO: ... ---`
+- Párrafos duplicados o casi duplicados entre los programas subidos
+
+`compact_text()` normaliza los espacios, reemplaza los marcadores por una
+línea breve `[Documento: nombre]`, elimina las líneas que se repiten en la
+mayoría de las páginas de un documento (al principio o al final de cada
+página) y los párrafos casi duplicados (shingles de palabras con hash: se
+descarta un párrafo si casi todos sus shingles ya aparecieron en el texto
+conservado). Retorna el texto y un `CompactionReport` con los tokens ahorrados.
+
+Configuración por variables de entorno:
+- AI_COMPACTION_ENABLED: 1 para compactar (por defecto), 0 para dejar el texto igual
+- AI_COMPACTION_DUPLICATE_THRESHOLD: fracción de shingles compartidos para
+  considerar un párrafo duplicado (por defecto 0.9)
+"""
+
+import hashlib
+import os
+import re
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+from typing import List, Optional, Set, Tuple
+
+from .ai_tokens import count_tokens
+from .extract_pdf import PAGE_BREAK
+from .keyword_matcher import fold
+
+# Shingles de 5 palabras; los párrafos más cortos solo se comparan completos
+SHINGLE_SIZE = 5
+# Los párrafos largos se comparan en bloques de estas líneas
+BLOCK_LINES = 6
+# Párrafos con menos palabras (títulos, "Objetivos:", ...) nunca se descartan
+MIN_DUPLICATE_WORDS = 8
+# Una línea es encabezado/pie si está entre las primeras o últimas EDGE_LINES
+# de al menos esta fracción de las páginas (documentos de 3 páginas o más)
+BOILERPLATE_PAGE_RATIO = 0.5
+BOILERPLATE_MIN_PAGES = 3
+EDGE_LINES = 2
+
+_DOCUMENT_START = re.compile(r"^--- INICIO_DOCUMENTO: (.+?) ---$", re.MULTILINE)
+_DOCUMENT_END = re.compile(r"^--- FIN_DOCUMENTO: .+? ---$\n?", re.MULTILINE)
+_DOCUMENT_HEADER = re.compile(r"^\[Documento: .+\]$", re.MULTILINE)
+# "Página 3", "Pág. 3 de 9", "3 de 9", "Page 3 of 9": siempre son números de página
+_PAGE_LABEL = re.compile(
+    r"^(?:(?P<prefix>p[aá]g(?:ina)?\.?|page)\s*-?\s*(?P<n>\d{1,4})(?:\s*(?:de|/|of)\s*(?P<total>\d{1,4}))?"
+    r"|-?\s*(?P<n2>\d{1,4})\s*(?:de|of)\s*(?P<total2>\d{1,4}))$",
+    re.IGNORECASE,
+)
+# "3", "- 3 -", "3/9": solo son números de página si siguen la secuencia de las páginas vecinas
+_BARE_PAGE_NUMBER = re.compile(r"^-?\s*(\d{1,4})\s*-?(?:\s*/\s*(\d{1,4}))?$")
+_YEAR = re.compile(r"^(?:19|20)\d{2}$")
+_WORD = re.compile(r"\w+")
+
+
+@dataclass
+class CompactionReport:
+    """Resultado de una compactación: tamaño antes/después y qué se quitó."""
+    original_chars: int
+    compacted_chars: int
+    original_tokens: int
+    compacted_tokens: int
+    boilerplate_lines: int = 0
+    duplicate_paragraphs: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.original_tokens - self.compacted_tokens
+
+    @property
+    def saved_ratio(self) -> float:
+        return self.tokens_saved / self.original_tokens if self.original_tokens else 0.0
+
+
+def compaction_enabled() -> bool:
+    return os.getenv("AI_COMPACTION_ENABLED", "1") == "1"
+
+
+def normalize_whitespace(text: str) -> str:
+    """Unifica saltos de línea y espacios, y recorta cada línea."""
+    text = unicodedata.normalize("NFC", text).replace("\r\n", "\n").replace("\r", "\n")
+    text = re.sub(r"[ \t\u00a0\u2000-\u200b]+", " ", text)
+    # strip(" "): el corte de página (\f) debe sobrevivir para detectar encabezados y pies
+    return "\n".join(line.strip(" ") for line in text.split("\n"))
+
+
+def _line_signature(line: str) -> str:
+    """Forma de comparar encabezados/pies: sin mayúsculas ni números ("Página 3 de 9")."""
+    return re.sub(r"\d+", "#", line.lower())
+
+
+def _edges(lines: List[str]) -> List[str]:
+    """Primeras y últimas líneas no vacías de una página (donde van encabezados y pies)."""
+    content = [line for line in lines if line]
+    return content[:EDGE_LINES] + content[-EDGE_LINES:]
+
+
+def _is_page_label(line: str) -> bool:
+    """Número de página con rótulo ("Página 3", "3 de 9"); un año suelto nunca lo es."""
+    match = _PAGE_LABEL.match(line)
+    if not match:
+        return False
+    if match.group("prefix"):
+        return True
+    number, total = int(match.group("n2")), int(match.group("total2"))
+    return number <= total and not _YEAR.match(match.group("n2")) and not _YEAR.match(match.group("total2"))
+
+
+def _bare_number(line: str) -> Optional[int]:
+    """Valor de una línea que es solo un número (sin años 19xx/20xx), o None."""
+    match = _BARE_PAGE_NUMBER.match(line)
+    if not match or any(_YEAR.match(group) for group in match.groups() if group):
+        return None
+    return int(match.group(1))
+
+
+def _strip_boilerplate(document: str) -> Tuple[str, int]:
+    """
+    Quita, del principio y del final de cada página, los números de página y
+    las líneas repetidas en la mayoría de las páginas (encabezados y pies).
+    Un número suelto solo cuenta como número de página si la página anterior
+    o la siguiente tiene el número consecutivo (así no se pierden años ni
+    cifras del contenido).
+    """
+    pages = [page.split("\n") for page in document.split(PAGE_BREAK)]
+    numbers = [{_bare_number(line) for line in _edges(lines)} - {None} for lines in pages]
+    repeated: Set[str] = set()
+    if len(pages) >= BOILERPLATE_MIN_PAGES:
+        per_page = Counter()
+        for lines in pages:
+            # Las líneas que son solo un número se resuelven con la secuencia, no por repetición
+            per_page.update({_line_signature(line) for line in _edges(lines) if not _BARE_PAGE_NUMBER.match(line)})
+        threshold = max(2, BOILERPLATE_PAGE_RATIO * len(pages))
+        repeated = {signature for signature, pages_seen in per_page.items() if pages_seen >= threshold}
+
+    removed = 0
+    kept_pages = []
+    for index, lines in enumerate(pages):
+        edges = set(_edges(lines))
+        neighbours = set()
+        if index > 0:
+            neighbours |= {number + 1 for number in numbers[index - 1]}
+        if index + 1 < len(pages):
+            neighbours |= {number - 1 for number in numbers[index + 1]}
+        kept = []
+        for line in lines:
+            if line in edges and (_is_page_label(line) or _bare_number(line) in neighbours
+                                  or _line_signature(line) in repeated):
+                removed += 1
+                continue
+            kept.append(line)
+        kept_pages.append("\n".join(kept))
+    # Las páginas se unen como párrafos: el corte de página ya no aporta
+    return "\n\n".join(kept_pages), removed
+
+
+def _split_documents(text: str) -> List[str]:
+    """Parte el texto en documentos, cada uno empezando por su `[Documento: nombre]`."""
+    starts = [match.start() for match in _DOCUMENT_HEADER.finditer(text)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    return [text[start:end] for start, end in zip(starts, starts[1:] + [len(text)])]
+
+
+def _shingles(words: List[str]) -> Set[int]:
+    """Hashes de las secuencias de SHINGLE_SIZE palabras consecutivas."""
+    if len(words) < SHINGLE_SIZE:
+        joined = " ".join(words)
+        return {int.from_bytes(hashlib.blake2b(joined.encode("utf-8"), digest_size=8).digest(), "big")}
+    return {
+        int.from_bytes(hashlib.blake2b(" ".join(words[i:i + SHINGLE_SIZE]).encode("utf-8"),
+                                       digest_size=8).digest(), "big")
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    }
+
+
+def _blocks(paragraph: str) -> List[str]:
+    """Grupos de hasta BLOCK_LINES líneas (el texto de un PDF suele no tener líneas en blanco)."""
+    lines = paragraph.split("\n")
+    return ["\n".join(lines[i:i + BLOCK_LINES]) for i in range(0, len(lines), BLOCK_LINES)]
+
+
+def _drop_duplicate_paragraphs(text: str, threshold: float) -> Tuple[str, int]:
+    """
+    Descarta los párrafos (o bloques de líneas) cuyos shingles ya aparecieron
+    casi todos (`threshold`) en el texto conservado. Comparar contra todos los
+    shingles vistos (y no bloque a bloque) detecta también el texto repetido
+    con otros cortes de línea o de página.
+    """
+    seen: Set[int] = set()
+    kept_paragraphs: List[str] = []
+    removed = 0
+
+    for paragraph in re.split(r"\n{2,}", text):
+        if not paragraph.strip():
+            continue
+        if _DOCUMENT_HEADER.match(paragraph):
+            header, _, paragraph = paragraph.partition("\n")
+            kept_paragraphs.append(header)
+
+        kept_blocks = []
+        for block in _blocks(paragraph) if paragraph else []:
+            words = _WORD.findall(fold(block))
+            if len(words) < MIN_DUPLICATE_WORDS:
+                kept_blocks.append(block)
+                continue
+
+            shingles = _shingles(words)
+            if len(shingles & seen) >= threshold * len(shingles):
+                removed += 1
+                continue
+
+            seen |= shingles
+            kept_blocks.append(block)
+
+        if kept_blocks:
+            kept_paragraphs.append("\n".join(kept_blocks))
+
+    return "\n\n".join(kept_paragraphs), removed
+
+
+def compact_text(text: str) -> Tuple[str, CompactionReport]:
+    """
+    Compacta el texto extraído de uno o varios PDFs.
+    Retorna (texto compactado, reporte con los tokens ahorrados).
+    """
+    original_tokens = count_tokens(text)
+    if not compaction_enabled() or not text:
+        text = text.replace(f"\n{PAGE_BREAK}\n", "\n")
+        return text, CompactionReport(len(text), len(text), original_tokens, original_tokens)
+
+    compacted = normalize_whitespace(text)
+    compacted = _DOCUMENT_START.sub(r"[Documento: \1]", compacted)
+    compacted = _DOCUMENT_END.sub("", compacted)
+
+    documents = []
+    boilerplate = 0
+    for document in _split_documents(compacted):
+        document, removed = _strip_boilerplate(document)
+        documents.append(document)
+        boilerplate += removed
+
+    threshold = float(os.getenv("AI_COMPACTION_DUPLICATE_THRESHOLD", "0.9"))
+    compacted, duplicates = _drop_duplicate_paragraphs("\n\n".join(documents), threshold)
+    compacted = re.sub(r"\n{3,}", "\n\n", compacted).strip()
+
+    report = CompactionReport(
+        original_chars=len(text),
+        compacted_chars=len(compacted),
+        original_tokens=original_tokens,
+        compacted_tokens=count_tokens(compacted),
+        boilerplate_lines=boilerplate,
+        duplicate_paragraphs=duplicates,
+    )
+    print(f"🧹 Texto compactado: ~{report.original_tokens} → ~{report.compacted_tokens} tokens "
+          f"({report.saved_ratio:.0%} menos; {boilerplate} líneas repetidas, "
+          f"{duplicates} párrafos duplicados)")
+    return compacted, report
@@ -5,8 +5,14 @@ Componentes reutilizables de UI para la aplicación.
 Incluye sidebar, progress tracker, cards, etc.
 """
 
+import time
+
 import streamlit as st
 
+from .ai_health import get_provider_health
+from .ai_rate_limit import get_rate_limit_status
+from .job_index import recommend_job_descriptions
+
 
 def create_sidebar():
     """Crea sidebar con navegación y estado del progreso."""
@@ -85,6 +91,8 @@ def create_sidebar():
             st.info("🔄 Modo automático: Intenta OpenAI (gpt-4o-mini) → Gemini (gemini-flash-latest)")
             print("✓ Modo automático activado")
         
+        render_provider_health()
+        
         st.markdown("---")
         
         # Progress Tracker
@@ -250,6 +258,51 @@ def create_sidebar():
         """, unsafe_allow_html=True)
 
 
+def render_provider_health():
+    """Muestra el estado de los circuit breakers de cada proveedor de IA."""
+    health = get_provider_health()
+    if not health:
+        return
+
+    state_labels = {
+        "closed": "🟢 Operativo",
+        "half_open": "🟡 Probando",
+        "open": "🔴 No disponible",
+    }
+
+    with st.expander("🩺 Estado de proveedores IA"):
+        for name, snapshot in health.items():
+            label = state_labels.get(snapshot["state"], snapshot["state"])
+            line = f"**{name}** — {label}"
+            if snapshot["calls"]:
+                line += f" · errores {snapshot['error_rate']:.0%}"
+            if snapshot["latency_p50"] is not None:
+                line += f" · p50 {snapshot['latency_p50']}s / p95 {snapshot['latency_p95']}s"
+            if snapshot["state"] == "open":
+                line += f" · reintento en {snapshot['retry_in_seconds']:.0f}s"
+            st.markdown(line)
+
+        for name, status in get_rate_limit_status().items():
+            if status["queue_depth"]:
+                st.caption(f"🚦 {name}: {status['queue_depth']} petición(es) en cola por límite de tasa")
+
+
+def render_job_recommendations(cv_content: str, k: int = 5):
+    """Muestra las descripciones de puesto ya usadas que mejor encajan con el CV."""
+    if not cv_content:
+        return
+    recommendations = recommend_job_descriptions(cv_content, k)
+    if not recommendations:
+        return
+
+    with st.expander("📚 Puestos guardados que mejor encajan con tu CV"):
+        for row in recommendations:
+            line = f"**{row['title'] or 'Sin título'}** — {', '.join(row['matched'][:8])}"
+            if row["missing"]:
+                line += f" · faltan: {', '.join(row['missing'][:5])}"
+            st.markdown(line)
+
+
 def show_progress_indicator(current_step: int, total_steps: int = 5):
     """Muestra indicador de progreso visual."""
     progress = current_step / total_steps
@@ -328,3 +381,31 @@ def render_action_buttons(buttons: list):
                     key=button_config.get('key'),
                     type=button_config.get('type', 'secondary')
                 )
+
+
+def render_streaming_output(chunks, status_text: str, refresh_seconds: float = 0.15) -> str:
+    """
+    Muestra un texto generado por IA a medida que llegan sus fragmentos.
+
+    Args:
+        chunks: Iterable de fragmentos de texto (ej: generate_cv_output_stream)
+        status_text: Mensaje mostrado mientras se genera
+        refresh_seconds: Intervalo mínimo entre redibujados (evita re-renderizar por token)
+
+    Returns:
+        Texto completo generado
+    """
+    st.caption(status_text)
+    placeholder = st.empty()
+    text = ""
+    last_render = 0.0
+
+    for chunk in chunks:
+        text += chunk
+        now = time.monotonic()
+        if now - last_render >= refresh_seconds:
+            placeholder.markdown(text + "▌")
+            last_render = now
+
+    placeholder.markdown(text)
+    return text
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga del pipeline completo con el proveedor local (sin red ni cuota).
+
+Simula N sesiones concurrentes de Streamlit que recorren las mismas etapas que
+app.py: CV Maestro (streaming) → Perfil LinkedIn (streaming) → CV Target
+(streaming) → Análisis ATS. Reporta latencias por etapa y throughput.
+
+Ejecutar:
+    python tests/benchmark_ai_pipeline.py --sessions 20 --latency 0.3 --tps 200
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SAMPLE_CV = """Ana Pérez {i}
+ana.perez{i}@example.com · Buenos Aires
+Analista de Datos — Empresa Ejemplo {i}
+• Automaticé reportes semanales con Python y SQL
+• Mantuve tableros en Power BI para el área comercial
+Licenciatura en Economía — Universidad de Buenos Aires
+"""
+
+SAMPLE_STUDIES = """Diplomatura en Ciencia de Datos
+Machine Learning con scikit-learn, pandas y visualización
+Proyecto final: modelo de churn
+"""
+
+SAMPLE_JOB = """Data Analyst Semi Senior
+Buscamos analista con Python, SQL, Power BI, Tableau y experiencia en ETL.
+Conocimientos de Airflow y estadística.
+"""
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run_session(i, timings, errors):
+    from src.ai_service import generate_cv_output_stream
+    from src.ats_analyzer import analyze_ats_compatibility
+    from src.prompts import build_prompt_linkedin_profile, build_prompt_master, build_prompt_targeted
+
+    try:
+        started = time.monotonic()
+        master = "".join(generate_cv_output_stream(
+            build_prompt_master(SAMPLE_CV.format(i=i), SAMPLE_STUDIES), stage="master"))
+        timings["master"].append(time.monotonic() - started)
+
+        started = time.monotonic()
+        "".join(generate_cv_output_stream(build_prompt_linkedin_profile(master), stage="linkedin"))
+        timings["linkedin"].append(time.monotonic() - started)
+
+        started = time.monotonic()
+        target = "".join(generate_cv_output_stream(build_prompt_targeted(master, SAMPLE_JOB), stage="target"))
+        timings["target"].append(time.monotonic() - started)
+
+        started = time.monotonic()
+        result = analyze_ats_compatibility(target, SAMPLE_JOB)
+        timings["ats"].append(time.monotonic() - started)
+        assert 0 < result["score"] <= 100, "El análisis ATS no devolvió un score válido"
+    except Exception as e:
+        errors.append(f"sesión {i}: {type(e).__name__}: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=10, help="sesiones concurrentes")
+    parser.add_argument("--latency", type=float, default=0.3, help="segundos hasta el primer token")
+    parser.add_argument("--tps", type=float, default=200, help="tokens por segundo simulados")
+    parser.add_argument("--mode", default="synthetic", help="AI_LOCAL_MODE: replay, synthetic o strict")
+    args = parser.parse_args()
+
+    # Configurar antes de importar el servicio
+    os.environ["AI_FORCE_PROVIDER"] = "local"
+    os.environ["AI_LOCAL_MODE"] = args.mode
+    os.environ["AI_LOCAL_LATENCY"] = str(args.latency)
+    os.environ["AI_LOCAL_TOKENS_PER_SECOND"] = str(args.tps)
+    os.environ.setdefault("AI_CACHE_ENABLED", "0")
+
+    from src.ai_service import get_call_metrics, get_prefix_cache_stats
+
+    timings = {"master": [], "linkedin": [], "target": [], "ats": []}
+    errors = []
+
+    print(f"🚀 {args.sessions} sesiones · latencia {args.latency}s · {args.tps} tokens/s\n")
+    started = time.monotonic()
+    threads = [threading.Thread(target=run_session, args=(i, timings, errors)) for i in range(args.sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    print(f"{'Etapa':<10} {'n':>4} {'p50':>8} {'p95':>8} {'máx':>8}")
+    for stage, values in timings.items():
+        if values:
+            print(f"{stage:<10} {len(values):>4} {statistics.median(values):>7.2f}s "
+                  f"{_percentile(values, 0.95):>7.2f}s {max(values):>7.2f}s")
+
+    calls = get_call_metrics()
+    ttfts = [c["ttft_seconds"] for c in calls if c["ttft_seconds"] is not None]
+    print(f"\nLlamadas: {len(calls)} · pipelines/s: {args.sessions / elapsed:.2f} · total {elapsed:.1f}s")
+    if ttfts:
+        print(f"Tiempo al primer token p50: {statistics.median(ttfts):.2f}s")
+    for group in get_prefix_cache_stats():
+        print(f"Prefijo {group['stage']:<8} {group['prefix']}: {group['calls']} llamadas, "
+              f"{group['cached_ratio']:.0%} de tokens de entrada cacheados")
+
+    if errors:
+        print("\n❌ Errores:")
+        for error in errors:
+            print(f"   {error}")
+        sys.exit(1)
+    print("\n✅ Todas las sesiones completaron el pipeline")
+
+
+if __name__ == "__main__":
+    main()
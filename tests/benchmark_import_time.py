@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark del tiempo de importación (arranque en frío) de los módulos de la app.
+
+Ejecuta `python -X importtime -c "import <módulo>"` en un proceso nuevo por
+módulo y reporta el tiempo acumulado, las dependencias más pesadas y si se
+cargó alguna librería que debería importarse solo en el primer uso (SDKs de
+IA, stacks de PDF).
+
+Ejecutar:
+    python tests/benchmark_import_time.py
+    python tests/benchmark_import_time.py --runs 5 --top 15 --budget-ms 400
+    python tests/benchmark_import_time.py --json import_times.json   # para CI
+
+Sale con código 1 si algún módulo importa una librería diferida o supera
+--budget-ms, de modo que CI pueda detectar regresiones.
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Módulos que cargan app.py y los servicios antes del primer render
+DEFAULT_TARGETS = [
+    "app",
+    "src.ai_service",
+    "src.ats_analyzer",
+    "src.extract_pdf",
+    "src.prompts",
+    "src.ui_components",
+]
+
+# Librerías que deben cargarse en el primer uso o en segundo plano, nunca al importar
+DEFERRED_MODULES = [
+    "openai",
+    "google.generativeai",
+    "grpc",
+    "pdfplumber",
+    "PyPDF2",
+    "pypdf",
+    "reportlab.platypus",
+    "tiktoken",
+    "scipy",
+]
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+
+def measure(module: str) -> Tuple[float, List[Tuple[str, float]]]:
+    """
+    Importa `module` en un intérprete nuevo con -X importtime.
+    Retorna (ms acumulados del módulo, [(módulo importado, ms acumulados)]).
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"No se pudo importar {module}:\n{result.stderr[-2000:]}")
+
+    # (indentación, módulo, ms acumulados); los hijos aparecen antes que su padre
+    entries = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            entries.append((len(match.group(3)), match.group(4), int(match.group(2)) / 1000))
+
+    # Solo cuenta lo que cuelga de `module` (no lo que carga el intérprete al iniciar, ej. site)
+    index = max(i for i, (depth, name, _) in enumerate(entries) if name == module)
+    root_depth = entries[index][0]
+    start = index
+    while start > 0 and entries[start - 1][0] > root_depth:
+        start -= 1
+
+    imported = [(name, ms) for _, name, ms in entries[start:index + 1]]
+    return entries[index][2], imported
+
+
+def benchmark(module: str, runs: int) -> Dict:
+    """Mejor de `runs` mediciones (la menos afectada por ruido del sistema)."""
+    best_total, best_imported = min((measure(module) for _ in range(runs)), key=lambda m: m[0])
+    names = {name for name, _ in best_imported}
+    deferred = [name for name in DEFERRED_MODULES if name in names]
+    heaviest = sorted((m for m in best_imported if m[0] != module), key=lambda m: m[1], reverse=True)
+    return {
+        "module": module,
+        "total_ms": round(best_total, 1),
+        "modules_imported": len(best_imported),
+        "deferred_loaded": deferred,
+        "heaviest": [{"module": name, "ms": round(ms, 1)} for name, ms in heaviest],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de tiempo de importación")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_TARGETS, help="Módulos a medir")
+    parser.add_argument("--runs", type=int, default=3, help="Mediciones por módulo (se toma la mejor)")
+    parser.add_argument("--top", type=int, default=10, help="Dependencias más pesadas a mostrar")
+    parser.add_argument("--budget-ms", type=float, default=0, help="Máximo por módulo (0 = sin límite)")
+    parser.add_argument("--json", dest="json_path", help="Guardar resultados en un archivo JSON")
+    args = parser.parse_args()
+
+    results = [benchmark(module, args.runs) for module in args.modules]
+    failed = False
+
+    for result in results:
+        print(f"\n📦 {result['module']}: {result['total_ms']:.1f} ms "
+              f"({result['modules_imported']} módulos)")
+        for entry in result["heaviest"][:args.top]:
+            print(f"   {entry['ms']:>8.1f} ms  {entry['module']}")
+        if result["deferred_loaded"]:
+            failed = True
+            print(f"   ❌ Importa librerías diferidas: {', '.join(result['deferred_loaded'])}")
+        if args.budget_ms and result["total_ms"] > args.budget_ms:
+            failed = True
+            print(f"   ❌ Supera el presupuesto de {args.budget_ms:.0f} ms")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Resultados guardados en {args.json_path}")
+
+    if failed:
+        sys.exit(1)
+    print("\n✅ Ningún módulo importa librerías diferidas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para la generación por lotes con concurrencia acotada.
+Ejecutar: python tests/test_ai_batch.py
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("AI_LOCAL_MODE", "synthetic")
+os.environ.setdefault("AI_LOCAL_LATENCY", "0")
+os.environ.setdefault("AI_LOCAL_TOKENS_PER_SECOND", "0")
+os.environ.setdefault("AI_CACHE_ENABLED", "0")
+
+from src import ai_service
+from src.ats_analyzer import analyze_ats_compatibility_batch
+
+
+def _fake_generate(active, peak):
+    """Sustituto de `_agenerate_shared` que mide la concurrencia y falla con "error"."""
+    async def fake(prompt, model, provider, stage, max_tokens, response_schema=None):
+        active[0] += 1
+        peak[0] = max(peak[0], active[0])
+        try:
+            # Los prompts cortos terminan antes: el orden de llegada difiere del de entrada
+            await asyncio.sleep(0.01 * len(prompt))
+            if prompt == "error":
+                raise RuntimeError("fallo simulado")
+            return prompt.upper(), "ok"
+        finally:
+            active[0] -= 1
+    return fake
+
+
+def test_batch_respects_concurrency_and_order():
+    """El lote no supera la concurrencia pedida y retorna en el orden de entrada."""
+    active, peak = [0], [0]
+    original = ai_service._agenerate_shared
+    ai_service._agenerate_shared = _fake_generate(active, peak)
+    try:
+        prompts = ["cccccc", "a", "error", "bbb", "dd", "e"]
+        results = ai_service.generate_cv_outputs(prompts, concurrency=2)
+    finally:
+        ai_service._agenerate_shared = original
+
+    assert peak[0] == 2
+    assert [r["index"] for r in results] == list(range(len(prompts)))
+    assert results[0]["output"] == "CCCCCC" and results[0]["ok"]
+    assert not results[2]["ok"] and "fallo simulado" in results[2]["error"]
+    assert all(r["ok"] for i, r in enumerate(results) if i != 2)
+    print("Test concurrencia y orden: ✓ PASS")
+
+
+def test_iter_yields_as_completed():
+    """`iter_cv_outputs` entrega los resultados a medida que terminan."""
+    active, peak = [0], [0]
+    original = ai_service._agenerate_shared
+    ai_service._agenerate_shared = _fake_generate(active, peak)
+    try:
+        indexes = [r["index"] for r in ai_service.iter_cv_outputs(["cccccc", "a", "bbb"], concurrency=3)]
+    finally:
+        ai_service._agenerate_shared = original
+
+    assert indexes == [1, 2, 0]
+    print("Test resultados al terminar: ✓ PASS")
+
+
+def test_ats_batch_with_local_provider():
+    """Análisis ATS por lotes de punta a punta con el proveedor local."""
+    cv = "Ana Pérez\nDesarrolladora Python con Django y PostgreSQL\n"
+    items = [(cv, "Buscamos Python y Django."), (cv, "Buscamos Java y Spring."), (cv, "")]
+    results = analyze_ats_compatibility_batch(items, provider="local", concurrency=2)
+
+    assert len(results) == 3
+    for result in results:
+        assert "error" not in result
+        assert 0 < result["score"] <= 100
+    print("Test ATS por lotes: ✓ PASS")
+
+
+if __name__ == "__main__":
+    test_batch_respects_concurrency_and_order()
+    test_iter_yields_as_completed()
+    test_ats_batch_with_local_provider()
+    print("\n✅ Todos los tests pasaron")
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para los presupuestos de salida por etapa.
+Ejecutar: python tests/test_ai_budgets.py
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.ai_budgets import compute_output_budget, estimate_output_tokens
+from src.prompts import build_prompt_targeted
+
+
+def test_fixed_stages_and_ceiling():
+    """ATS usa su tope fijo; las etapas sin política usan el techo configurable."""
+    assert compute_output_budget("ats", "prompt") == 1500
+    assert compute_output_budget("general", "prompt") == 7000
+
+    os.environ["AI_MAX_OUTPUT_TOKENS"] = "1000"
+    try:
+        assert compute_output_budget("ats", "prompt") == 1000
+    finally:
+        del os.environ["AI_MAX_OUTPUT_TOKENS"]
+    print("Test etapas fijas y techo: ✓ PASS")
+
+
+def test_target_scales_with_master_cv():
+    """El CV Target recibe ~1.3× los tokens del CV Maestro incluido en el prompt."""
+    master_cv = "• Desarrollé reportes automatizados con Python y SQL\n" * 150
+    prompt = build_prompt_targeted(master_cv, "Descripción del puesto")
+    expected = int(1.3 * estimate_output_tokens(master_cv.strip()))
+
+    budget = compute_output_budget("target", prompt)
+    assert abs(budget - expected) <= 1
+    # Un CV corto no baja del mínimo de la etapa
+    assert compute_output_budget("target", build_prompt_targeted("Ana", "Puesto")) == 1000
+    print("Test CV Target proporcional: ✓ PASS")
+
+
+if __name__ == "__main__":
+    print("=== Pruebas de Presupuestos de Salida IA ===\n")
+    test_fixed_stages_and_ceiling()
+    test_target_scales_with_master_cv()
+    print("\n=== Pruebas completadas ===")
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para la caché de respuestas de IA.
+Ejecutar: python tests/test_ai_cache.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.ai_cache import ResponseCache, make_cache_key
+
+
+def test_key_is_deterministic():
+    """La misma petición produce la misma clave; cualquier cambio la altera."""
+    params = {"temperature": 0.1, "top_p": 1, "max_tokens": 7000}
+    key_a = make_cache_key("openai", "gpt-4o-mini", "sys", "prompt", params)
+    key_b = make_cache_key("openai", "gpt-4o-mini", "sys", "prompt", dict(reversed(list(params.items()))))
+    key_c = make_cache_key("gemini", "gpt-4o-mini", "sys", "prompt", params)
+
+    assert key_a == key_b
+    assert key_a != key_c
+    print("Test clave determinista: ✓ PASS")
+
+
+def test_memory_lru_and_stats():
+    """El LRU expulsa la entrada menos usada y cuenta aciertos/fallos."""
+    cache = ResponseCache(max_entries=2)
+    cache.set("a", "A")
+    cache.set("b", "B")
+    assert cache.get("a") == "A"  # "a" pasa a ser la más reciente
+    cache.set("c", "C")  # expulsa "b"
+
+    assert cache.get("b") is None
+    assert cache.get("c") == "C"
+
+    stats = cache.stats()
+    assert stats["hits_memory"] == 2
+    assert stats["misses"] == 1
+    assert stats["evictions"] == 1
+    print(f"Test LRU en memoria: ✓ PASS ({stats})")
+
+
+def test_ttl_expiration():
+    """Las entradas vencidas no se devuelven."""
+    cache = ResponseCache(max_entries=4, ttl_seconds=0.05)
+    cache.set("k", "valor")
+    time.sleep(0.1)
+
+    assert cache.get("k") is None
+    assert cache.stats()["expirations"] == 1
+    print("Test TTL: ✓ PASS")
+
+
+def test_sqlite_persistence():
+    """Una segunda instancia lee del disco lo que guardó la primera."""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "cache.sqlite")
+
+        ResponseCache(db_path=db_path).set("k", "persistido")
+        cache = ResponseCache(db_path=db_path)
+
+        assert cache.get("k") == "persistido"
+        assert cache.stats()["hits_disk"] == 1
+        assert cache.get("k") == "persistido"
+        assert cache.stats()["hits_memory"] == 1
+    print("Test persistencia SQLite: ✓ PASS")
+
+
+if __name__ == "__main__":
+    print("=== Pruebas de Caché de Respuestas IA ===\n")
+    test_key_is_deterministic()
+    test_memory_lru_and_stats()
+    test_ttl_expiration()
+    test_sqlite_persistence()
+    print("\n=== Pruebas completadas ===")
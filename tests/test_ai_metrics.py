@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para las métricas de llamadas a IA.
+Ejecutar: python tests/test_ai_metrics.py
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.ai_metrics import CallRecord, JsonlSink, PrometheusExporter, RingBufferSink
+
+
+def _record(**kwargs) -> CallRecord:
+    record = CallRecord(stage="ats", requested_provider="auto", provider="openai",
+                        model="gpt-4o-mini", status="ok", latency_seconds=1.5)
+    for name, value in kwargs.items():
+        setattr(record, name, value)
+    return record
+
+
+def test_usage_accumulates():
+    """Los tokens de varios intentos se suman; los valores ausentes se ignoran."""
+    record = _record()
+    record.add_usage({"prompt_tokens": 100, "completion_tokens": 20, "cached_tokens": None})
+    record.add_usage({"prompt_tokens": 50})
+    assert record.prompt_tokens == 150
+    assert record.completion_tokens == 20
+    assert record.cached_tokens is None
+    print("Test acumulación de tokens: ✓ PASS")
+
+
+def test_ring_buffer_and_jsonl():
+    """El ring buffer conserva los últimos N y el JSONL escribe una línea por registro."""
+    ring = RingBufferSink(max_records=2)
+    for stage in ("master", "linkedin", "target"):
+        ring.emit(_record(stage=stage))
+    assert [r.stage for r in ring.records()] == ["linkedin", "target"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "metrics", "calls.jsonl")
+        sink = JsonlSink(path)
+        sink.emit(_record(prompt_tokens=10))
+        sink.emit(_record(stage="target"))
+        with open(path, encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f]
+    assert len(lines) == 2
+    assert lines[0]["prompt_tokens"] == 10 and lines[1]["stage"] == "target"
+    print("Test ring buffer y JSONL: ✓ PASS")
+
+
+def test_prometheus_render():
+    """El exporter agrega contadores e histogramas en formato de texto de Prometheus."""
+    exporter = PrometheusExporter(buckets=(1, 2))
+    exporter.emit(_record(completion_tokens=30, retries=1))
+    exporter.emit(_record(status="error", latency_seconds=0.5))
+    text = exporter.render()
+
+    assert 'ai_calls_total{stage="ats",provider="openai",model="gpt-4o-mini",status="ok"} 1' in text
+    assert 'ai_tokens_total{provider="openai",model="gpt-4o-mini",kind="completion"} 30' in text
+    assert 'ai_call_latency_seconds_bucket{stage="ats",provider="openai",le="1"} 1' in text
+    assert 'ai_call_latency_seconds_bucket{stage="ats",provider="openai",le="+Inf"} 2' in text
+    assert 'ai_retries_total{provider="openai",model="gpt-4o-mini"} 1' in text
+    print("Test exporter Prometheus: ✓ PASS")
+
+
+if __name__ == "__main__":
+    print("=== Pruebas de Métricas IA ===\n")
+    test_usage_accumulates()
+    test_ring_buffer_and_jsonl()
+    test_prometheus_render()
+    print("\n=== Pruebas completadas ===")
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el limitador de tasa de los proveedores de IA.
+Ejecutar: python tests/test_ai_rate_limit.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.ai_rate_limit import TokenBucketLimiter, estimate_request_tokens
+from src.ai_tokens import count_tokens
+
+
+def test_estimate_tokens():
+    """La estimación suma los tokens de entrada (mismo conteo que ai_tokens) y el máximo de salida."""
+    prompt = "Analiza la compatibilidad ATS del siguiente CV con la descripción del puesto."
+    assert estimate_request_tokens(prompt, 1000) == count_tokens(prompt) + 1000
+    assert estimate_request_tokens("", 1000) == 1000
+    print("Test estimación de tokens: ✓ PASS")
+
+
+def test_requests_per_minute():
+    """Con el bucket de peticiones vacío, la siguiente espera su recarga."""
+    async def run():
+        limiter = TokenBucketLimiter("test", requests_per_minute=600, tokens_per_minute=0)
+        limiter._requests = 0.0  # 600 rpm = una petición cada 0.1s
+        started = time.monotonic()
+        await limiter.acquire(0)
+        return time.monotonic() - started
+
+    waited = asyncio.run(run())
+    assert 0.05 <= waited < 1.0
+    print("Test peticiones por minuto: ✓ PASS")
+
+
+def test_fifo_order_and_queue_depth():
+    """Las peticiones en espera se atienden en orden de llegada y se cuentan en cola."""
+    async def run():
+        limiter = TokenBucketLimiter("test", requests_per_minute=0, tokens_per_minute=6000)
+        limiter._tokens = 0.0  # 6000 tpm = 100 tokens/s
+        order = []
+
+        async def request(i):
+            await limiter.acquire(10)
+            order.append(i)
+
+        tasks = [asyncio.create_task(request(i)) for i in range(3)]
+        await asyncio.sleep(0.01)
+        depth = limiter.status()["queue_depth"]
+        await asyncio.gather(*tasks)
+        return order, depth, limiter.status()
+
+    order, depth, status = asyncio.run(run())
+    assert order == [0, 1, 2]
+    assert depth == 3
+    assert status["queue_depth"] == 0 and status["granted"] == 3
+    print("Test orden FIFO y profundidad de cola: ✓ PASS")
+
+
+if __name__ == "__main__":
+    print("=== Pruebas de Límite de Tasa IA ===\n")
+    test_estimate_tokens()
+    test_requests_per_minute()
+    test_fifo_order_and_queue_depth()
+    print("\n=== Pruebas completadas ===")
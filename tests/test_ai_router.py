@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para las políticas de ruteo entre proveedores.
+Ejecutar: python tests/test_ai_router.py
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import ai_router
+from src.ai_router import (
+    AdaptivePolicy,
+    CandidateStats,
+    RouteRequest,
+    StaticPolicy,
+    get_routing_decisions,
+    get_routing_policy,
+    model_context_tokens,
+    register_routing_policy,
+    route,
+)
+from src.ai_health import get_circuit_breaker
+
+
+def _stats(provider, model, p50=None, samples=0, error_rate=0.0, context=128_000, tps=None):
+    return CandidateStats(provider=provider, model=model, latency_p50=p50, latency_p95=p50,
+                          samples=samples, error_rate=error_rate, breaker_open=False,
+                          context_tokens=context, tokens_per_second=tps)
+
+
+def test_short_prompt_goes_to_fastest():
+    """Prompts cortos van al proveedor con menor latencia esperada."""
+    policy = AdaptivePolicy()
+    openai = _stats("openai", "gpt-4o-mini", p50=6.0, samples=10)
+    gemini = _stats("gemini", "gemini-flash-latest", p50=2.0, samples=10, context=1_048_576)
+    ranked, _ = policy.rank([openai, gemini], RouteRequest("ats", 1500, 1500))
+    assert [c.provider for c in ranked] == ["gemini", "openai"]
+
+    # Una tasa de error alta penaliza la latencia esperada
+    gemini.error_rate = 0.9  # 2s * (1 + 2 * 0.9) = 5.6s
+    openai.latency_p50 = 4.0
+    ranked, _ = policy.rank([openai, gemini], RouteRequest("ats", 1500, 1500))
+    assert ranked[0].provider == "openai"
+    print("Test prompt corto: ✓ PASS")
+
+
+def test_without_samples_keeps_default_order():
+    """Sin muestras suficientes se conserva el orden por defecto."""
+    policy = AdaptivePolicy(min_samples=5)
+    openai = _stats("openai", "gpt-4o-mini", p50=9.0, samples=2)
+    gemini = _stats("gemini", "gemini-flash-latest", p50=1.0, samples=3)
+    ranked, _ = policy.rank([openai, gemini], RouteRequest("ats", 1500, 1500))
+    assert [c.provider for c in ranked] == ["openai", "gemini"]
+    print("Test sin muestras: ✓ PASS")
+
+
+def test_long_prompt_prefers_context_and_throughput():
+    """Prompts largos van al modelo con más contexto y mejor throughput."""
+    policy = AdaptivePolicy(long_prompt_tokens=6000)
+    openai = _stats("openai", "gpt-4o-mini", p50=1.0, samples=10, context=128_000)
+    gemini = _stats("gemini", "gemini-flash-latest", p50=5.0, samples=10, context=1_048_576)
+    ranked, _ = policy.rank([openai, gemini], RouteRequest("master", 20_000, 4000))
+    assert ranked[0].provider == "gemini"
+
+    # Un prompt que no entra en el contexto del primero lo deja al final
+    ranked, reason = policy.rank([openai, gemini], RouteRequest("master", 200_000, 4000))
+    assert ranked[0].provider == "gemini" and "contexto suficiente" in reason
+    print("Test prompt largo: ✓ PASS")
+
+
+def test_model_context_windows():
+    """La ventana de contexto usa el prefijo más largo: gpt-4 original tiene 8k."""
+    assert model_context_tokens("gpt-4") == 8_192
+    assert model_context_tokens("gpt-4-0613") == 8_192
+    assert model_context_tokens("gpt-4-32k") == 32_768
+    assert model_context_tokens("gpt-4-turbo-2024-04-09") == 128_000
+    assert model_context_tokens("gpt-4o-mini") == 128_000
+    assert model_context_tokens("gpt-4.1-mini") == 1_047_576
+    print("Test ventanas de contexto: ✓ PASS")
+
+
+def test_custom_policy_and_open_breaker():
+    """Las políticas propias se aplican y los circuitos abiertos van al final."""
+    class ReversePolicy:
+        name = "reverse"
+
+        def rank(self, candidates, request):
+            return list(reversed(candidates)), "prueba"
+
+    register_routing_policy("reverse", ReversePolicy())
+    os.environ["AI_ROUTING_POLICY"] = "reverse"
+    try:
+        candidates = [("openai", "router-test-a"), ("gemini", "router-test-b")]
+        assert route(candidates, RouteRequest("ats", 100, 100))[0] == ("gemini", "router-test-b")
+
+        breaker = get_circuit_breaker("gemini", "router-test-b")
+        for _ in range(breaker.min_calls):
+            breaker.record_failure()
+        assert route(candidates, RouteRequest("ats", 100, 100))[0] == ("openai", "router-test-a")
+    finally:
+        del os.environ["AI_ROUTING_POLICY"]
+
+    decision = get_routing_decisions(1)[0]
+    assert decision["policy"] == "reverse" and "circuito abierto" in decision["reason"]
+    print("Test política propia: ✓ PASS")
+
+
+def test_builtin_policies_after_custom_registration():
+    """Registrar una política propia antes de la primera petición no oculta las incluidas."""
+    with ai_router._policies_lock:
+        saved = dict(ai_router._policies)
+        ai_router._policies.clear()
+    try:
+        register_routing_policy("custom-first", StaticPolicy())
+        assert isinstance(get_routing_policy(), AdaptivePolicy)
+
+        os.environ["AI_ROUTING_POLICY"] = "inexistente"
+        try:
+            assert isinstance(get_routing_policy(), StaticPolicy)
+            candidates = [("openai", "router-seed-a"), ("gemini", "router-seed-b")]
+            assert route(candidates, RouteRequest("ats", 100, 100)) == candidates
+        finally:
+            del os.environ["AI_ROUTING_POLICY"]
+    finally:
+        with ai_router._policies_lock:
+            ai_router._policies.clear()
+            ai_router._policies.update(saved)
+    print("Test políticas incluidas tras registrar una propia: ✓ PASS")
+
+
+if __name__ == "__main__":
+    test_short_prompt_goes_to_fastest()
+    test_without_samples_keeps_default_order()
+    test_long_prompt_prefers_context_and_throughput()
+    test_model_context_windows()
+    test_custom_policy_and_open_breaker()
+    test_builtin_policies_after_custom_registration()
+    print("\n✅ Todos los tests pasaron")
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para la coalescencia single-flight de peticiones idénticas.
+Ejecutar: python tests/test_ai_single_flight.py
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.ai_single_flight import SingleFlight
+
+
+def test_identical_calls_share_one_request():
+    """Llamadas concurrentes con la misma clave ejecutan la petición una sola vez."""
+    async def run():
+        flights = SingleFlight()
+        calls = []
+
+        async def generate():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "respuesta"
+
+        results = await asyncio.gather(*[flights.run("k", generate) for _ in range(4)])
+        return results, len(calls), flights
+
+    results, calls, flights = asyncio.run(run())
+    assert results == ["respuesta"] * 4
+    assert calls == 1
+    assert flights.stats == {"leaders": 1, "followers": 3}
+    assert flights.in_flight() == 0
+    print("Test petición compartida: ✓ PASS")
+
+
+def test_leader_failure_reaches_followers():
+    """Si la petición líder falla, todos reciben el mismo error sin quedar esperando."""
+    async def run():
+        flights = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.05)
+            raise ValueError("falló el proveedor")
+
+        return await asyncio.gather(*[flights.run("k", fail) for _ in range(3)], return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, ValueError) for r in results)
+    print("Test error del líder: ✓ PASS")
+
+
+def test_stream_replay_and_refcount_cancel():
+    """Un suscriptor tardío recibe todos los fragmentos; abandonar todos cancela el stream."""
+    async def run():
+        flights = SingleFlight()
+        produced = []
+
+        async def chunks():
+            for i in range(5):
+                await asyncio.sleep(0.02)
+                produced.append(i)
+                yield f"{i} "
+
+        async def collect(delay):
+            await asyncio.sleep(delay)
+            return "".join([c async for c in flights.stream("s", chunks)])
+
+        full = await asyncio.gather(collect(0), collect(0.05))
+
+        # Un único suscriptor que abandona: la petición compartida se cancela
+        produced.clear()
+        agen = flights.stream("s2", chunks)
+        await agen.__anext__()
+        await agen.aclose()
+        await asyncio.sleep(0.1)
+        return full, list(produced), flights
+
+    full, produced_after_cancel, flights = asyncio.run(run())
+    assert full == ["0 1 2 3 4 ", "0 1 2 3 4 "]
+    assert produced_after_cancel == [0]
+    assert flights.stats["followers"] == 1
+    assert flights.in_flight() == 0
+    print("Test streaming compartido y cancelación: ✓ PASS")
+
+
+if __name__ == "__main__":
+    print("=== Pruebas de Single-Flight IA ===\n")
+    test_identical_calls_share_one_request()
+    test_leader_failure_reaches_followers()
+    test_stream_replay_and_refcount_cancel()
+    print("\n=== Pruebas completadas ===")
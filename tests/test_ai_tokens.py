@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el conteo local de tokens y el control de tamaño de prompts.
+Ejecutar: python tests/test_ai_tokens.py
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("AI_LOCAL_MODE", "synthetic")
+os.environ.setdefault("AI_LOCAL_LATENCY", "0")
+os.environ.setdefault("AI_LOCAL_TOKENS_PER_SECOND", "0")
+os.environ.setdefault("AI_CACHE_ENABLED", "0")
+
+from src import ai_service
+from src.ai_metrics import CallRecord, get_recent_calls
+from src.ai_tokens import (
+    PromptTooLargeError,
+    check_prompt_size,
+    count_tokens,
+    get_token_count_stats,
+    heuristic_token_count,
+)
+
+SYLLABUS = "Unidad 1: Introducción a la programación en Python. Variables, tipos y estructuras de control. " * 50
+
+
+def test_heuristic_and_cache():
+    """La heurística cuenta palabras y signos; el segundo conteo sale de la caché."""
+    assert heuristic_token_count("") == 0
+    assert heuristic_token_count("Hola, mundo") == 3
+    assert heuristic_token_count("desarrolladora") == 3
+
+    before = get_token_count_stats()["hits"]
+    first = count_tokens(SYLLABUS)
+    second = count_tokens(SYLLABUS)
+    assert first == second > len(SYLLABUS) // 6
+    assert get_token_count_stats()["hits"] == before + 1
+    print("Test heurística y caché: ✓ PASS")
+
+
+def test_check_prompt_size_limits():
+    """El tope configurado y la ventana de contexto del modelo rechazan prompts grandes."""
+    os.environ["AI_MAX_PROMPT_TOKENS"] = "100"
+    try:
+        try:
+            check_prompt_size(SYLLABUS, stage="upload")
+            assert False, "debía rechazar el prompt"
+        except PromptTooLargeError as e:
+            assert e.limit == 100 and e.prompt_tokens > 100
+            assert "demasiado extenso" in str(e)
+    finally:
+        os.environ.pop("AI_MAX_PROMPT_TOKENS")
+
+    assert check_prompt_size("CV breve", model="gpt-4o-mini") > 0
+    try:
+        check_prompt_size(SYLLABUS * 20, model="gpt-3.5-turbo", max_output_tokens=4000)
+        assert False, "debía superar el contexto de gpt-3.5"
+    except PromptTooLargeError as e:
+        assert e.limit == 16_385 - 4000
+    print("Test límites de tamaño: ✓ PASS")
+
+
+def test_service_skips_small_context_candidates():
+    """En modo auto se omite el modelo en cuyo contexto no entra el prompt."""
+    record = CallRecord(stage="master", requested_provider="auto")
+    candidates = [("openai", "gpt-3.5-turbo"), ("gemini", "gemini-flash-latest")]
+    fitting, tokens = ai_service._fit_candidates(candidates, SYLLABUS * 20, 4000, record)
+
+    assert fitting == [("gemini", "gemini-flash-latest")]
+    assert record.estimated_prompt_tokens == tokens > 16_385
+    print("Test omisión por contexto: ✓ PASS")
+
+
+def test_oversized_prompt_never_reaches_provider():
+    """Un prompt que supera el tope responde un error amigable sin llamar al proveedor."""
+    calls = []
+
+    async def fake_local(prompt, model, max_tokens, usage=None):
+        calls.append(prompt)
+        return "no debería llamarse"
+
+    original = ai_service._GENERATORS["local"]
+    ai_service._GENERATORS["local"] = fake_local
+    os.environ["AI_MAX_PROMPT_TOKENS"] = "100"
+    try:
+        text = ai_service.generate_cv_output(SYLLABUS, provider="local", stage="master")
+        streamed = "".join(ai_service.generate_cv_output_stream(SYLLABUS + " v2", provider="local",
+                                                               stage="master"))
+    finally:
+        os.environ.pop("AI_MAX_PROMPT_TOKENS")
+        ai_service._GENERATORS["local"] = original
+
+    assert calls == []
+    assert "demasiado extenso" in text and "demasiado extenso" in streamed
+    assert [r["status"] for r in get_recent_calls(2)] == ["too_large", "too_large"]
+    print("Test rechazo sin red: ✓ PASS")
+
+
+if __name__ == "__main__":
+    test_heuristic_and_cache()
+    test_check_prompt_size_limits()
+    test_service_skips_small_context_candidates()
+    test_oversized_prompt_never_reaches_provider()
+    print("\n✅ Todos los tests pasaron")
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el re-análisis ATS incremental por secciones.
+Ejecutar: python tests/test_ats_incremental.py
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("AI_LOCAL_MODE", "synthetic")
+os.environ.setdefault("AI_LOCAL_LATENCY", "0")
+os.environ.setdefault("AI_LOCAL_TOKENS_PER_SECOND", "0")
+os.environ.setdefault("AI_CACHE_ENABLED", "0")
+
+from src import ats_analyzer
+from src.ats_analyzer import analyze_ats_compatibility, reanalyze_ats_compatibility
+from src.ats_scorer import (
+    changed_sections,
+    clear_section_cache,
+    get_section_cache_stats,
+    score_ats_locally,
+    split_sections,
+)
+
+CV = """Ana Gómez
+ana.gomez@mail.com · +54 11 5555 5555
+
+**Extracto**
+Desarrolladora backend con 5 años de experiencia en Python y AWS.
+
+**Experiencia Profesional**
+**Acme — Desarrolladora Backend**
+Buenos Aires · 03/2020 - 05/2024
+• Reduje la latencia de la API en 40% migrando a FastAPI
+• Implementé pipelines de CI/CD con GitHub Actions y Docker
+
+**Educación**
+Ingeniería en Sistemas — UTN (2015 - 2020)
+
+**Aptitudes Técnicas**
+Python, FastAPI, Django, PostgreSQL, Docker, Kubernetes, AWS, Git, SQL
+"""
+
+EDITED = CV.replace(
+    "• Implementé pipelines de CI/CD con GitHub Actions y Docker",
+    "• Implementé pipelines de CI/CD con GitHub Actions y Docker\n"
+    "• Automaticé la infraestructura con Terraform y Redis en AWS",
+)
+
+JOB = "Buscamos Backend Developer con Python, Django, PostgreSQL, Docker y AWS. Deseable Terraform y Redis."
+
+PROSE_JOB = (
+    "Nos encontramos en la búsqueda de una persona para sumarse a nuestro equipo de Plataforma. "
+    "Buscamos a alguien que pueda colaborar con las áreas afines y mantener los servicios en Python, "
+    "Django, Terraform y Jenkins. Modalidad híbrida, reuniones semanales con owners del negocio."
+)
+
+
+def test_split_and_diff_sections():
+    """El CV se corta en los encabezados **Sección** y el diff detecta solo lo editado."""
+    sections = split_sections(CV)
+    assert [s.key for s in sections] == ["contacto", "resumen", "experiencia", "educacion", "habilidades"]
+    assert sections[2].title == "Experiencia Profesional"
+    assert "\n\n".join(s.text for s in sections) == CV.strip()
+
+    changed, removed = changed_sections(CV, EDITED)
+    assert [s.key for s in changed] == ["experiencia"] and removed == []
+    assert changed_sections(CV, CV + "\n\n") == ([], [])
+
+    without_summary = CV.replace("**Extracto**\nDesarrolladora backend con 5 años de experiencia en Python y AWS.\n", "")
+    changed, removed = changed_sections(CV, without_summary)
+    assert changed == [] and [s.title for s in removed] == ["Extracto"]
+    print("Test secciones y diff: ✓ PASS")
+
+
+def test_local_rescore_only_changed_sections():
+    """Al re-analizar solo se recalculan las secciones modificadas y el resultado es el de un análisis completo."""
+    clear_section_cache()
+    before = score_ats_locally(CV, JOB)
+    assert get_section_cache_stats()["misses"] == 5
+
+    after = score_ats_locally(EDITED, JOB)
+    stats = get_section_cache_stats()
+    assert stats["misses"] == 6 and stats["hits"] == 4
+
+    clear_section_cache()
+    assert score_ats_locally(EDITED, JOB) == after
+    assert {"Terraform", "Redis"} <= set(after["keywords_found"]) and after["score"] > before["score"]
+    print("Test score local incremental: ✓ PASS")
+
+
+def test_llm_reanalysis_sends_only_changed_sections():
+    """El prompt de re-análisis lleva el análisis anterior y solo las secciones modificadas."""
+    previous = analyze_ats_compatibility(CV, JOB, provider="local")
+    prompts = []
+    original = ats_analyzer.generate_cv_output
+
+    def recording_generate(prompt, *args, **kwargs):
+        prompts.append(prompt)
+        return original(prompt, *args, **kwargs)
+
+    ats_analyzer.generate_cv_output = recording_generate
+    try:
+        result = reanalyze_ats_compatibility(EDITED, CV, previous, JOB, provider="local")
+        unchanged = reanalyze_ats_compatibility(CV, CV, previous, JOB, provider="local")
+    finally:
+        ats_analyzer.generate_cv_output = original
+
+    assert len(prompts) == 1 and unchanged is previous
+    prompt = prompts[0]
+    assert "--- INICIO DEL CV ---" not in prompt and "--- INICIO DEL ANÁLISIS ANTERIOR ---" in prompt
+    assert "Terraform y Redis" in prompt and "Ingeniería en Sistemas" not in prompt
+    assert "Extracto, Educación, Aptitudes Técnicas" in prompt
+
+    # Con un CV extenso, el prompt reducido es más corto que el del CV completo
+    projects = "\n\n**Proyectos**\n" + "\n".join(
+        f"• Proyecto {i}: API de reportes con Django, PostgreSQL y Celery para 200 usuarios" for i in range(40))
+    prompts.clear()
+    ats_analyzer.generate_cv_output = recording_generate
+    try:
+        reanalyze_ats_compatibility(EDITED + projects, CV + projects, previous, JOB, provider="local")
+    finally:
+        ats_analyzer.generate_cv_output = original
+    full_prompt = ats_analyzer._build_ats_analysis_prompt(EDITED + projects, JOB, structured=True)
+    assert "Proyecto 39" not in prompts[0] and len(prompts[0]) < len(full_prompt)
+
+    # Las palabras clave se recalculan localmente sobre todo el CV editado
+    assert {"Terraform", "Redis", "Python"} <= set(result["keywords_found"])
+    assert result["keywords_missing"] == []
+    print("Test prompt de re-análisis reducido: ✓ PASS")
+
+
+def test_llm_reanalysis_keywords_from_prose_job():
+    """Con un aviso en prosa, las palabras clave del re-análisis son las mismas que las del score local."""
+    previous = analyze_ats_compatibility(CV, PROSE_JOB, provider="local")
+    result = reanalyze_ats_compatibility(EDITED, CV, previous, PROSE_JOB, provider="local")
+    local = score_ats_locally(EDITED, PROSE_JOB)
+
+    assert result["keywords_found"] == local["keywords_found"] == ["Python", "Django", "Terraform"]
+    assert result["keywords_missing"] == local["keywords_missing"]
+    assert [kw.split(" (")[0] for kw in result["keywords_missing"]] == ["Jenkins"]
+    print("Test palabras clave del re-análisis con aviso en prosa: ✓ PASS")
+
+
+if __name__ == "__main__":
+    test_split_and_diff_sections()
+    test_local_rescore_only_changed_sections()
+    test_llm_reanalysis_sends_only_changed_sections()
+    test_llm_reanalysis_keywords_from_prose_job()
+    print("\n✅ Todos los tests pasaron")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el ranking vectorizado de un CV contra muchas descripciones de puesto.
+Ejecutar: python tests/test_ats_ranking.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import ai_service
+from src.ats_ranking import build_term_matrix, rank_job_descriptions
+
+CV = """Ana Gómez
+**Experiencia Profesional**
+• Desarrollé APIs REST con Python, Django y PostgreSQL
+• Automaticé despliegues con Docker y Kubernetes en AWS
+**Aptitudes Técnicas**
+Python, Django, FastAPI, PostgreSQL, Docker, Kubernetes, AWS, Git, Scrum
+"""
+
+JOBS = [
+    "**Backend Developer Python**\nPython, Django, PostgreSQL, Docker y AWS. Scrum.",
+    "**Frontend Developer**\nReact, TypeScript, CSS y Figma. Deseable Node.js.",
+    "**DevOps Engineer**\nKubernetes, Docker, Terraform, AWS y CI/CD con Jenkins.",
+    "**Data Analyst**\nSQL, Power BI, Excel avanzado y Python.",
+]
+
+# Avisos con mucha redacción alrededor de pocos requisitos técnicos
+PROSE_JOBS = [
+    "**Desarrollador Backend**\nNos encontramos en la búsqueda de una persona para sumarse a nuestro equipo "
+    "de Plataforma. Buscamos a alguien que pueda colaborar con las áreas afines y mantener los servicios "
+    "en Python, Django y PostgreSQL. Modalidad híbrida.",
+    "**Backend Engineer**\nWe are looking for someone who will also be available to support business owners "
+    "with weekly releases. Our stack: Python, Django, Terraform and AWS.",
+]
+
+
+def test_bm25_matrix():
+    """La matriz tiene una fila por descripción y pesa más los términos raros del lote."""
+    weights, keys, display = build_term_matrix(JOBS)
+    assert weights.shape == (len(JOBS), len(keys)) and len(display) == len(keys)
+    docker, terraform = keys.index("docker"), keys.index("terraform")
+    # Docker aparece en dos descripciones y Terraform en una: Terraform pesa más en la fila DevOps
+    assert weights[2, terraform] > weights[2, docker] > 0
+    assert weights[1, docker] == 0
+    print("Test matriz BM25: ✓ PASS")
+
+
+def test_ranking_table():
+    """El ranking ordena por score y lista palabras clave encontradas y faltantes."""
+    ranking = rank_job_descriptions(CV, JOBS)
+    assert [row["index"] for row in ranking][:2] == [0, 2]
+    assert ranking[-1]["index"] == 1 and ranking[-1]["score"] == 0
+
+    backend = ranking[0]
+    assert backend["title"] == "Backend Developer Python" and backend["score"] >= 80
+    assert set(backend["matched"]) >= {"Python", "Django", "PostgreSQL", "Docker", "AWS", "Scrum"}
+    devops = ranking[1]
+    assert {"Terraform", "CI/CD", "Jenkins"} <= set(devops["missing"]) and "Kubernetes" in devops["matched"]
+    assert 0 < devops["score"] < 100
+
+    assert len(rank_job_descriptions(CV, JOBS, top_k=2)) == 2
+    assert rank_job_descriptions(CV, []) == []
+    print("Test tabla de ranking: ✓ PASS")
+
+
+def test_prose_job_descriptions():
+    """Las palabras comunes de la redacción no entran a la matriz ni a las faltantes."""
+    _, keys, _ = build_term_matrix(PROSE_JOBS)
+    assert set(keys) == {"python", "django", "postgresql", "terraform", "aws"}
+
+    ranking = rank_job_descriptions(CV, PROSE_JOBS)
+    assert ranking[0]["index"] == 0 and ranking[0]["score"] == 100 and ranking[0]["missing"] == []
+    assert ranking[1]["missing"] == ["Terraform"]
+    print("Test avisos en prosa: ✓ PASS")
+
+
+def test_hundreds_of_postings_without_ai():
+    """Cientos de descripciones se puntúan sin llamar a la IA."""
+    calls = []
+    original = ai_service.generate_cv_output
+    ai_service.generate_cv_output = lambda *args, **kwargs: calls.append(args) or ""
+    try:
+        jobs = [f"{job}\nReferencia {i}. Equipo {i % 7}." for i in range(100) for job in JOBS]
+        started = time.perf_counter()
+        ranking = rank_job_descriptions(CV, jobs, top_k=10)
+        elapsed = time.perf_counter() - started
+    finally:
+        ai_service.generate_cv_output = original
+
+    assert calls == []
+    assert len(ranking) == 10 and all(jobs[row["index"]].startswith(JOBS[0]) for row in ranking)
+    assert elapsed < 5
+    print(f"Test {len(jobs)} descripciones ({elapsed * 1000:.0f} ms): ✓ PASS")
+
+
+if __name__ == "__main__":
+    test_bm25_matrix()
+    test_ranking_table()
+    test_prose_job_descriptions()
+    test_hundreds_of_postings_without_ai()
+    print("\n✅ Todos los tests pasaron")
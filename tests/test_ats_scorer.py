@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el score ATS local y determinista.
+Ejecutar: python tests/test_ats_scorer.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.ats_scorer import (
+    ENTRY_LEVEL_WEIGHTS,
+    STANDARD_WEIGHTS,
+    extract_keywords,
+    match_keywords,
+    parse_sections,
+    score_ats_locally,
+)
+
+CV = """Ana Gómez
+ana.gomez@mail.com · +54 11 5555 5555
+
+**Extracto**
+Desarrolladora backend con 5 años de experiencia en Python y AWS.
+
+**Experiencia Profesional**
+**Acme — Desarrolladora Backend**
+Buenos Aires · 03/2020 - 05/2024
+• Reduje la latencia de la API en 40% migrando a FastAPI
+• Implementé pipelines de CI/CD con GitHub Actions y Docker
+• Lideré un equipo de 4 personas en la migración a Kubernetes
+
+**Educación**
+Ingeniería en Sistemas — UTN (2015 - 2020)
+
+**Aptitudes Técnicas**
+Python, FastAPI, Django, PostgreSQL, Docker, Kubernetes, AWS, Git, SQL
+"""
+
+JOB = "Buscamos Backend Developer con Python, Django, PostgreSQL, Docker y AWS. Deseable Terraform y Redis."
+
+# Avisos con mucha redacción: las palabras comunes no son palabras clave
+PROSE_JOB_ES = (
+    "Nos encontramos en la búsqueda de un Analista de Datos para sumarse a nuestro equipo de Finanzas. "
+    "Entre sus tareas deberá elaborar reportes mensuales, colaborar con las áreas afines y mantener "
+    "actualizados los tableros. Requisitos: SQL, Power BI y Excel avanzado. Modalidad híbrida."
+)
+PROSE_JOB_EN = (
+    "We are looking for a Data Analyst to join our Finance team. You will also be available to support "
+    "business owners with weekly reports. Requirements: SQL, Power BI and Excel. Full-time, hands-on role."
+)
+ANALYST_CV = """Laura Pérez
+laura@mail.com · +54 11 4444 4444
+
+**Experiencia**
+**Banco Sur — Analista de Datos**
+03/2021 - 06/2024
+• Automaticé reportes en SQL y Power BI para el área de Finanzas
+• Reduje 30% el tiempo de cierre mensual con Excel avanzado
+
+**Educación**
+Licenciatura en Economía — UBA (2016 - 2020)
+"""
+
+
+def _points(result, criterion):
+    detail = result["details"][criterion]
+    points, max_points = detail[1:detail.index("]")].split("/")
+    return int(points), int(max_points)
+
+
+def test_sections_and_keywords():
+    """Las secciones se reconocen por sus encabezados y las palabras clave sin tildes ni mayúsculas."""
+    sections = parse_sections(CV)
+    assert set(sections) == {"contacto", "resumen", "experiencia", "educacion", "habilidades"}
+    assert sections["experiencia"][0] == "**Acme — Desarrolladora Backend**"
+    assert "ana.gomez@mail.com · +54 11 5555 5555" in sections["contacto"]
+
+    found, missing = match_keywords(["python", "POSTGRESQL", "Ingenieria", "Terraform"], CV)
+    assert found == ["python", "POSTGRESQL", "Ingenieria"] and missing == ["Terraform"]
+    print("Test secciones y palabras clave: ✓ PASS")
+
+
+def test_standard_weights():
+    """Puesto con experiencia: criterios 25/40/20/15 y el score es su suma."""
+    result = score_ats_locally(CV, JOB)
+    assert result["source"] == "local" and not result["entry_level"]
+    assert [c for c in result["details"]] == list(STANDARD_WEIGHTS)
+    assert [_points(result, c)[1] for c in STANDARD_WEIGHTS] == [25, 40, 20, 15]
+    assert result["score"] == sum(_points(result, c)[0] for c in STANDARD_WEIGHTS)
+
+    assert "Terraform (sugerencia: agregar en experiencia/proyectos con ejemplo concreto)" in result["keywords_missing"]
+    assert {"Python", "Django", "PostgreSQL", "Docker", "AWS"} <= set(result["keywords_found"])
+    assert _points(result, "Formato y Estructura") == (25, 25)
+    assert 60 <= result["score"] <= 90 and result["level"] in ("Bueno", "Excelente", "Aceptable")
+    print("Test pesos estándar: ✓ PASS")
+
+
+def test_entry_level_weights():
+    """Puesto entry-level: criterios 35/30/25/10, sin penalizar la falta de experiencia."""
+    job = "Pasantía para estudiantes. Python, SQL y Git."
+    result = score_ats_locally(CV, job)
+    assert result["entry_level"]
+    assert [_points(result, c)[1] for c in ENTRY_LEVEL_WEIGHTS] == [35, 30, 25, 10]
+    assert _points(result, "Palabras Clave") == (25, 25)
+    print("Test pesos entry-level: ✓ PASS")
+
+
+def test_weaker_cv_scores_lower():
+    """Sin secciones estándar, métricas ni fechas el score baja; un CV vacío es Crítico."""
+    weak = "Ana Gómez\n\n**Experiencia**\n- Tareas varias de desarrollo\n- Soporte a usuarios"
+    strong, poor = score_ats_locally(CV, JOB), score_ats_locally(weak, JOB)
+    assert poor["score"] < strong["score"] - 30
+    assert any("Fechas" in w for w in poor["weaknesses"])
+    assert any("MM/YYYY" in r for r in poor["recommendations"])
+
+    empty = score_ats_locally("Ana Gómez\nana@mail.com", JOB)
+    assert empty["score"] == 15 and empty["level"] == "Crítico"
+    print("Test CV débil y vacío: ✓ PASS")
+
+
+def test_prose_job_description():
+    """De un aviso en prosa solo se toman términos del diccionario y con forma técnica."""
+    for job in (PROSE_JOB_ES, PROSE_JOB_EN):
+        assert extract_keywords(job) == ["Análisis de datos", "SQL", "Power BI", "Excel"]
+        result = score_ats_locally(ANALYST_CV, job)
+        assert result["keywords_missing"] == []
+        assert _points(result, "Palabras Clave") == (40, 40)
+        assert not any("palabras clave faltantes" in r for r in result["recommendations"])
+
+    assert extract_keywords("REQUISITOS Y BENEFICIOS\nISO 9001, ABAP y T-SQL. Trabajo full-time.") == [
+        "SQL", "ISO", "ABAP", "T-SQL"]
+    # Un aviso sin términos reconocibles no deja la cobertura en cero
+    result = score_ats_locally(ANALYST_CV, "Buscamos una persona proactiva, responsable y con ganas de aprender.")
+    assert result["keywords_found"] and result["keywords_missing"] == []
+    print("Test aviso en prosa: ✓ PASS")
+
+
+def test_instant_and_deterministic():
+    """El score local es determinista y tarda milisegundos."""
+    started = time.perf_counter()
+    results = [score_ats_locally(CV, JOB) for _ in range(50)]
+    elapsed = (time.perf_counter() - started) / 50
+    assert all(result == results[0] for result in results)
+    assert elapsed < 0.05
+    print(f"Test score instantáneo ({elapsed * 1000:.2f} ms): ✓ PASS")
+
+
+if __name__ == "__main__":
+    test_sections_and_keywords()
+    test_standard_weights()
+    test_entry_level_weights()
+    test_weaker_cv_scores_lower()
+    test_prose_job_description()
+    test_instant_and_deterministic()
+    print("\n✅ Todos los tests pasaron")
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para la salida estructurada (JSON) del análisis ATS.
+Ejecutar: python tests/test_ats_structured.py
+"""
+
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("AI_LOCAL_MODE", "synthetic")
+os.environ.setdefault("AI_LOCAL_LATENCY", "0")
+os.environ.setdefault("AI_LOCAL_TOKENS_PER_SECOND", "0")
+os.environ.setdefault("AI_CACHE_ENABLED", "0")
+
+from src import ats_analyzer
+from src.ats_analyzer import (
+    ATS_ANALYSIS_SCHEMA,
+    _validate_ats_fields,
+    analyze_ats_compatibility,
+)
+from src.prompts import prefix_fingerprint
+
+CV = """**Ana Pérez**
+ana@mail.com
+
+**Experiencia**
+- Desarrolladora Python con Django y PostgreSQL en proyectos de datos
+"""
+JOB = "Buscamos desarrollador Python con experiencia en Django, Docker y PostgreSQL."
+
+VALID = {
+    "score": 72,
+    "level": "Bueno",
+    "keywords_found": ["python", "django"],
+    "keywords_missing": ["docker (sugerencia: agregar en experiencia/proyectos con ejemplo concreto)"],
+    "strengths": ["Experiencia relevante"],
+    "weaknesses": ["Falta Docker"],
+    "recommendations": ["Agregar un proyecto con Docker"],
+    "details": [{"criterion": "Palabras Clave", "score": 30, "max_score": 40, "comment": "buena cobertura"}],
+}
+
+
+def test_validator_reports_failed_fields():
+    """El validador detecta solo los campos inválidos o faltantes."""
+    assert _validate_ats_fields(VALID) == []
+
+    broken = dict(VALID, score=140, level="Regular")
+    del broken["strengths"]
+    broken["details"] = [{"criterion": "Formato", "score": 30, "max_score": 25, "comment": ""}]
+    assert _validate_ats_fields(broken) == ["score", "level", "strengths", "details"]
+    print("Test validador: ✓ PASS")
+
+
+def test_repair_requests_only_failed_fields():
+    """La reparación pide (y reemplaza) únicamente los campos inválidos."""
+    calls = []
+
+    def fake_generate(prompt, model=None, provider="auto", stage="general", max_tokens=None,
+                      response_schema=None):
+        calls.append((prompt, response_schema))
+        if len(calls) == 1:
+            return json.dumps(dict(VALID, score="setenta", level="Regular"))
+        return json.dumps({"score": 70, "level": "Bueno", "strengths": ["no debe usarse"]})
+
+    original = ats_analyzer.generate_cv_output
+    ats_analyzer.generate_cv_output = fake_generate
+    try:
+        result = analyze_ats_compatibility(CV, JOB, structured=True)
+    finally:
+        ats_analyzer.generate_cv_output = original
+
+    assert len(calls) == 2
+    first_prompt, first_schema = calls[0]
+    repair_prompt, repair_schema = calls[1]
+    assert first_schema is ATS_ANALYSIS_SCHEMA
+    assert sorted(repair_schema["properties"]) == ["level", "score"]
+    assert "score, level" in repair_prompt
+    # La nota de reparación va al final: el prefijo estático se conserva
+    assert prefix_fingerprint(repair_prompt) == prefix_fingerprint(first_prompt)
+
+    assert result["score"] == 70 and result["level"] == "Bueno"
+    assert result["strengths"] == VALID["strengths"]
+    assert result["details"] == {"Palabras Clave": "[30/40] - buena cobertura"}
+    print("Test reparación de campos: ✓ PASS")
+
+
+def test_non_json_falls_back_to_markdown():
+    """Si el proveedor responde markdown, se usa el parser de siempre."""
+    markdown = "**SCORE_ATS:** 55\n\n**NIVEL:** Aceptable\n"
+    original = ats_analyzer.generate_cv_output
+    ats_analyzer.generate_cv_output = lambda *args, **kwargs: markdown
+    try:
+        result = analyze_ats_compatibility(CV, JOB, structured=True)
+    finally:
+        ats_analyzer.generate_cv_output = original
+
+    assert result["score"] == 55 and result["level"] == "Aceptable"
+    print("Test fallback a markdown: ✓ PASS")
+
+
+def test_local_structured_matches_markdown():
+    """Con el proveedor local, JSON y markdown producen el mismo resultado."""
+    structured = analyze_ats_compatibility(CV, JOB, provider="local", structured=True)
+    markdown = analyze_ats_compatibility(CV, JOB, provider="local", structured=False)
+
+    assert json.loads(structured["raw_analysis"])["score"] == structured["score"]
+    for field in ("score", "level", "keywords_found", "keywords_missing", "strengths",
+                  "weaknesses", "recommendations", "details"):
+        assert structured[field] == markdown[field], field
+    print("Test proveedor local estructurado: ✓ PASS")
+
+
+if __name__ == "__main__":
+    test_validator_reports_failed_fields()
+    test_repair_requests_only_failed_fields()
+    test_non_json_falls_back_to_markdown()
+    test_local_structured_matches_markdown()
+    print("\n✅ Todos los tests pasaron")
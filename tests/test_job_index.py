@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el índice invertido persistente de descripciones de puesto.
+Ejecutar: python tests/test_job_index.py
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.job_index import INDEX_VERSION, JobIndex
+
+CV = """Ana Gómez
+**Experiencia Profesional**
+• Desarrollé APIs REST con Python, Django y PostgreSQL
+• Automaticé despliegues con Docker y Kubernetes en AWS
+**Aptitudes Técnicas**
+Python, Django, FastAPI, PostgreSQL, Docker, Kubernetes, AWS, Git, Scrum
+"""
+
+JOBS = [
+    "**Backend Developer Python**\nPython, Django, PostgreSQL, Docker y AWS. Scrum.",
+    "**Frontend Developer**\nReact, TypeScript, CSS y Figma. Deseable Node.js.",
+    "**DevOps Engineer**\nKubernetes, Docker, Terraform, AWS y CI/CD con Jenkins.",
+    "**Data Analyst**\nSQL, Power BI, Excel avanzado y Python.",
+]
+
+# Avisos con mucha redacción alrededor de pocos requisitos técnicos
+PROSE_JOBS = [
+    "**Desarrollador Backend**\nNos encontramos en la búsqueda de una persona para sumarse a nuestro equipo "
+    "de Plataforma. Buscamos a alguien que pueda colaborar con las áreas afines y mantener los servicios "
+    "en Python, Django y PostgreSQL. Modalidad híbrida.",
+    "**Backend Engineer**\nWe are looking for someone who will also be available to support business owners "
+    "with weekly releases. Our stack: Python, Django, Terraform and AWS.",
+]
+
+SKILLS = ["Python", "Django", "PostgreSQL", "Docker", "AWS", "Scrum", "React", "TypeScript", "CSS",
+          "Figma", "Kubernetes", "Terraform", "Jenkins", "SQL", "Power BI", "Excel", "Java", "Spring",
+          "Angular", "MongoDB", "Redis", "Kafka", "Azure", "Linux", "Tableau", "FastAPI", "Git"]
+
+
+def _corpus(size: int):
+    rng = random.Random(7)
+    return [f"**Puesto {i}**\n" + ", ".join(rng.sample(SKILLS, rng.randint(3, 9))) + "."
+            for i in range(size)]
+
+
+def test_persistent_and_incremental():
+    """Las descripciones y su document frequency sobreviven a reabrir el índice y se actualizan al quitar."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "jobs.sqlite")
+        index = JobIndex(path)
+        ids = [index.add(job) for job in JOBS]
+        assert index.add(JOBS[0]) == ids[0] and len(index) == 4
+        assert index.document_frequency("docker") == 2 and index.document_frequency("Python") == 2
+        index.close()
+
+        reopened = JobIndex(path)
+        assert len(reopened) == 4 and reopened.document_frequency("Docker") == 2
+        assert reopened.remove(ids[2]) and not reopened.remove(ids[2])
+        assert reopened.document_frequency("Docker") == 1 and reopened.document_frequency("Terraform") == 0
+        results = reopened.search(CV, k=3)
+        assert [row["id"] for row in results][0] == ids[0]
+        assert ids[2] not in [row["id"] for row in results]
+        reopened.close()
+    print("Test persistencia e incremental: ✓ PASS")
+
+
+def test_search_results():
+    """El mejor resultado lista sus palabras clave encontradas y faltantes."""
+    with tempfile.TemporaryDirectory() as tmp:
+        index = JobIndex(os.path.join(tmp, "jobs.sqlite"))
+        for job in JOBS:
+            index.add(job)
+        results = index.search(CV, k=2)
+        assert [row["title"] for row in results] == ["Backend Developer Python", "DevOps Engineer"]
+        assert {"Python", "Django", "PostgreSQL", "Docker", "AWS", "Scrum"} <= set(results[0]["matched"])
+        assert {"Terraform", "Jenkins"} <= set(results[1]["missing"]) and results[0]["score"] > results[1]["score"]
+        assert index.search("Sin palabras clave conocidas", k=3) == []
+        index.close()
+    print("Test resultados de búsqueda: ✓ PASS")
+
+
+def test_prose_job_descriptions():
+    """Solo se indexan términos del diccionario y con forma técnica; un índice anterior se reindexa."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "jobs.sqlite")
+        index = JobIndex(path)
+        ids = [index.add(job) for job in PROSE_JOBS]
+        for word in ("encontramos", "busqueda", "afines", "available", "owners", "weekly"):
+            assert index.document_frequency(word) == 0
+        results = {row["id"]: row for row in index.search(CV, k=2)}
+        assert results[ids[0]]["missing"] == [] and results[ids[1]]["missing"] == ["Terraform"]
+
+        # Un índice guardado con la extracción anterior conserva palabras de relleno hasta reindexarse
+        with index._conn:
+            index._conn.execute("INSERT INTO postings VALUES ('encontramos', ?, 1, 5)", (ids[0],))
+            index._conn.execute("INSERT INTO terms VALUES ('encontramos', 'encontramos', 1, 1, 5)")
+        index._conn.execute(f"PRAGMA user_version = {INDEX_VERSION - 1}")
+        index.close()
+
+        reopened = JobIndex(path)
+        assert reopened.document_frequency("encontramos") == 0 and len(reopened) == 2
+        assert reopened.document_frequency("Python") == 2
+        assert reopened._conn.execute("PRAGMA user_version").fetchone()[0] == INDEX_VERSION
+        reopened.close()
+    print("Test avisos en prosa: ✓ PASS")
+
+
+def test_max_score_matches_exhaustive_search():
+    """Max-score devuelve el mismo top-k que puntuar todos los candidatos, evaluando menos documentos."""
+    with tempfile.TemporaryDirectory() as tmp:
+        index = JobIndex(os.path.join(tmp, "jobs.sqlite"))
+        for job in _corpus(600):
+            index.add(job)
+
+        for k in (1, 5, 20):
+            fast = index.search(CV, k=k)
+            fast_stats = index.search_stats()
+            full = index.search(CV, k=k, early_termination=False)
+            full_stats = index.search_stats()
+            assert [(row["id"], row["score"]) for row in fast] == [(row["id"], row["score"]) for row in full]
+            assert len(fast) == k
+            assert fast_stats["evaluated_docs"] < full_stats["evaluated_docs"]
+            # Las listas que dejan de ser esenciales no se siguen leyendo de disco
+            assert fast_stats["postings_read"] < full_stats["postings_read"] == full_stats["postings"]
+        index.close()
+    print(f"Test max-score ({fast_stats['evaluated_docs']} de {full_stats['evaluated_docs']} "
+          f"documentos evaluados): ✓ PASS")
+
+
+def test_long_cv_query():
+    """Un CV con miles de palabras distintas no supera el límite de variables de SQLite."""
+    with tempfile.TemporaryDirectory() as tmp:
+        index = JobIndex(os.path.join(tmp, "jobs.sqlite"))
+        for job in JOBS:
+            index.add(job)
+        if hasattr(index._conn, "setlimit"):
+            # Límite de las versiones de SQLite anteriores a 3.32
+            index._conn.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+        long_cv = CV + "\n".join(f"Tecnologia{i} Herramienta{i}" for i in range(2000))
+        results = index.search(long_cv, k=2)
+        assert [row["title"] for row in results] == ["Backend Developer Python", "DevOps Engineer"]
+        index.close()
+    print("Test CV extenso: ✓ PASS")
+
+
+if __name__ == "__main__":
+    test_persistent_and_incremental()
+    test_search_results()
+    test_prose_job_descriptions()
+    test_max_score_matches_exhaustive_search()
+    test_long_cv_query()
+    print("\n✅ Todos los tests pasaron")
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el buscador de palabras clave (Aho-Corasick con diccionario).
+Ejecutar: python tests/test_keyword_matcher.py
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.ats_analyzer import _build_ats_analysis_prompt
+from src.ats_scorer import extract_keywords, match_job_keywords
+from src.keyword_matcher import (
+    BUILTIN_DICTIONARY,
+    KeywordAutomaton,
+    KeywordDictionary,
+    get_automaton,
+    load_dictionary,
+    match_dictionary_keywords,
+)
+
+JOB = (
+    "Buscamos Data Scientist con experiencia en Machine Learning, Python y SQL. "
+    "Deseable conocimientos de Inteligencia Artificial, metodologías ágiles, CI/CD y Node.js. "
+    "Inglés avanzado."
+)
+CV = (
+    "Científica de datos. Modelos de ML con python3 y scikit-learn; consultas SQL. "
+    "Proyectos de IA generativa. Equipos Agile. Node.js. English: C1."
+)
+
+
+def test_acronyms_translations_and_accents():
+    """Acrónimos, traducciones, tildes y mayúsculas coinciden con el término canónico."""
+    automaton = get_automaton()
+    assert list(automaton.find_terms("Experiencia en ML y aprendizaje automático")) == ["Machine Learning"]
+    assert automaton.find_terms("Experiencia en ML y aprendizaje automático")["Machine Learning"] == 2
+    assert list(automaton.find_terms("INTELIGENCIA ARTIFICIAL")) == ["Inteligencia Artificial"]
+    assert list(automaton.find_terms("Gestión de Proyectos")) == ["Gestión de proyectos"]
+    print("Test acrónimos, traducciones y tildes: ✓ PASS")
+
+
+def test_word_boundaries():
+    """Solo coinciden palabras completas: "java" no está en "javascript" ni "js" en "node.js"."""
+    automaton = get_automaton()
+    assert list(automaton.find_terms("JavaScript y Node.js")) == ["JavaScript", "Node.js"]
+    assert list(automaton.find_terms("Java, C# y C++.")) == ["Java", "C#", "C++"]
+    assert automaton.find_terms("redacción, aire, iatrogenia") == {}
+    print("Test límites de palabra: ✓ PASS")
+
+
+def test_job_keywords_against_cv():
+    """Las palabras clave del puesto se buscan en el CV en una pasada por texto."""
+    found, missing = match_dictionary_keywords(JOB, CV)
+    assert set(found) == {"Ciencia de datos", "Machine Learning", "Python", "SQL", "Inteligencia Artificial",
+                          "Metodologías ágiles", "Node.js", "Inglés"}
+    assert missing == ["CI/CD"]
+
+    # Las palabras sueltas de un término ("ágiles") no se repiten como palabra clave
+    keywords = extract_keywords(JOB)
+    assert "ágiles" not in keywords and "Machine" not in keywords
+    found, missing = match_job_keywords(JOB, CV)
+    assert "CI/CD" in missing and "Machine Learning" in found
+    print("Test palabras clave del puesto: ✓ PASS")
+
+
+def test_common_words_are_not_terms():
+    """Palabras comunes ("rest", "cloud", "spring", "node") no son términos sin su calificador."""
+    automaton = get_automaton()
+    job = ("You will work with the rest of the team on our cloud platform. Spring internship available. "
+           "Node owners review every change. Pruebas de concepto en la nube con contenedores de carga.")
+    assert automaton.find_terms(job) == {}
+    assert list(automaton.find_terms("REST APIs en Node.js y Spring Boot sobre AWS; pruebas de software. "
+                                     "Cloud computing")) == [
+        "API REST", "Node.js", "Spring Boot", "AWS", "Testing", "Cloud Computing"]
+    print("Test palabras comunes: ✓ PASS")
+
+
+def test_ats_prompt_lists_dictionary_keywords():
+    """El prompt ATS recibe como palabras clave detectadas solo los términos del diccionario."""
+    job = ("Nos encontramos en la búsqueda de una persona para sumarse al equipo, elaborar reportes "
+           "mensuales y colaborar con áreas afines. Requisitos: Python, SQL y CI/CD. ISO 27001 deseable.")
+    prompt = _build_ats_analysis_prompt(CV, job)
+    block = prompt[prompt.index("--- INICIO DE LAS PALABRAS CLAVE"):prompt.index("--- FIN DE LAS PALABRAS CLAVE")]
+    assert "Encontradas en el CV: Python, SQL" in block
+    assert "Faltantes en el CV: CI/CD\n" in block
+    assert "encontramos" not in block and "ISO" not in block
+    print("Test palabras clave del prompt ATS: ✓ PASS")
+
+
+def test_automaton_cached_per_version():
+    """El autómata se compila una vez por versión; un diccionario adicional crea otra versión."""
+    assert get_automaton() is get_automaton()
+    assert get_automaton().version == BUILTIN_DICTIONARY.version
+
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False, encoding="utf-8") as f:
+        json.dump({"version": "empresa-1", "terms": {"Auditoría médica": ["auditoria de prestaciones"]}}, f)
+    os.environ["AI_ATS_KEYWORD_DICTIONARY"] = f.name
+    try:
+        dictionary = load_dictionary()
+        assert dictionary.version == f"{BUILTIN_DICTIONARY.version}+empresa-1"
+        custom = get_automaton()
+        assert custom is not get_automaton(BUILTIN_DICTIONARY) and custom is get_automaton()
+        assert list(custom.find_terms("Auditoría de prestaciones y Python")) == ["Auditoría médica", "Python"]
+    finally:
+        os.environ.pop("AI_ATS_KEYWORD_DICTIONARY")
+        os.unlink(f.name)
+    print("Test caché por versión: ✓ PASS")
+
+
+def test_edited_or_invalid_dictionary_file():
+    """Editar el archivo sin cambiar su versión recompila el autómata; un JSON inválido usa el incorporado."""
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False, encoding="utf-8") as f:
+        json.dump({"version": "empresa-2", "terms": {"Auditoría médica": []}}, f)
+    os.environ["AI_ATS_KEYWORD_DICTIONARY"] = f.name
+    try:
+        before = get_automaton()
+        assert list(before.find_terms("Auditoría médica y facturación hospitalaria")) == ["Auditoría médica"]
+
+        with open(f.name, "w", encoding="utf-8") as edited:
+            json.dump({"version": "empresa-2", "terms": {"Auditoría médica": [],
+                                                         "Facturación hospitalaria": []}}, edited)
+        os.utime(f.name, (time.time() + 5, time.time() + 5))
+        after = get_automaton()
+        assert after is not before and load_dictionary().version == before.version
+        assert list(after.find_terms("Auditoría médica y facturación hospitalaria")) == [
+            "Auditoría médica", "Facturación hospitalaria"]
+
+        for invalid in ("{no es json", "[1, 2]", '{"terms": {"Término": 3}}'):
+            with open(f.name, "w", encoding="utf-8") as broken:
+                broken.write(invalid)
+            os.utime(f.name, (time.time() + 10, time.time() + 10 + len(invalid)))
+            assert load_dictionary() is BUILTIN_DICTIONARY
+            assert get_automaton().find_terms("Python") == {"Python": 1}
+    finally:
+        os.environ.pop("AI_ATS_KEYWORD_DICTIONARY")
+        os.unlink(f.name)
+    print("Test diccionario editado o inválido: ✓ PASS")
+
+
+def test_linear_scan_speed():
+    """Una pasada sobre un texto largo no depende de la cantidad de términos del diccionario."""
+    small = KeywordAutomaton(KeywordDictionary("test-small", {"Python": ()}))
+    text = CV * 500
+    started = time.perf_counter()
+    found = get_automaton().find_terms(text)
+    full = time.perf_counter() - started
+    started = time.perf_counter()
+    small.find_terms(text)
+    single = time.perf_counter() - started
+    assert found["Python"] == 500
+    assert full < single * 4
+    print(f"Test pasada lineal ({full * 1000:.1f} ms vs {single * 1000:.1f} ms con 1 término): ✓ PASS")
+
+
+if __name__ == "__main__":
+    test_acronyms_translations_and_accents()
+    test_word_boundaries()
+    test_job_keywords_against_cv()
+    test_common_words_are_not_terms()
+    test_ats_prompt_lists_dictionary_keywords()
+    test_automaton_cached_per_version()
+    test_edited_or_invalid_dictionary_file()
+    test_linear_scan_speed()
+    print("\n✅ Todos los tests pasaron")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el orden de los prompts (prefijo estático primero, documentos al final).
+Ejecutar: python tests/test_prompt_prefix.py
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.ai_local import LocalProvider
+from src.ai_metrics import summarize_prefix_cache
+from src.ats_analyzer import _build_ats_analysis_prompt
+from src.prompts import (
+    build_prompt_job_structuring,
+    build_prompt_linkedin_profile,
+    build_prompt_master,
+    build_prompt_targeted,
+    prefix_fingerprint,
+    static_prefix,
+)
+
+
+def test_builders_share_static_prefix():
+    """Documentos distintos no alteran el prefijo estático de cada prompt."""
+    pairs = [
+        (build_prompt_master("CV de Ana", "Curso de datos"), build_prompt_master("Otro CV", "Otro curso")),
+        (build_prompt_targeted("CV Maestro A", "Puesto A"), build_prompt_targeted("CV Maestro B", "Puesto B")),
+        (build_prompt_job_structuring("Oferta A"), build_prompt_job_structuring("Oferta B")),
+        (build_prompt_linkedin_profile("CV A"), build_prompt_linkedin_profile("CV B")),
+    ]
+    for first, second in pairs:
+        assert prefix_fingerprint(first) == prefix_fingerprint(second)
+        assert "CV A" not in static_prefix(first) and "Oferta A" not in static_prefix(first)
+    print("Test prefijo de builders: ✓ PASS")
+
+
+def test_ats_prefix_ignores_job_type():
+    """El prefijo ATS es el mismo con o sin descripción y para puestos entry-level."""
+    standard = _build_ats_analysis_prompt("CV con experiencia", "Buscamos senior con 5 años")
+    entry_level = _build_ats_analysis_prompt("Otro CV", "Pasantía para estudiantes")
+    no_job = _build_ats_analysis_prompt("Tercer CV", "")
+
+    assert prefix_fingerprint(standard) == prefix_fingerprint(entry_level) == prefix_fingerprint(no_job)
+    assert "ENTRY-LEVEL/SIN EXPERIENCIA REQUERIDA" in entry_level[len(static_prefix(entry_level)):]
+    assert entry_level.rstrip().endswith("--- FIN DEL CV ---")
+    print("Test prefijo ATS: ✓ PASS")
+
+
+def test_local_provider_reports_cached_prefix():
+    """El proveedor local informa cached_tokens desde la segunda llamada con el mismo prefijo."""
+    provider = LocalProvider(cassette_dir="", mode="synthetic", latency=0, tokens_per_second=0)
+    first, second = {}, {}
+    provider._usage("", build_prompt_master("CV uno", "Curso"), "", first)
+    provider._usage("", build_prompt_master("CV dos", "Curso"), "", second)
+
+    assert first["cached_tokens"] == 0
+    assert 0 < second["cached_tokens"] < second["prompt_tokens"]
+
+    summary = summarize_prefix_cache([
+        dict(first, stage="master", prefix_fingerprint="abc"),
+        dict(second, stage="master", prefix_fingerprint="abc"),
+    ])
+    assert summary[0]["calls"] == 2
+    assert summary[0]["cached_tokens"] == second["cached_tokens"]
+    print("Test cached_tokens: ✓ PASS")
+
+
+if __name__ == "__main__":
+    test_builders_share_static_prefix()
+    test_ats_prefix_ignores_job_type()
+    test_local_provider_reports_cached_prefix()
+    print("\n✅ Todos los tests pasaron")
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el modo por fragmentos de los programas de estudio extensos.
+Ejecutar: python tests/test_study_condenser.py
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("AI_LOCAL_MODE", "synthetic")
+os.environ.setdefault("AI_LOCAL_LATENCY", "0")
+os.environ.setdefault("AI_LOCAL_TOKENS_PER_SECOND", "0")
+os.environ.setdefault("AI_CACHE_ENABLED", "0")
+
+from src import ai_service
+from src.ai_tokens import count_tokens
+from src.extract_pdf import PAGE_BREAK
+from src.study_condenser import (
+    clear_condense_cache,
+    condense_studies,
+    get_condense_stats,
+    needs_condensing,
+    split_chunks,
+    split_documents,
+)
+
+
+def _syllabus(name, units):
+    """Programa de estudios ya compactado (un párrafo por unidad)."""
+    paragraphs = [
+        (f"Unidad {n}: {name} {n}. Contenidos: " + "modelado, consultas, índices, transacciones y optimización. " * 12).strip()
+        for n in range(1, units + 1)
+    ]
+    return f"[Documento: {name}.pdf]\n\n" + "\n\n".join(paragraphs)
+
+
+STUDIES = _syllabus("Bases de datos", 8) + "\n\n" + _syllabus("Programación web", 8)
+
+
+def test_split_documents_and_chunks():
+    """Se parte por documento (marcadores compactados o sin compactar) y por páginas/párrafos."""
+    raw = (
+        "--- INICIO_DOCUMENTO: a.pdf ---\nPágina uno\n" + PAGE_BREAK + "\nPágina dos\n--- FIN_DOCUMENTO: a.pdf ---\n"
+        "--- INICIO_DOCUMENTO: b.pdf ---\nOtro programa\n--- FIN_DOCUMENTO: b.pdf ---"
+    )
+    documents = split_documents(raw)
+    assert [name for name, _ in documents] == ["a.pdf", "b.pdf"]
+    assert split_chunks(documents[0][1], max_tokens=3) == ["Página uno", "Página dos"]
+    assert split_documents("Texto sin marcadores") == [("", "Texto sin marcadores")]
+
+    documents = split_documents(STUDIES)
+    chunks = split_chunks(documents[0][1], max_tokens=400)
+    assert len(chunks) > 1
+    assert all(count_tokens(chunk) <= 400 for chunk in chunks)
+    assert "\n\n".join(chunks) == documents[0][1]
+
+    # Una línea enorme (PDF extraído sin saltos de línea) también se parte, por palabras
+    line = " ".join(f"tema{i} normalización de bases de datos" for i in range(800))
+    chunks = split_chunks(line, max_tokens=400)
+    assert len(chunks) > 1 and all(count_tokens(chunk) <= 400 for chunk in chunks)
+    assert " ".join(chunks).split() == line.split()
+    chunks = split_chunks("x" * 6000, max_tokens=400)
+    assert all(count_tokens(chunk) <= 400 for chunk in chunks) and "".join(chunks).replace("\n", "") == "x" * 6000
+    print("Test partición en fragmentos: ✓ PASS")
+
+
+def test_short_studies_pass_through():
+    """Por debajo del umbral el texto no cambia y no se llama a la IA."""
+    text = _syllabus("Redes", 1)
+    assert not needs_condensing(text)
+    assert condense_studies(text, provider="local") is text
+    print("Test estudios breves sin cambios: ✓ PASS")
+
+
+def test_parallel_condensation_and_cache():
+    """Los fragmentos se condensan en paralelo (acotado) y se cachean por hash."""
+    clear_condense_cache()
+    active, peak, calls = [0], [0], []
+    lock = threading.Lock()
+    original = ai_service._GENERATORS["local"]
+
+    async def slow_local(prompt, model, max_tokens, usage=None):
+        import asyncio
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            calls.append(prompt)
+        await asyncio.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        return "**Programa condensado**\n- " + prompt.split("Unidad ")[1][:20]
+
+    ai_service._GENERATORS["local"] = slow_local
+    os.environ["AI_CONDENSE_THRESHOLD_TOKENS"] = "500"
+    os.environ["AI_CONDENSE_CHUNK_TOKENS"] = "400"
+    try:
+        started = time.perf_counter()
+        condensed = condense_studies(STUDIES, provider="local", concurrency=3)
+        elapsed = time.perf_counter() - started
+        first_calls = len(calls)
+
+        again = condense_studies(STUDIES, provider="local", concurrency=3)
+    finally:
+        os.environ.pop("AI_CONDENSE_THRESHOLD_TOKENS")
+        os.environ.pop("AI_CONDENSE_CHUNK_TOKENS")
+        ai_service._GENERATORS["local"] = original
+
+    assert first_calls > 3 and peak[0] == 3
+    assert elapsed < first_calls * 0.05
+    assert condensed.index("[Documento: Bases de datos.pdf]") < condensed.index("[Documento: Programación web.pdf]")
+    assert "**Programa condensado**" not in condensed
+    assert count_tokens(condensed) < count_tokens(STUDIES) // 4
+
+    assert again == condensed and len(calls) == first_calls
+    assert get_condense_stats()["hits"] == first_calls
+    print("Test condensación paralela y caché: ✓ PASS")
+
+
+def test_synthetic_local_provider():
+    """El proveedor local sintético condensa sin red."""
+    clear_condense_cache()
+    os.environ["AI_CONDENSE_THRESHOLD_TOKENS"] = "500"
+    try:
+        condensed = condense_studies(STUDIES, provider="local")
+    finally:
+        os.environ.pop("AI_CONDENSE_THRESHOLD_TOKENS")
+    assert condensed.startswith("[Documento: Bases de datos.pdf]")
+    assert "- Temas:" in condensed
+    print("Test proveedor local sintético: ✓ PASS")
+
+
+def test_failed_chunk_keeps_original():
+    """Si un fragmento falla se usa su texto original y no se cachea; el resto sí."""
+    clear_condense_cache()
+    original = ai_service._GENERATORS["local"]
+
+    async def failing_local(prompt, model, max_tokens, usage=None):
+        if "Programación web 8" in prompt:
+            raise RuntimeError("proveedor caído")
+        return "- resumen"
+
+    ai_service._GENERATORS["local"] = failing_local
+    os.environ["AI_CONDENSE_THRESHOLD_TOKENS"] = "500"
+    os.environ["AI_CONDENSE_CHUNK_TOKENS"] = "400"
+    try:
+        condensed = condense_studies(STUDIES, provider="local")
+    finally:
+        os.environ.pop("AI_CONDENSE_THRESHOLD_TOKENS")
+        os.environ.pop("AI_CONDENSE_CHUNK_TOKENS")
+        ai_service._GENERATORS["local"] = original
+
+    assert "Unidad 8: Programación web 8" in condensed
+    assert condensed.count("- resumen") == get_condense_stats()["size"] > 0
+    print("Test fragmento fallido: ✓ PASS")
+
+
+if __name__ == "__main__":
+    test_split_documents_and_chunks()
+    test_short_studies_pass_through()
+    test_parallel_condensation_and_cache()
+    test_synthetic_local_provider()
+    test_failed_chunk_keeps_original()
+    print("\n✅ Todos los tests pasaron")
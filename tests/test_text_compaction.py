@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para la compactación del texto extraído de los PDFs.
+Ejecutar: python tests/test_text_compaction.py
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.extract_pdf import PAGE_BREAK
+from src.text_compaction import compact_text, normalize_whitespace
+
+TOPICS = [
+    ("Bases de datos relacionales", "Modelado entidad-relación y normalización.", "Consultas SQL con joins."),
+    ("Programación orientada a objetos", "Clases, herencia y polimorfismo.", "Patrones de diseño básicos."),
+    ("Redes de computadoras", "Modelo OSI y protocolos TCP/IP.", "Configuración de routers."),
+    ("Ingeniería de software", "Metodologías ágiles y Scrum.", "Pruebas unitarias e integración."),
+]
+
+
+def _pdf(name, pages):
+    """Texto con el formato de extract_text_from_multiple_pdfs."""
+    body = f"\n{PAGE_BREAK}\n".join(pages)
+    return f"\n--- INICIO_DOCUMENTO: {name} ---\n\n{body}\n\n--- FIN_DOCUMENTO: {name} ---\n"
+
+
+def test_whitespace_and_markers():
+    """Espacios, líneas en blanco y marcadores de documento se reducen."""
+    assert normalize_whitespace("  Hola\t\tmundo  \r\n fin ") == "Hola mundo\nfin"
+
+    text = _pdf("programa.pdf", ["Python    avanzado\n\n\n\n\nDecoradores y generadores"])
+    compacted, report = compact_text(text)
+    assert compacted == "[Documento: programa.pdf]\n\nPython avanzado\n\nDecoradores y generadores"
+    assert "INICIO_DOCUMENTO" not in compacted and "FIN_DOCUMENTO" not in compacted
+    assert report.tokens_saved > 0
+    print("Test espacios y marcadores: ✓ PASS")
+
+
+def test_repeated_headers_and_page_numbers():
+    """Los encabezados/pies repetidos en cada página se eliminan; el contenido no."""
+    pages = [
+        f"Universidad Nacional - Plan de estudios 2024\nUnidad {n}: {title}\n{content}\n"
+        f"Objetivos:\n{practice}\nPágina {n} de 4"
+        for n, (title, content, practice) in enumerate(TOPICS, 1)
+    ]
+    compacted, report = compact_text(_pdf("plan.pdf", pages))
+
+    assert "Universidad Nacional" not in compacted
+    assert "Página" not in compacted
+    assert report.boilerplate_lines == 8
+    # "Objetivos:" se repite en todas las páginas pero no está en el borde: se conserva
+    assert compacted.count("Objetivos:") == 4
+    assert "Unidad 3: Redes de computadoras" in compacted and "Pruebas unitarias" in compacted
+    print("Test encabezados y pies: ✓ PASS")
+
+
+def test_years_are_not_page_numbers():
+    """Los años y fechas sueltos al borde de una página se conservan; los números en secuencia no."""
+    cv = _pdf("cv.pdf", ["Juan Perez\nDesarrollador\nEmpresa A\n2019", "Empresa B\n2021\nEmpresa C\n2018"])
+    compacted, report = compact_text(cv)
+    assert all(year in compacted for year in ("2019", "2021", "2018")) and report.boilerplate_lines == 0
+
+    # Tres o más páginas que terminan con un año: no es un pie repetido
+    pages = [f"{title}\n{content}\n{practice}\n{2015 + n}" for n, (title, content, practice) in enumerate(TOPICS)]
+    compacted, _ = compact_text(_pdf("cv.pdf", pages))
+    assert all(str(2015 + n) in compacted for n in range(4))
+
+    # Números sueltos consecutivos entre páginas sí son números de página
+    pages = [f"{title}\n{content}\n{practice}\n- {n} -" for n, (title, content, practice) in enumerate(TOPICS, 1)]
+    pages[1] = pages[1].replace("- 2 -", "03/2020\n- 2 -")
+    compacted, report = compact_text(_pdf("plan.pdf", pages))
+    assert "- 1 -" not in compacted and "- 4 -" not in compacted and report.boilerplate_lines == 4
+    assert "03/2020" in compacted
+    print("Test años sueltos: ✓ PASS")
+
+
+def test_near_duplicate_paragraphs_across_documents():
+    """Un párrafo casi idéntico en otro programa se descarta."""
+    shared = (
+        "El curso introduce los fundamentos de aprendizaje automático supervisado, "
+        "regresión lineal y logística, árboles de decisión y validación cruzada."
+    )
+    variant = shared.replace("logística", "Logistica").replace(".", "")
+    first = _pdf("curso_a.pdf", [f"Curso A\n\n{shared}\n\nProyecto final integrador"])
+    second = _pdf("curso_b.pdf", [f"Curso B\n\n{variant}\n\nTrabajo práctico con scikit-learn"])
+
+    compacted, report = compact_text(first + "\n" + second)
+    assert report.duplicate_paragraphs == 1
+    assert compacted.count("aprendizaje automático supervisado") == 1
+    assert "[Documento: curso_b.pdf]" in compacted and "scikit-learn" in compacted
+    assert report.compacted_tokens < report.original_tokens
+    print("Test párrafos duplicados: ✓ PASS")
+
+
+def test_disabled_keeps_text():
+    """Con AI_COMPACTION_ENABLED=0 solo se quitan los cortes de página."""
+    text = _pdf("plan.pdf", ["uno", "dos"])
+    os.environ["AI_COMPACTION_ENABLED"] = "0"
+    try:
+        compacted, report = compact_text(text)
+    finally:
+        os.environ.pop("AI_COMPACTION_ENABLED")
+    assert PAGE_BREAK not in compacted and "--- INICIO_DOCUMENTO: plan.pdf ---" in compacted
+    assert report.tokens_saved == 0
+    print("Test compactación desactivada: ✓ PASS")
+
+
+if __name__ == "__main__":
+    test_whitespace_and_markers()
+    test_repeated_headers_and_page_numbers()
+    test_years_are_not_page_numbers()
+    test_near_duplicate_paragraphs_across_documents()
+    test_disabled_keeps_text()
+    print("\n✅ Todos los tests pasaron")